@@ -8,7 +8,12 @@ export function requireCore(): string {
 
 export async function proxyFetch(path: string, init?: RequestInit) {
   const core = requireCore();
-  return fetch(`${core}${path}`, init);
+  // The core API enforces per-key quotas when SP_API_KEYS is set.
+  const key = process.env.CORE_API_KEY;
+  if (!key) return fetch(`${core}${path}`, init);
+  const headers = new Headers(init?.headers);
+  headers.set('X-SIGNET-API-Key', key);
+  return fetch(`${core}${path}`, { ...init, headers });
 }
 
 export function coreErrorResponse(e: unknown) {
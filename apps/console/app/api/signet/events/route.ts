@@ -0,0 +1,27 @@
+import { NextResponse } from 'next/server';
+import { proxyFetch, coreErrorResponse } from '../_core';
+
+export const dynamic = 'force-dynamic';
+
+// Pass-through of the core SSE feed (receipts + ledger entries) so the browser
+// can hold one EventSource instead of polling chain endpoints.
+export async function GET(req: Request) {
+  try {
+    const qs = new URL(req.url).search;
+    const res = await proxyFetch(`/v1/events${qs}`, { cache: 'no-store', signal: req.signal });
+    if (!res.ok || !res.body) {
+      const text = await res.text();
+      return new NextResponse(text, { status: res.status, headers: { 'content-type': 'application/json' } });
+    }
+    return new NextResponse(res.body, {
+      status: 200,
+      headers: {
+        'content-type': 'text/event-stream',
+        'cache-control': 'no-cache',
+        'x-accel-buffering': 'no',
+      },
+    });
+  } catch (e) {
+    return coreErrorResponse(e);
+  }
+}
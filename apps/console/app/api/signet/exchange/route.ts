@@ -4,14 +4,24 @@ import { proxyFetch, coreErrorResponse } from '../_core';
 export async function POST(req: NextRequest) {
   try {
     const body = await req.text();
+    const headers: Record<string, string> = { 'content-type': 'application/json' };
+    // Trace continuation (compare-and-append) and idempotency headers pass through.
+    for (const name of ['x-signet-trace', 'x-signet-prev-receipt-hash', 'x-signet-idempotency-key']) {
+      const value = req.headers.get(name);
+      if (value) headers[name] = value;
+    }
     const upstream = await proxyFetch('/v1/exchange', {
       method: 'POST',
       body,
-      headers: { 'content-type': 'application/json' },
+      headers,
     });
     let json: any = {};
     try { json = await upstream.json(); } catch { /* ignore */ }
-    return NextResponse.json(json, { status: upstream.status });
+    const retryAfter = upstream.headers.get('retry-after');
+    return NextResponse.json(json, {
+      status: upstream.status,
+      headers: retryAfter ? { 'retry-after': retryAfter } : undefined,
+    });
   } catch (e) {
     return coreErrorResponse(e);
   }
@@ -0,0 +1 @@
+"""Load-testing and benchmark harness for the core API (see ``python -m bench -h``)."""
@@ -0,0 +1,136 @@
+"""Command line entry point: ``python -m bench <command>`` (from apps/core-api)."""
+
+import argparse
+import json
+import os
+import sys
+
+from .exchange_path import measure_exchange_path
+from .harness import SCENARIOS, Result, compare, run_matrix
+from .overhead import measure_overhead
+
+_UNITS = {"k": 1 << 10, "m": 1 << 20}
+
+
+def _sizes(raw: str) -> list[int]:
+    out = []
+    for tok in raw.split(","):
+        tok = tok.strip().lower().removesuffix("ib").removesuffix("b")
+        if tok[-1:] in _UNITS:
+            out.append(int(float(tok[:-1]) * _UNITS[tok[-1]]))
+        else:
+            out.append(int(tok))
+    return out
+
+
+def _counts(raw: str) -> list[int]:
+    units = {"k": 1_000, "m": 1_000_000}
+    out = []
+    for tok in raw.split(","):
+        tok = tok.strip().lower()
+        out.append(int(float(tok[:-1]) * units[tok[-1]]) if tok[-1:] in units else int(tok))
+    return out
+
+
+def _print_result(r: Result) -> None:
+    alloc = f"{r.alloc_peak_bytes_p50:>9}B" if r.alloc_peak_bytes_p50 is not None else " " * 10
+    print(
+        f"{r.key:<40} {r.rps:>9.1f} req/s  p50 {r.p50_ms:>7.2f}ms  p99 {r.p99_ms:>7.2f}ms"
+        f"  alloc {alloc}  errors {r.errors}",
+        file=sys.stderr,
+    )
+
+
+def _cmd_run(args: argparse.Namespace) -> int:
+    report = run_matrix(
+        modes=args.mode.split(","),
+        scenarios=args.scenarios.split(","),
+        payload_sizes=_sizes(args.payload_sizes),
+        ledger_sizes=_counts(args.ledger_sizes),
+        requests=args.requests,
+        concurrency=args.concurrency,
+        workers=args.workers,
+        cache_dir=args.cache_dir,
+        measure_alloc=not args.no_alloc,
+        progress=_print_result,
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.out}", file=sys.stderr)
+    return 0
+
+
+def _cmd_compare(args: argparse.Namespace) -> int:
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.head, encoding="utf-8") as f:
+        head = json.load(f)
+    rows = compare(base, head, args.threshold)
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(
+            f"{row['key']:<40} rps {row['rps_base']:>9.1f} -> {row['rps_head']:>9.1f}"
+            f" ({row['rps_change']:+.1%})  p99 {row['p99_base_ms']:>7.2f} -> "
+            f"{row['p99_head_ms']:>7.2f}ms ({row['p99_change']:+.1%})  {flag}"
+        )
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+def _cmd_overhead(args: argparse.Namespace) -> int:
+    r = measure_overhead(args.iterations)
+    print(
+        f"http metrics middleware: bare {r['bare_ns']:.0f}ns  instrumented "
+        f"{r['instrumented_ns']:.0f}ns  overhead {r['overhead_ns']:.0f}ns/request"
+    )
+    return 0
+
+
+def _cmd_exchange_path(args: argparse.Namespace) -> int:
+    for r in measure_exchange_path(_sizes(args.payload_sizes), args.iterations):
+        print(
+            f"exchange parse+render {r['payload_bytes']:>8}B: model {r['model_ns']:>9.0f}ns  "
+            f"fast {r['fast_ns']:>9.0f}ns  speedup {r['speedup']:.2f}x"
+        )
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m bench")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    run = sub.add_parser("run", help="run the benchmark matrix and save JSON results")
+    run.add_argument("--mode", default="inproc", help="inproc,uvicorn")
+    run.add_argument("--scenarios", default=",".join(SCENARIOS))
+    run.add_argument("--payload-sizes", default="1k,64k", help="e.g. 1k,4k,16k,64k")
+    run.add_argument(
+        "--ledger-sizes", default="10k", help="receipts in the seeded log, e.g. 10k,1m,10m"
+    )
+    run.add_argument("--requests", type=int, default=500)
+    run.add_argument("--concurrency", type=int, default=16)
+    run.add_argument("--workers", type=int, default=1, help="uvicorn workers (uvicorn mode)")
+    run.add_argument("--cache-dir", default=os.path.join("bench", ".cache"))
+    run.add_argument("--no-alloc", action="store_true", help="skip the tracemalloc pass")
+    run.add_argument("--out", default=os.path.join("bench", "results", "latest.json"))
+    cmp_ = sub.add_parser("compare", help="compare two result files; exit 1 on regression")
+    cmp_.add_argument("base")
+    cmp_.add_argument("head")
+    cmp_.add_argument("--threshold", type=float, default=0.10, help="relative change (0.10 = 10%%)")
+    ovh = sub.add_parser("overhead", help="measure the HTTP metrics middleware cost per request")
+    ovh.add_argument("--iterations", type=int, default=100_000)
+    exc = sub.add_parser(
+        "exchange-path", help="compare exchange request/response handling against the model path"
+    )
+    exc.add_argument("--payload-sizes", default="1k,16k,256k")
+    exc.add_argument("--iterations", type=int, default=2_000)
+    args = p.parse_args(argv)
+    commands = {
+        "run": _cmd_run,
+        "compare": _cmd_compare,
+        "overhead": _cmd_overhead,
+        "exchange-path": _cmd_exchange_path,
+    }
+    return commands[args.cmd](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Request/response handling cost of ``POST /v1/exchange``, without I/O.
+
+Compares the handler's current parse-and-render path with the one it replaced, on
+the same request bytes and the same (fake) receipt, so only validation and
+serialization are measured:
+
+* ``model`` (before): FastAPI's body parameter (``json.loads`` then model
+  validation), the size check re-serializing ``model_dump()``, an
+  ``ExchangeResponse`` built and dumped with ``model_dump_json``, and the
+  ``json.loads`` round trip for the idempotency record;
+* ``fast`` (now): ``parse_request`` on the raw bytes, the response dict built once
+  and encoded once with ``dumps``.
+"""
+
+import json
+import time
+from typing import Any
+
+from server.codecs import dumps
+from server.routes.v1.exchange import ExchangeRequest, ExchangeResponse, parse_request
+
+from .harness import make_payload
+
+_POLICY = {"engine": "HEL", "allowed": True, "reason": "no_forward", "cid": "sha256:" + "0" * 64}
+_RECEIPT = {
+    "trace_id": "bench-trace",
+    "ts": "2026-01-01T00:00:00Z",
+    "cid": "sha256:" + "0" * 64,
+    "receipt_hash": "sha256:" + "1" * 64,
+    "prev_receipt_hash": None,
+    "prev_cid": None,
+    "hop": 1,
+}
+
+
+def _model_path(raw: bytes) -> bytes:
+    req = ExchangeRequest.model_validate(json.loads(raw))
+    json.dumps(req.model_dump()).encode("utf-8")
+    normalized = {"Document": {"Echo": req.payload}}
+    content = ExchangeResponse(
+        trace_id="bench-trace",
+        normalized=normalized,
+        policy=_POLICY,
+        receipt={**_RECEIPT, "normalized": normalized},
+        forwarded=None,
+        idempotent=False,
+    ).model_dump_json()
+    json.loads(content)
+    return content.encode()
+
+
+def _fast_path(raw: bytes) -> bytes:
+    req = parse_request(raw)
+    normalized = {"Document": {"Echo": req.payload}}
+    return dumps({
+        "trace_id": "bench-trace",
+        "normalized": normalized,
+        "policy": _POLICY,
+        "receipt": {**_RECEIPT, "normalized": normalized},
+        "forwarded": None,
+        "idempotent": False,
+    })
+
+
+def _best(fn: Any, raw: bytes, iterations: int, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn(raw)
+        best = min(best, time.perf_counter() - start)
+    return best / iterations * 1e9
+
+
+def measure_exchange_path(
+    payload_sizes: list[int], iterations: int = 2_000, repeats: int = 5
+) -> list[dict[str, float]]:
+    """Best-of-``repeats`` ns/request for both paths, per payload size."""
+    rows = []
+    for size in payload_sizes:
+        raw = json.dumps(make_payload(size)).encode()
+        if json.loads(_model_path(raw)) != json.loads(_fast_path(raw)):
+            raise AssertionError("fast path renders a different response")
+        model_ns = _best(_model_path, raw, iterations, repeats)
+        fast_ns = _best(_fast_path, raw, iterations, repeats)
+        rows.append({
+            "payload_bytes": size,
+            "model_ns": model_ns,
+            "fast_ns": fast_ns,
+            "speedup": model_ns / fast_ns,
+        })
+    return rows
@@ -0,0 +1,359 @@
+"""Drive the core API and record throughput, latency and allocation figures.
+
+Two modes share the same scenarios:
+
+* ``inproc`` calls the ASGI app through ``httpx.ASGITransport`` (no sockets), which
+  isolates handler cost and lets ``tracemalloc`` attribute allocations per request.
+* ``uvicorn`` starts a real server subprocess and drives it over HTTP, including
+  protocol and event-loop overhead.
+"""
+
+import asyncio
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from typing import Any
+
+import httpx
+
+from .seed import seed_data_dir
+
+SCENARIOS = ("exchange", "replay", "chain", "export")
+
+RequestFn = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+@dataclass
+class Result:
+    scenario: str
+    mode: str
+    payload_bytes: int
+    ledger_receipts: int
+    requests: int
+    concurrency: int
+    errors: int
+    rps: float
+    p50_ms: float
+    p99_ms: float
+    mean_ms: float
+    alloc_peak_bytes_p50: int | None
+    server_rss_delta_bytes: int | None
+
+    @property
+    def key(self) -> str:
+        return f"{self.scenario}/{self.mode}/{self.payload_bytes}B/{self.ledger_receipts}r"
+
+
+def make_payload(size: int) -> dict[str, Any]:
+    """Return an exchange body whose JSON encoding is roughly ``size`` bytes."""
+    overhead = len('{"payload_type":"bench.exchange","payload":{"blob":""}}')
+    return {"payload_type": "bench.exchange", "payload": {"blob": "x" * max(0, size - overhead)}}
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))
+    return sorted_values[idx]
+
+
+def _scenario_fn(scenario: str, payload: dict[str, Any], probe_traces: list[str]) -> RequestFn:
+    if scenario == "exchange":
+        async def fn(ac: httpx.AsyncClient, i: int) -> httpx.Response:
+            return await ac.post("/v1/exchange", json=payload)
+    elif scenario == "replay":
+        key = f"bench-replay-{uuid.uuid4()}"
+
+        async def fn(ac: httpx.AsyncClient, i: int) -> httpx.Response:
+            return await ac.post(
+                "/v1/exchange", json=payload, headers={"X-SIGNET-Idempotency-Key": key}
+            )
+    elif scenario in ("chain", "export"):
+        route = "/v1/receipts/chain/" if scenario == "chain" else "/v1/receipts/export/"
+
+        async def fn(ac: httpx.AsyncClient, i: int) -> httpx.Response:
+            return await ac.get(route + probe_traces[i % len(probe_traces)])
+    else:
+        raise ValueError(f"unknown scenario {scenario!r}")
+    return fn
+
+
+async def _drive(
+    ac: httpx.AsyncClient,
+    fn: RequestFn,
+    requests: int,
+    concurrency: int,
+    trace_alloc: bool,
+) -> tuple[list[float], list[int], int, float]:
+    latencies: list[float] = []
+    allocs: list[int] = []
+    errors = 0
+    # Warm up caches and connection pools outside the measured window.
+    for i in range(min(10, requests)):
+        await fn(ac, i)
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in counter:
+            if trace_alloc:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+            t0 = time.perf_counter()
+            r = await fn(ac, i)
+            latencies.append(time.perf_counter() - t0)
+            if trace_alloc:
+                allocs.append(tracemalloc.get_traced_memory()[1] - base)
+            if r.status_code >= 400:
+                errors += 1
+
+    wall0 = time.perf_counter()
+    # tracemalloc peaks are process-wide, so allocation runs are sequential.
+    await asyncio.gather(*(worker() for _ in range(1 if trace_alloc else concurrency)))
+    return latencies, allocs, errors, time.perf_counter() - wall0
+
+
+def _result(
+    scenario: str,
+    mode: str,
+    payload_bytes: int,
+    ledger: int,
+    concurrency: int,
+    latencies: list[float],
+    allocs: list[int],
+    errors: int,
+    wall: float,
+    rss_delta: int | None,
+) -> Result:
+    lat = sorted(latencies)
+    return Result(
+        scenario=scenario,
+        mode=mode,
+        payload_bytes=payload_bytes,
+        ledger_receipts=ledger,
+        requests=len(lat),
+        concurrency=concurrency,
+        errors=errors,
+        rps=len(lat) / wall if wall else 0.0,
+        p50_ms=_percentile(lat, 50) * 1000,
+        p99_ms=_percentile(lat, 99) * 1000,
+        mean_ms=statistics.fmean(lat) * 1000 if lat else 0.0,
+        alloc_peak_bytes_p50=int(statistics.median(allocs)) if allocs else None,
+        server_rss_delta_bytes=rss_delta,
+    )
+
+
+def _restore(data_dir: str) -> None:
+    """Undo appends from a run so the cached seed stays at its nominal size."""
+    for name in ("receipts.jsonl", "ledger.jsonl"):
+        path = os.path.join(data_dir, name)
+        size_path = path + ".seed-size"
+        if not os.path.exists(size_path):
+            with open(size_path, "w", encoding="utf-8") as f:
+                f.write(str(os.path.getsize(path)))
+        with open(size_path, encoding="utf-8") as f:
+            os.truncate(path, int(f.read()))
+    idem = os.path.join(data_dir, "idempotency.jsonl")
+    if os.path.exists(idem):
+        os.remove(idem)
+
+
+def _configure_inproc(data_dir: str) -> None:
+    from server.settings import settings
+
+    settings.receipts_path = os.path.join(data_dir, "receipts.jsonl")
+    settings.ledger_path = os.path.join(data_dir, "ledger.jsonl")
+    settings.idempotency_path = os.path.join(data_dir, "idempotency.jsonl")
+    settings.max_exchange_body_bytes = 1 << 20
+
+
+async def run_inproc(
+    scenario: str,
+    payload_bytes: int,
+    data_dir: str,
+    manifest: dict[str, Any],
+    requests: int,
+    concurrency: int,
+    measure_alloc: bool,
+) -> Result:
+    _configure_inproc(data_dir)
+    from server.main import app
+
+    fn = _scenario_fn(scenario, make_payload(payload_bytes), manifest["probe_traces"])
+    transport = httpx.ASGITransport(app=app)
+    async with (
+        app.router.lifespan_context(app),
+        httpx.AsyncClient(transport=transport, base_url="http://bench") as ac,
+    ):
+        latencies, _, errors, wall = await _drive(ac, fn, requests, concurrency, False)
+        allocs: list[int] = []
+        if measure_alloc:
+            tracemalloc.start()
+            try:
+                _, allocs, _, _ = await _drive(ac, fn, min(requests, 200), 1, True)
+            finally:
+                tracemalloc.stop()
+    return _result(
+        scenario, "inproc", payload_bytes, manifest["receipts"], concurrency,
+        latencies, allocs, errors, wall, None,
+    )
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rss_bytes(pid: int) -> int | None:
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+async def run_uvicorn(
+    scenario: str,
+    payload_bytes: int,
+    data_dir: str,
+    manifest: dict[str, Any],
+    requests: int,
+    concurrency: int,
+    workers: int,
+) -> Result:
+    port = _free_port()
+    env = {
+        **os.environ,
+        "SP_RECEIPTS_PATH": os.path.join(data_dir, "receipts.jsonl"),
+        "SP_LEDGER_PATH": os.path.join(data_dir, "ledger.jsonl"),
+        "SP_IDEMPOTENCY_PATH": os.path.join(data_dir, "idempotency.jsonl"),
+        "SP_MAX_EXCHANGE_BODY_BYTES": str(1 << 20),
+    }
+    cmd = [
+        sys.executable, "-m", "uvicorn", "server.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+    ]
+    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.Popen(cmd, cwd=app_dir, env=env)  # noqa: S603 - fixed argv
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as ac:
+            deadline = time.monotonic() + 120
+            while True:
+                try:
+                    if (await ac.get("/healthz")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline or proc.poll() is not None:
+                    raise RuntimeError("uvicorn did not become healthy")
+                await asyncio.sleep(0.1)
+            fn = _scenario_fn(scenario, make_payload(payload_bytes), manifest["probe_traces"])
+            rss0 = _rss_bytes(proc.pid)
+            latencies, _, errors, wall = await _drive(ac, fn, requests, concurrency, False)
+            rss1 = _rss_bytes(proc.pid)
+    finally:
+        proc.terminate()
+        proc.wait(30)
+    rss_delta = rss1 - rss0 if rss0 is not None and rss1 is not None else None
+    return _result(
+        scenario, "uvicorn", payload_bytes, manifest["receipts"], concurrency,
+        latencies, [], errors, wall, rss_delta,
+    )
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],  # noqa: S607
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run_matrix(
+    *,
+    modes: list[str],
+    scenarios: list[str],
+    payload_sizes: list[int],
+    ledger_sizes: list[int],
+    requests: int,
+    concurrency: int,
+    workers: int,
+    cache_dir: str,
+    measure_alloc: bool = True,
+    progress: Callable[[Result], None] | None = None,
+) -> dict[str, Any]:
+    results: list[Result] = []
+    for ledger in ledger_sizes:
+        data_dir = os.path.join(cache_dir, f"ledger-{ledger}")
+        manifest = seed_data_dir(data_dir, ledger)
+        for mode in modes:
+            for scenario in scenarios:
+                # Reads do not depend on request payload size; measure them once.
+                sizes = payload_sizes if scenario in ("exchange", "replay") else payload_sizes[:1]
+                for size in sizes:
+                    _restore(data_dir)
+                    if mode == "inproc":
+                        coro = run_inproc(
+                            scenario, size, data_dir, manifest, requests, concurrency,
+                            measure_alloc,
+                        )
+                    else:
+                        coro = run_uvicorn(
+                            scenario, size, data_dir, manifest, requests, concurrency, workers
+                        )
+                    result = asyncio.run(coro)
+                    results.append(result)
+                    if progress:
+                        progress(result)
+        _restore(data_dir)
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": [asdict(r) | {"key": r.key} for r in results],
+    }
+
+
+def compare(base: dict[str, Any], head: dict[str, Any], threshold: float) -> list[dict[str, Any]]:
+    """Pair results by key and report relative changes; flag regressions past threshold."""
+    base_by_key = {r["key"]: r for r in base["results"]}
+    rows = []
+    for r in head["results"]:
+        b = base_by_key.get(r["key"])
+        if b is None:
+            continue
+        rps_change = (r["rps"] - b["rps"]) / b["rps"] if b["rps"] else 0.0
+        p99_change = (r["p99_ms"] - b["p99_ms"]) / b["p99_ms"] if b["p99_ms"] else 0.0
+        rows.append({
+            "key": r["key"],
+            "rps_base": b["rps"],
+            "rps_head": r["rps"],
+            "rps_change": rps_change,
+            "p99_base_ms": b["p99_ms"],
+            "p99_head_ms": r["p99_ms"],
+            "p99_change": p99_change,
+            "regression": rps_change < -threshold or p99_change > threshold,
+        })
+    return rows
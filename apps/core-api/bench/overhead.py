@@ -0,0 +1,60 @@
+"""Per-request cost of the HTTP metrics middleware, measured without a server.
+
+A trivial ASGI app is called directly in a loop, bare and wrapped in
+``MetricsMiddleware``, with a matched route in the scope. The difference between the
+two loops is the middleware's own cost per request (label resolution, clock reads
+and the two metric updates).
+"""
+
+import asyncio
+import time
+from typing import Any
+
+from starlette.routing import Route
+from starlette.types import Receive, Scope, Send
+
+from server.http_metrics import MetricsMiddleware
+
+_ROUTE = Route("/v1/receipts/chain/{trace_id}", endpoint=lambda request: None)
+
+
+async def _endpoint(scope: Scope, receive: Receive, send: Send) -> None:
+    scope["route"] = _ROUTE
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _receive() -> dict[str, Any]:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message: dict[str, Any]) -> None:
+    return None
+
+
+async def _loop(app: Any, iterations: int) -> float:
+    start = time.perf_counter()
+    for i in range(iterations):
+        scope = {"type": "http", "method": "GET", "path": f"/v1/receipts/chain/t-{i}"}
+        await app(scope, _receive, _send)
+    return time.perf_counter() - start
+
+
+def measure_overhead(iterations: int = 100_000, repeats: int = 5) -> dict[str, float]:
+    """Return best-of-``repeats`` ns/request for the bare and instrumented app."""
+
+    async def run() -> tuple[float, float]:
+        wrapped = MetricsMiddleware(_endpoint)
+        bare = min([await _loop(_endpoint, iterations) for _ in range(repeats)])
+        instrumented = min([await _loop(wrapped, iterations) for _ in range(repeats)])
+        return bare, instrumented
+
+    bare, instrumented = asyncio.run(run())
+    bare_ns = bare / iterations * 1e9
+    instrumented_ns = instrumented / iterations * 1e9
+    return {
+        "iterations": iterations,
+        "bare_ns": bare_ns,
+        "instrumented_ns": instrumented_ns,
+        "overhead_ns": instrumented_ns - bare_ns,
+    }
@@ -0,0 +1,80 @@
+"""Synthetic data directories for benchmarks.
+
+Seeded directories are cached by receipt count because building a 10M-receipt log
+takes minutes. Most traces are single-hop, like real exchange traffic; a handful of
+multi-hop "probe" traces are spread through the file for chain/export scenarios.
+"""
+
+import json
+import os
+import time
+import uuid
+
+from server.utils import cid_for_json
+
+PROBE_HOPS = 8
+PROBE_COUNT = 4
+
+
+def _probe_ids() -> list[str]:
+    return [f"bench-probe-{i}" for i in range(PROBE_COUNT)]
+
+
+def seed_data_dir(path: str, receipts: int) -> dict[str, object]:
+    """Create (or reuse) a data dir with ``receipts`` receipts; return its manifest."""
+    manifest_path = os.path.join(path, "manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+    os.makedirs(path, exist_ok=True)
+    ts = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    probes = _probe_ids()
+    probe_heads: dict[str, tuple[str | None, str | None]] = dict.fromkeys(probes, (None, None))
+    probe_hops = dict.fromkeys(probes, 0)
+    # Spread probe hops evenly so chain reads cannot stop early.
+    probe_every = max(1, receipts // (PROBE_COUNT * PROBE_HOPS))
+    written = 0
+    with (
+        open(os.path.join(path, "receipts.jsonl"), "w", encoding="utf-8") as rf,
+        open(os.path.join(path, "ledger.jsonl"), "w", encoding="utf-8") as lf,
+    ):
+        while written < receipts:
+            idx = written // probe_every % PROBE_COUNT
+            probe = probes[idx]
+            if written % probe_every == 0 and probe_hops[probe] < PROBE_HOPS:
+                trace_id = probe
+                probe_hops[probe] += 1
+                hop = probe_hops[probe]
+                prev, prev_cid = probe_heads[probe]
+            else:
+                trace_id, hop, prev, prev_cid = str(uuid.uuid4()), 1, None, None
+            normalized = {"Document": {"Echo": {"seq": written, "trace": trace_id}}}
+            cid = cid_for_json(normalized)
+            receipt_hash = cid_for_json({"ts": ts, "cid": cid, "prev": prev, "hop": hop})
+            rec = {
+                "trace_id": trace_id,
+                "ts": ts,
+                "cid": cid,
+                "receipt_hash": receipt_hash,
+                "prev_receipt_hash": prev,
+                "prev_cid": prev_cid,
+                "hop": hop,
+                "normalized": normalized,
+            }
+            rf.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            lf.write(json.dumps({
+                "trace_id": trace_id,
+                "hop": hop,
+                "ts": ts,
+                "payload_type": "bench.seed",
+                "target_type": None,
+                "cid": cid,
+                "forward_host": None,
+            }) + "\n")
+            if trace_id in probe_heads:
+                probe_heads[trace_id] = (receipt_hash, cid)
+            written += 1
+    manifest = {"receipts": receipts, "probe_traces": probes}
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    return manifest
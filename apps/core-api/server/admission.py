@@ -0,0 +1,194 @@
+"""Admission control for ``POST /v1/exchange``.
+
+An adaptive concurrency limit decides how many exchanges may run at once on this
+worker's event loop; requests past it wait in a FIFO queue. The queue is managed in
+the style of CoDel: once every request leaving it has waited longer than
+``admission_target_delay`` for a whole ``admission_interval``, the queue is standing
+rather than absorbing a burst, and waiters are shed with 503 + ``Retry-After``
+instead of being admitted late. A full queue or a waiter past
+``admission_queue_timeout`` is shed the same way.
+
+The limit follows AIMD: it grows by ``1/limit`` per completed exchange that found
+the limit in use and its queue healthy, and is cut by ``admission_backoff`` (at most
+once per interval) whenever something is shed. Admitted exchanges then wait for a
+thread of their shard's writer pool (see ``shards``), whose queue is unbounded. So
+that backlog is not hidden behind a healthy admission queue, an exchange that waited
+there for ``admission_target_delay`` or longer stops the limit growing and cuts it
+like a shed request does.
+
+Replays of idempotency keys already stored in this worker's cache are served from
+memory and bypass the limit entirely, so retries of completed writes keep working
+while new writes are shed.
+
+Admission runs before authentication, which happens in the route. A request with
+a missing or invalid API key therefore holds a slot, or queues for one, until the
+route rejects it, and unauthenticated traffic counts against the same limit as
+real clients. Where that matters, reject unknown keys in front of the API (for
+example at the gateway).
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from . import idempotency, shards
+from .metrics import observe_admission, observe_admission_shed
+from .settings import settings
+
+_IDEMPOTENCY_HEADER = b"x-signet-idempotency-key"
+
+
+class AdmissionController:
+    def __init__(self) -> None:
+        self.limit = float(settings.admission_initial_limit)
+        self.in_flight = 0
+        self._waiters: deque[tuple[float, asyncio.Future[bool]]] = deque()
+        self._first_above: float = 0.0  # CoDel: when the delay may be called standing
+        self._last_decrease: float = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _report(self) -> None:
+        observe_admission(self.limit, self.in_flight, len(self._waiters))
+
+    def _shed(self, reason: str, now: float) -> None:
+        observe_admission_shed(reason)
+        self._decrease(now)
+
+    def _decrease(self, now: float) -> None:
+        if now - self._last_decrease >= settings.admission_interval:
+            self._last_decrease = now
+            self.limit = max(
+                float(settings.admission_min_limit), self.limit * settings.admission_backoff
+            )
+
+    def _standing_queue(self, sojourn: float, now: float) -> bool:
+        if sojourn < settings.admission_target_delay:
+            self._first_above = 0.0
+            return False
+        if not self._first_above:
+            self._first_above = now + settings.admission_interval
+            return False
+        return now >= self._first_above
+
+    async def acquire(self) -> float | None:
+        """Wait for a slot; returns the queue delay, or None if the request was shed."""
+        now = time.monotonic()
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self._report()
+            return 0.0
+        if len(self._waiters) >= settings.admission_max_queue:
+            self._shed("queue_full", now)
+            self._report()
+            return None
+        fut: asyncio.Future[bool] = asyncio.get_running_loop().create_future()
+        entry = (now, fut)
+        self._waiters.append(entry)
+        self._report()
+        try:
+            admitted = await asyncio.wait_for(
+                asyncio.shield(fut), timeout=settings.admission_queue_timeout
+            )
+        except TimeoutError:
+            if fut.done():
+                # Decided right at the deadline; honour it so a granted slot is not leaked.
+                return time.monotonic() - now if fut.result() else None
+            fut.cancel()
+            self._waiters.remove(entry)
+            self._shed("queue_timeout", time.monotonic())
+            self._report()
+            return None
+        except asyncio.CancelledError:
+            # Client went away while queued: give back a slot granted in the meantime.
+            if fut.done() and fut.result():
+                self.release(0.0)
+            elif not fut.done():
+                fut.cancel()
+                self._waiters.remove(entry)
+                self._report()
+            raise
+        return time.monotonic() - now if admitted else None
+
+    def release(self, queue_delay: float, pool_delay: float = 0.0) -> None:
+        """Free a slot; ``pool_delay`` is how long the exchange waited for a shard thread."""
+        now = time.monotonic()
+        if pool_delay >= settings.admission_target_delay:
+            self._decrease(now)
+        elif (
+            queue_delay < settings.admission_target_delay
+            and self.in_flight >= int(self.limit)
+            and self.limit < settings.admission_max_limit
+        ):
+            self.limit = min(float(settings.admission_max_limit), self.limit + 1 / self.limit)
+        self.in_flight -= 1
+        # Hand free slots to waiters, shedding those that sat in a standing queue.
+        while self._waiters and self.in_flight < int(self.limit):
+            enqueued, fut = self._waiters.popleft()
+            if fut.done():
+                continue
+            if self._standing_queue(now - enqueued, now):
+                self._shed("standing_queue", now)
+                fut.set_result(False)
+                continue
+            self.in_flight += 1
+            fut.set_result(True)
+        self._report()
+
+
+controller = AdmissionController()
+
+
+def _is_stored_replay(scope: Scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == _IDEMPOTENCY_HEADER:
+            return idempotency.is_cached(value.decode("latin-1"))
+    return False
+
+
+async def _overloaded(send: Send) -> None:
+    body = json.dumps({
+        "error": "overloaded",
+        "message": "Server is shedding load; retry later",
+    }).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(settings.admission_retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    def __init__(self, app: ASGIApp, controller: AdmissionController = controller) -> None:
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            not settings.admission_enabled
+            or scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] != "/v1/exchange"
+            or _is_stored_replay(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+        queue_delay = await self.controller.acquire()
+        if queue_delay is None:
+            await _overloaded(send)
+            return
+        with shards.measure_wait() as pool_waits:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self.controller.release(queue_delay, sum(pool_waits))
@@ -0,0 +1,147 @@
+"""API key authentication and per-key quotas against ``settings.api_keys``.
+
+``SP_API_KEYS`` maps each key to its properties::
+
+    {"sk_acme_...": {"name": "acme", "rate_per_sec": 20, "burst": 40, "max_concurrency": 4},
+     "sk_ops_...": {"name": "ops", "admin": true}}
+
+Keys are indexed by SHA-256 digest, so a lookup hashes the presented key once and
+never compares raw secrets; the stored digest is then confirmed with
+``hmac.compare_digest``. Quotas (a token bucket plus an in-flight cap) live in this
+process, so with several workers each one enforces them independently. With no keys
+configured the API stays open, as in local development.
+"""
+
+import hashlib
+import hmac
+import math
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import Any
+
+from fastapi import Header, HTTPException
+
+from .metrics import observe_api_key_in_flight, observe_api_key_request
+from .settings import settings
+
+API_KEY_HEADER = "X-SIGNET-API-Key"
+
+
+@dataclass(slots=True)
+class ApiKey:
+    name: str
+    digest: bytes
+    admin: bool
+    rate: float
+    burst: float
+    max_concurrency: int
+    tokens: float = field(init=False)
+    refilled_at: float = field(default_factory=time.monotonic)
+    in_flight: int = 0
+
+    def __post_init__(self) -> None:
+        self.tokens = self.burst
+
+    def take(self) -> float:
+        """Spend one token; returns 0 on success or the seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else math.inf
+
+
+_index: dict[bytes, ApiKey] = {}
+_index_source: dict[str, dict] | None = None
+
+
+def _digest(key: str) -> bytes:
+    return hashlib.sha256(key.encode()).digest()
+
+
+def _build(props: dict[str, Any], key: str) -> ApiKey:
+    rate = float(props.get("rate_per_sec", settings.api_key_rate_per_sec))
+    return ApiKey(
+        name=str(props.get("name") or f"key-{_digest(key).hex()[:8]}"),
+        digest=_digest(key),
+        admin=bool(props.get("admin", False)),
+        rate=rate,
+        burst=float(props.get("burst", settings.api_key_burst or max(1.0, rate))),
+        max_concurrency=int(props.get("max_concurrency", settings.api_key_max_concurrency)),
+    )
+
+
+def _keys() -> dict[bytes, ApiKey]:
+    # Rebuilt only when the configured mapping is replaced (settings reload, tests).
+    global _index, _index_source
+    if settings.api_keys is not _index_source:
+        _index = {(k := _build(props, key)).digest: k for key, props in settings.api_keys.items()}
+        _index_source = settings.api_keys
+    return _index
+
+
+def authenticate(presented: str | None) -> ApiKey | None:
+    """Resolve a presented key; None when auth is disabled. Raises 401 when invalid."""
+    keys = _keys()
+    if not keys:
+        return None
+    digest = _digest(presented or "")
+    key = keys.get(digest)
+    if key is None or not hmac.compare_digest(key.digest, digest):
+        observe_api_key_request("", "unauthorized")
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    return key
+
+
+async def require_api_key(
+    x_signet_api_key: str | None = Header(default=None, alias=API_KEY_HEADER),
+) -> AsyncIterator[ApiKey | None]:
+    """Dependency for tenant routes: authenticate, then apply the key's quotas.
+
+    Rejects with 429 and ``Retry-After`` when the key's token bucket is empty or it
+    already has ``max_concurrency`` requests in flight. Async, so it runs on the
+    event loop rather than in the threadpool: the quota checks and updates of
+    concurrent requests never interleave.
+    """
+    key = authenticate(x_signet_api_key)
+    if key is None:
+        yield None
+        return
+    if key.in_flight >= key.max_concurrency:
+        observe_api_key_request(key.name, "concurrency_limited")
+        raise HTTPException(
+            status_code=429, detail="Too many concurrent requests", headers={"Retry-After": "1"}
+        )
+    wait = key.take()
+    if wait:
+        observe_api_key_request(key.name, "rate_limited")
+        retry_after = str(max(1, math.ceil(wait))) if math.isfinite(wait) else "3600"
+        raise HTTPException(
+            status_code=429, detail="Rate limit exceeded", headers={"Retry-After": retry_after}
+        )
+    observe_api_key_request(key.name, "allowed")
+    key.in_flight += 1
+    observe_api_key_in_flight(key.name, key.in_flight)
+    try:
+        yield key
+    finally:
+        key.in_flight -= 1
+        observe_api_key_in_flight(key.name, key.in_flight)
+
+
+def require_admin(
+    x_signet_api_key: str | None = Header(default=None, alias=API_KEY_HEADER),
+) -> str:
+    """Dependency for operator-only routes; returns the key's name.
+
+    Fails closed: with no admin key configured, every request is rejected.
+    """
+    key = authenticate(x_signet_api_key)
+    if key is None:
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    if not key.admin:
+        raise HTTPException(status_code=403, detail="Admin API key required")
+    return key.name
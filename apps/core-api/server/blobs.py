@@ -0,0 +1,237 @@
+"""Content-addressed store for large normalized bodies.
+
+A body of at least ``SP_BLOB_MIN_BYTES`` is written once to
+``<blobs dir>/<hex[:2]>/<hex>.json``, keyed by the receipt ``cid`` (the SHA-256 of
+its canonical JSON). Receipt lines and idempotency records then omit the body, so a
+payload repeated by retries or fan-out occupies disk once instead of once per
+receipt plus once per stored response. Smaller bodies stay inline: a file per body
+costs a filesystem block and an inode, more than a short body repeated a few times.
+The store is off by default (``SP_BLOB_STORE_ENABLED``); turn it on where large
+payloads repeat. Reads join the body back only where it is sent: the API wire
+format is unchanged, and inline lines are served as they are.
+
+Blob files are written atomically (temp file + rename); concurrent writers of the
+same cid write identical bytes, so the race is harmless. Reference counts are
+derived from the logs on demand for ``gc``; nothing is counted on the write path.
+Recently read bodies are cached up to ``SP_BLOB_CACHE_BYTES``.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+from collections.abc import Mapping
+from typing import Any
+
+from .compact import pack_digest
+from .logtail import receipts_log
+from .settings import settings
+
+
+def blobs_dir() -> str:
+    return settings.blobs_dir or os.path.join(os.path.dirname(settings.receipts_path), "blobs")
+
+
+def _path(cid: str) -> str | None:
+    if pack_digest(cid) is None:
+        return None
+    digest = cid[7:]
+    return os.path.join(blobs_dir(), digest[:2], f"{digest}.json")
+
+
+def encode(normalized: Any) -> bytes:
+    # Same encoding as an inline body in a receipts.jsonl line.
+    return json.dumps(normalized, ensure_ascii=False).encode("utf-8")
+
+
+def put(cid: str, normalized: Any) -> bool:
+    """Store the body for ``cid`` if it is large enough; True if it is in the store.
+
+    False when the body is below ``SP_BLOB_MIN_BYTES`` (it stays inline) or ``cid``
+    is not a SHA-256 CID.
+    """
+    data = encode(normalized)
+    if len(data) < settings.blob_min_bytes:
+        return False
+    return put_bytes(cid, data)
+
+
+def put_bytes(cid: str, data: bytes) -> bool:
+    """Store an already encoded body (as served by ``get_bytes``) under ``cid``."""
+    path = _path(cid)
+    if path is None:
+        return False
+    try:
+        # Already stored: refresh its mtime so a concurrent gc keeps it until the
+        # receipt about to reference it is appended.
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return True
+
+
+class _ReadCache:
+    """Recently read bodies, least recently used evicted past ``SP_BLOB_CACHE_BYTES``."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._items: OrderedDict[str, bytes] = OrderedDict()
+        self._bytes = 0
+
+    def get(self, path: str) -> bytes | None:
+        with self._lock:
+            data = self._items.get(path)
+            if data is not None:
+                self._items.move_to_end(path)
+            return data
+
+    def put(self, path: str, data: bytes) -> None:
+        limit = settings.blob_cache_bytes
+        if len(data) > limit:
+            return
+        with self._lock:
+            if path in self._items:
+                return
+            self._items[path] = data
+            self._bytes += len(data)
+            while self._bytes > limit:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+
+_cache = _ReadCache()
+
+
+def _read(path: str) -> bytes:
+    data = _cache.get(path)
+    if data is None:
+        with open(path, "rb") as f:
+            data = f.read()
+        _cache.put(path, data)
+    return data
+
+
+def get_bytes(cid: str) -> bytes | None:
+    path = _path(cid)
+    if path is None:
+        return None
+    try:
+        # Content-addressed, so a cached body can never be stale.
+        return _read(path)
+    except FileNotFoundError:
+        return None
+
+
+def joined(record: Mapping[str, Any]) -> Mapping[str, Any]:
+    """``record`` with its body restored (a copy); unchanged if the body is inline."""
+    if "normalized" in record or not isinstance(record.get("cid"), str):
+        return record
+    raw = get_bytes(record["cid"])
+    return {**record, "normalized": json.loads(raw) if raw is not None else None}
+
+
+def join_line(line: bytes | memoryview, record: Mapping[str, Any]) -> bytes | memoryview:
+    """Stored JSON line with the body spliced back in as its last key."""
+    if "normalized" in record or not isinstance(record.get("cid"), str):
+        return line
+    raw = get_bytes(record["cid"])
+    return b"".join((line[:-1], b', "normalized": ', raw if raw is not None else b"null", b"}"))
+
+
+def strip(record: Mapping[str, Any]) -> dict[str, Any]:
+    """The form of a receipt written to the log once its body is in the store."""
+    return {k: v for k, v in record.items() if k != "normalized"}
+
+
+class _RefCounts:
+    """Counts receipts whose body lives in the store, keyed by raw digest."""
+
+    def __init__(self) -> None:
+        self.counts: Counter[bytes] = Counter()
+        # Traces in different shards, synced in parallel, can share a body.
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts.clear()
+
+    def apply(self, offset: int, record: dict[str, Any]) -> None:
+        cid = record.get("cid")
+        if "normalized" not in record and isinstance(cid, str):
+            digest = pack_digest(cid)
+            if digest is not None:
+                with self._lock:
+                    self.counts[digest] += 1
+
+
+_refs: _RefCounts | None = None
+
+
+def refcounts() -> Counter[bytes]:
+    """References per blob from receipts.jsonl (attached and built on first use)."""
+    global _refs
+    if _refs is None:
+        _refs = _RefCounts()
+        receipts_log.subscribe(_refs)
+    receipts_log.sync()
+    return _refs.counts
+
+
+def gc(grace_seconds: float = 300.0, dry_run: bool = False) -> list[str]:
+    """Delete blobs no receipt references; returns the removed paths.
+
+    Idempotency records also point at blobs, but only for bodies whose receipt is
+    in the log, so receipts alone decide liveness. Blobs younger than
+    ``grace_seconds`` are kept: their receipt may not have been appended yet.
+    """
+    counts = refcounts()
+    removed: list[str] = []
+    root = blobs_dir()
+    cutoff = time.time() - grace_seconds
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            digest = pack_digest("sha256:" + name.removesuffix(".json"))
+            if digest is None or counts.get(digest) or os.path.getmtime(path) > cutoff:
+                continue
+            removed.append(path)
+            if not dry_run:
+                os.remove(path)
+    return removed
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m server.blobs")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    gc_ = sub.add_parser("gc", help="delete blobs that no receipt references")
+    gc_.add_argument("--grace-seconds", type=float, default=300.0)
+    gc_.add_argument("--dry-run", action="store_true")
+    args = p.parse_args(argv)
+    removed = gc(args.grace_seconds, args.dry_run)
+    for path in removed:
+        print(path)
+    print(f"{'would remove' if args.dry_run else 'removed'} {len(removed)} blobs", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
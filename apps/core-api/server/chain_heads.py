@@ -0,0 +1,47 @@
+"""Latest receipt of every trace, kept in memory as ``CompactReceipt``.
+
+``write_receipt`` needs only the head of a chain (its ``receipt_hash`` and ``cid``) to
+link the next receipt; reading the whole chain back from ``receipts.jsonl`` made
+every write a scan of the log. The index is fed by the receipts log follower, so
+heads appended by other workers become visible after a ``sync()``.
+
+Shards are synced in parallel, but all of a trace's records come from its one shard,
+under that shard's lock, so each head has a single writer at a time.
+"""
+
+from typing import Any
+
+from .compact import CompactReceipt
+from .logtail import receipts_log
+
+_heads: dict[str, CompactReceipt] = {}
+
+
+class _HeadIndex:
+    def reset(self) -> None:
+        _heads.clear()
+
+    def apply(self, offset: int, record: dict[str, Any]) -> None:
+        trace_id = record.get("trace_id")
+        hop = record.get("hop")
+        if not isinstance(trace_id, str) or not isinstance(hop, int):
+            return
+        current = _heads.get(trace_id)
+        if current is None or hop >= current.hop:
+            _heads[trace_id] = CompactReceipt.from_wire(record, keep_normalized=False)
+
+
+receipts_log.subscribe(_HeadIndex())
+
+
+def warm() -> None:
+    receipts_log.sync()
+
+
+def head(trace_id: str) -> CompactReceipt | None:
+    """Head of ``trace_id`` as of the last sync (sync first when exactness matters)."""
+    return _heads.get(trace_id)
+
+
+def count() -> int:
+    return len(_heads)
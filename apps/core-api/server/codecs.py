@@ -0,0 +1,148 @@
+"""Wire encodings for exchange and receipt bodies.
+
+JSON is always served. MessagePack (``application/msgpack``) and CBOR
+(``application/cbor``) are available when their packages are installed (the
+``binary`` extra: ``msgpack``, ``cbor2``). Requests pick them with ``Content-Type``,
+and responses with ``Accept``. Anything else, or an ``Accept`` naming only
+unavailable types, gets JSON.
+
+The encoding only changes the bytes on the wire. CIDs and receipt hashes are always
+computed over the RFC 8785 canonical JSON of the decoded value. Binary bodies are
+therefore held to the JSON data model: maps with string keys, arrays, strings,
+finite numbers, booleans and null. Byte strings, tags and extension types are
+rejected.
+"""
+
+import importlib
+import json
+import math
+from types import ModuleType
+from typing import Any
+
+import orjson
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+CBOR = "application/cbor"
+
+_ALIASES = {
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+}
+_NAMES = {JSON: "JSON", MSGPACK: "MessagePack", CBOR: "CBOR"}
+_modules: dict[str, ModuleType | None] = {}
+
+
+class UnsupportedMediaTypeError(ValueError):
+    """A request body in an encoding this server cannot read."""
+
+
+def _module(media_type: str) -> ModuleType | None:
+    if media_type not in _modules:
+        name = {MSGPACK: "msgpack", CBOR: "cbor2"}[media_type]
+        try:
+            _modules[media_type] = importlib.import_module(name)
+        except ImportError:
+            _modules[media_type] = None
+    return _modules[media_type]
+
+
+def available() -> list[str]:
+    return [JSON, *(m for m in (MSGPACK, CBOR) if _module(m) is not None)]
+
+
+def _canonical(media_type: str) -> str:
+    media_type = media_type.split(";", 1)[0].strip().lower()
+    return _ALIASES.get(media_type, media_type)
+
+
+def request_type(content_type: str | None) -> str:
+    """Encoding of a request body; JSON when no ``Content-Type`` is given."""
+    media_type = _canonical(content_type) if content_type else JSON
+    if media_type == JSON or media_type.endswith("+json"):
+        return JSON
+    if media_type in (MSGPACK, CBOR) and _module(media_type) is not None:
+        return media_type
+    raise UnsupportedMediaTypeError(content_type)
+
+
+def negotiate(accept: str | None) -> str:
+    """Response encoding for an ``Accept`` header (highest ``q`` wins, ties in order)."""
+    if not accept:
+        return JSON
+    ranked: list[tuple[float, int, str]] = []
+    for index, item in enumerate(accept.split(",")):
+        media_type, *params = item.split(";")
+        q = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            ranked.append((-q, index, _canonical(media_type)))
+    for _, _, media_type in sorted(ranked):
+        if media_type in (JSON, "*/*", "application/*"):
+            return JSON
+        if media_type in (MSGPACK, CBOR) and _module(media_type) is not None:
+            return media_type
+    return JSON
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON (the encoding ``model_dump_json`` produced)."""
+    try:
+        return orjson.dumps(obj)
+    except orjson.JSONEncodeError:  # e.g. integers wider than 64 bits
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def encode(obj: Any, media_type: str) -> bytes:
+    if media_type == MSGPACK:
+        return _module(MSGPACK).packb(obj, use_bin_type=True)  # type: ignore[union-attr]
+    if media_type == CBOR:
+        return _module(CBOR).dumps(obj)  # type: ignore[union-attr]
+    return dumps(obj)
+
+
+def _check_json_model(value: Any) -> None:
+    if value is None or isinstance(value, (str, bool, int)):
+        return
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            raise ValueError("non-finite number")
+        return
+    if isinstance(value, list):
+        for item in value:
+            _check_json_model(item)
+        return
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if not isinstance(key, str):
+                raise ValueError(f"map key {key!r} is not a string")
+            _check_json_model(item)
+        return
+    raise ValueError(f"{type(value).__name__} value has no JSON equivalent")
+
+
+def decode(raw: bytes, media_type: str) -> Any:
+    """Decode a binary body; ``ValueError`` if it is malformed or not JSON-shaped."""
+    try:
+        if media_type == MSGPACK:
+            value = _module(MSGPACK).unpackb(raw, raw=False)  # type: ignore[union-attr]
+        else:
+            value = _module(CBOR).loads(raw)  # type: ignore[union-attr]
+    except Exception as exc:  # each library has its own error hierarchy
+        raise ValueError(f"Invalid {_NAMES[media_type]}: {exc}") from exc
+    try:
+        _check_json_model(value)
+    except ValueError as exc:
+        raise ValueError(f"Invalid {_NAMES[media_type]}: {exc}") from None
+    return value
+
+
+def error_type(media_type: str) -> str:
+    """Validation error type of an undecodable body, like pydantic's ``json_invalid``."""
+    return {MSGPACK: "msgpack_invalid", CBOR: "cbor_invalid"}.get(media_type, "json_invalid")
@@ -0,0 +1,139 @@
+"""Compact in-memory form of a receipt.
+
+A receipt decoded from JSON is a dict of eight str-keyed entries whose values are
+mostly 71-character ``"sha256:<hex>"`` strings, about 1 KB per record. ``CompactReceipt``
+holds the same information in a ``__slots__`` object:
+
+* the four digests (``cid``, ``receipt_hash``, ``prev_receipt_hash``, ``prev_cid``) as
+  raw 32-byte SHA-256 values packed into one ``bytes``;
+* ``ts`` as integer epoch seconds;
+* ``trace_id`` interned, so every index keyed by the same trace shares one string.
+
+Values that do not fit those encodings (a non-SHA-256 CID, an unexpected timestamp
+format) are kept verbatim, and keys missing from the record stay missing, so
+``to_wire()`` reproduces every record this server writes exactly, key order
+included.
+"""
+
+import sys
+import time
+from datetime import UTC, datetime
+from typing import Any
+
+_PREFIX = "sha256:"
+_DIGEST_FIELDS = ("cid", "receipt_hash", "prev_receipt_hash", "prev_cid")
+_WIRE_FIELDS = ("trace_id", "ts", *_DIGEST_FIELDS, "hop")
+_ALL_PRESENT = (1 << len(_WIRE_FIELDS)) - 1
+_TS_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def pack_digest(value: str) -> bytes | None:
+    """Raw digest for a canonical ``sha256:<64 lowercase hex>`` string, else None."""
+    if len(value) != 71 or not value.startswith(_PREFIX):
+        return None
+    try:
+        raw = bytes.fromhex(value[7:])
+    except ValueError:
+        return None
+    return raw if raw.hex() == value[7:] else None
+
+
+def unpack_digest(raw: bytes) -> str:
+    return _PREFIX + raw.hex()
+
+
+def _pack_ts(ts: Any) -> int | Any:
+    if isinstance(ts, str) and len(ts) == 20 and ts[10] == "T" and ts[19] == "Z":
+        try:
+            return int(datetime.fromisoformat(ts).replace(tzinfo=UTC).timestamp())
+        except ValueError:
+            return ts
+    return ts
+
+
+def _unpack_ts(ts: int | Any) -> Any:
+    return time.strftime(_TS_FORMAT, time.gmtime(ts)) if type(ts) is int else ts
+
+
+class CompactReceipt:
+    """Lossless, memory-lean receipt; convert with ``from_wire`` / ``to_wire``."""
+
+    __slots__ = ("_digests", "_keys", "_mask", "_raw", "hop", "normalized", "trace_id", "ts")
+
+    def __init__(self) -> None:
+        self.trace_id: str | Any = ""
+        self.ts: int | Any = 0
+        self.hop: Any = 0
+        self._digests = b""
+        self._mask = 0  # bit i set: digest field i present in _digests
+        self._raw: tuple[Any, ...] | None = None  # digest fields kept verbatim
+        self._keys = _ALL_PRESENT  # bit i set: _WIRE_FIELDS[i] is in the record
+        self.normalized: dict[str, Any] | None = None
+
+    @classmethod
+    def from_wire(cls, record: dict[str, Any], keep_normalized: bool = True) -> "CompactReceipt":
+        self = cls()
+        trace_id = record.get("trace_id")
+        self.trace_id = sys.intern(trace_id) if isinstance(trace_id, str) else trace_id
+        self.ts = _pack_ts(record.get("ts"))
+        self.hop = record.get("hop")
+        if any(n not in record for n in _WIRE_FIELDS):
+            self._keys = sum(1 << i for i, n in enumerate(_WIRE_FIELDS) if n in record)
+        packed: list[bytes] = []
+        for i, name in enumerate(_DIGEST_FIELDS):
+            value = record.get(name)
+            if value is None:
+                continue
+            raw = pack_digest(value) if isinstance(value, str) else None
+            if raw is None:
+                self._raw = tuple(record.get(n) for n in _DIGEST_FIELDS)
+                packed = []
+                self._mask = 0
+                break
+            packed.append(raw)
+            self._mask |= 1 << i
+        self._digests = b"".join(packed)
+        if keep_normalized:
+            self.normalized = record.get("normalized")
+        return self
+
+    def _digest(self, index: int) -> str | None:
+        if self._raw is not None:
+            return self._raw[index]
+        if not self._mask & (1 << index):
+            return None
+        slot = (self._mask & ((1 << index) - 1)).bit_count()
+        return unpack_digest(self._digests[slot * 32 : slot * 32 + 32])
+
+    @property
+    def cid(self) -> str | None:
+        return self._digest(0)
+
+    @property
+    def receipt_hash(self) -> str | None:
+        return self._digest(1)
+
+    @property
+    def prev_receipt_hash(self) -> str | None:
+        return self._digest(2)
+
+    @property
+    def prev_cid(self) -> str | None:
+        return self._digest(3)
+
+    def to_wire(self) -> dict[str, Any]:
+        """The record in the ``receipts.jsonl`` / API field order."""
+        out: dict[str, Any] = {
+            "trace_id": self.trace_id,
+            "ts": _unpack_ts(self.ts),
+            "cid": self.cid,
+            "receipt_hash": self.receipt_hash,
+            "prev_receipt_hash": self.prev_receipt_hash,
+            "prev_cid": self.prev_cid,
+            "hop": self.hop,
+        }
+        if self._keys != _ALL_PRESENT:
+            out = {k: v for i, (k, v) in enumerate(out.items()) if self._keys >> i & 1}
+        if self.normalized is not None:
+            out["normalized"] = self.normalized
+        return out
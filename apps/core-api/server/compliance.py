@@ -0,0 +1,253 @@
+"""Incrementally maintained aggregates behind the compliance reports.
+
+Receipt and ledger records are folded into per-trace and global counters as they are
+appended (via the log followers), so reports never rescan the logs and the dashboard
+is O(1) regardless of ledger size. Policy denials never reach either log, so their
+counters cover the lifetime of this process only.
+"""
+
+import threading
+from collections import Counter
+from typing import Any
+
+from .logtail import ledger_log, receipts_log
+from .utils import cid_for_json
+
+# Cap per-trace integrity findings so a corrupted trace cannot grow without bound.
+_MAX_ISSUES = 20
+
+
+class TraceStats:
+    __slots__ = (
+        "exchanges",
+        "first_ts",
+        "forward_hosts",
+        "head_hash",
+        "head_hop",
+        "issues",
+        "last_ts",
+        "payload_types",
+        "receipts",
+        "target_types",
+    )
+
+    def __init__(self) -> None:
+        self.clear_receipts()
+        self.clear_ledger()
+
+    def clear_receipts(self) -> None:
+        self.receipts = 0
+        self.head_hash: str | None = None
+        self.head_hop = 0
+        self.issues: list[dict[str, Any]] = []
+
+    def clear_ledger(self) -> None:
+        self.exchanges = 0
+        self.first_ts: str | None = None
+        self.last_ts: str | None = None
+        self.payload_types: Counter[str] = Counter()
+        self.target_types: Counter[str] = Counter()
+        self.forward_hosts: Counter[str] = Counter()
+
+    @property
+    def chain_ok(self) -> bool:
+        return not self.issues
+
+    def flag(self, hop: Any, issue: str) -> None:
+        if len(self.issues) < _MAX_ISSUES:
+            self.issues.append({"hop": hop, "issue": issue})
+
+
+class ComplianceAggregates:
+    """Per-trace and global counters, fed separately by the receipt and ledger logs."""
+
+    def __init__(self) -> None:
+        # The receipt shards and the ledger are synced from several threads at once.
+        self.lock = threading.Lock()
+        self.traces: dict[str, TraceStats] = {}
+        self.denied: Counter[str] = Counter()
+        self.allowed = 0
+        self.reset_receipts()
+        self.reset_ledger()
+
+    def _prune(self) -> None:
+        # Drop traces no longer backed by either log after a reset.
+        self.traces = {t: s for t, s in self.traces.items() if s.receipts or s.exchanges}
+
+    def reset_receipts(self) -> None:
+        for stats in self.traces.values():
+            stats.clear_receipts()
+        self._prune()
+        self.receipts = 0
+        self.broken_traces = 0
+
+    def reset_ledger(self) -> None:
+        for stats in self.traces.values():
+            stats.clear_ledger()
+        self._prune()
+        self.exchanges = 0
+        self.payload_types: Counter[str] = Counter()
+        self.forward_hosts: Counter[str] = Counter()
+
+    def _trace(self, trace_id: str) -> TraceStats:
+        stats = self.traces.get(trace_id)
+        if stats is None:
+            stats = self.traces[trace_id] = TraceStats()
+        return stats
+
+    def apply_receipt(self, record: dict[str, Any]) -> None:
+        trace_id = record.get("trace_id")
+        if not isinstance(trace_id, str):
+            return
+        stats = self._trace(trace_id)
+        was_ok = stats.chain_ok
+        hop = record.get("hop")
+        prev = record.get("prev_receipt_hash")
+        if prev != stats.head_hash:
+            stats.flag(hop, "prev_receipt_hash_mismatch")
+        if hop != stats.head_hop + 1:
+            stats.flag(hop, "hop_out_of_sequence")
+        expected = cid_for_json(
+            {"ts": record.get("ts"), "cid": record.get("cid"), "prev": prev, "hop": hop}
+        )
+        if record.get("receipt_hash") != expected:
+            stats.flag(hop, "receipt_hash_mismatch")
+        if was_ok and not stats.chain_ok:
+            self.broken_traces += 1
+        stats.receipts += 1
+        stats.head_hash = record.get("receipt_hash")
+        stats.head_hop = hop if isinstance(hop, int) else stats.head_hop
+        self.receipts += 1
+
+    def apply_ledger(self, entry: dict[str, Any]) -> None:
+        trace_id = entry.get("trace_id")
+        if not isinstance(trace_id, str):
+            return
+        stats = self._trace(trace_id)
+        ts = entry.get("ts")
+        if isinstance(ts, str):
+            stats.first_ts = stats.first_ts or ts
+            stats.last_ts = ts
+        payload_type = entry.get("payload_type")
+        if isinstance(payload_type, str):
+            stats.payload_types[payload_type] += 1
+            self.payload_types[payload_type] += 1
+        target_type = entry.get("target_type")
+        if isinstance(target_type, str):
+            stats.target_types[target_type] += 1
+        host = entry.get("forward_host")
+        if isinstance(host, str):
+            stats.forward_hosts[host] += 1
+            self.forward_hosts[host] += 1
+        stats.exchanges += 1
+        self.exchanges += 1
+
+
+class _ReceiptFeed:
+    def __init__(self, agg: ComplianceAggregates):
+        self._agg = agg
+
+    def reset(self) -> None:
+        with self._agg.lock:
+            self._agg.reset_receipts()
+
+    def apply(self, offset: int, record: dict[str, Any]) -> None:
+        with self._agg.lock:
+            self._agg.apply_receipt(record)
+
+
+class _LedgerFeed:
+    def __init__(self, agg: ComplianceAggregates):
+        self._agg = agg
+
+    def reset(self) -> None:
+        with self._agg.lock:
+            self._agg.reset_ledger()
+
+    def apply(self, offset: int, record: dict[str, Any]) -> None:
+        with self._agg.lock:
+            self._agg.apply_ledger(record)
+
+
+_agg = ComplianceAggregates()
+_attached = False
+_decisions_lock = threading.Lock()  # exchanges run on several shard writer threads
+
+
+def warm() -> None:
+    """Attach to the logs on first use, then fold in anything appended since.
+
+    Exchanges only pay for these aggregates once a compliance report has been asked
+    for (or ``SP_COMPLIANCE_WARM_ON_STARTUP`` is set).
+    """
+    global _attached
+    if not _attached:
+        _attached = True
+        receipts_log.subscribe(_ReceiptFeed(_agg))
+        ledger_log.subscribe(_LedgerFeed(_agg))
+    receipts_log.sync()
+    ledger_log.sync()
+
+
+def record_decision(allowed: bool, reason: str) -> None:
+    """Count a HEL policy decision (denials never reach the logs)."""
+    with _decisions_lock:
+        if allowed:
+            _agg.allowed += 1
+        else:
+            _agg.denied[reason] += 1
+
+
+def denials() -> dict[str, Any]:
+    """Policy denial counts and rates, snapshotted under the decisions lock."""
+    with _decisions_lock:
+        allowed = _agg.allowed
+        by_reason = dict(_agg.denied)
+    denied = sum(by_reason.values())
+    decided = denied + allowed
+    return {
+        "window": "process",
+        "total": denied,
+        "rate": denied / decided if decided else 0.0,
+        "by_reason": {
+            reason: {"count": n, "rate": n / decided} for reason, n in by_reason.items()
+        },
+    }
+
+
+def dashboard() -> dict[str, Any]:
+    warm()
+    with _agg.lock:
+        totals = {
+            "traces": len(_agg.traces),
+            "exchanges": _agg.exchanges,
+            "receipts": _agg.receipts,
+            "broken_chains": _agg.broken_traces,
+            "payload_types": dict(_agg.payload_types),
+            "forward_hosts": dict(_agg.forward_hosts),
+        }
+    return {**totals, "denials": denials()}
+
+
+def trace_stats(trace_id: str) -> dict[str, Any] | None:
+    """A plain-dict copy of one trace's counters; None if no receipt of it is known.
+
+    Copied under the aggregates lock, since shard threads keep updating the live ones.
+    """
+    warm()
+    with _agg.lock:
+        stats = _agg.traces.get(trace_id)
+        if stats is None or not stats.receipts:
+            return None
+        return {
+            "exchanges": stats.exchanges,
+            "first_ts": stats.first_ts,
+            "last_ts": stats.last_ts,
+            "payload_types": dict(stats.payload_types),
+            "target_types": dict(stats.target_types),
+            "forward_hosts": dict(stats.forward_hosts),
+            "receipts": stats.receipts,
+            "head_hop": stats.head_hop,
+            "head_hash": stats.head_hash,
+            "issues": list(stats.issues),
+        }
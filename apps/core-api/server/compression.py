@@ -0,0 +1,173 @@
+"""Negotiated compression of chain and export responses.
+
+``Accept-Encoding`` picks ``zstd`` (when the optional ``zstandard`` package is
+installed, the ``compression`` extra) or ``gzip``, and zstd wins a tie. Bodies smaller
+than ``SP_COMPRESSION_MIN_BYTES`` go out as is: for those, the header bytes and CPU
+cost more than they save. A ``Representation`` keeps the encodings it has produced,
+so a cached body is compressed once per encoding. The export endpoint caches
+representations (see ``routes.v1.receipts``).
+
+``signet_compression_{input,output}_bytes_total`` show the bandwidth saved,
+``signet_compression_seconds_total`` the CPU spent, and
+``signet_compression_saved_seconds_total`` the CPU a cached encoding saved.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import importlib
+import time
+from dataclasses import dataclass, field
+from types import ModuleType
+
+from fastapi import Response
+
+from .metrics import observe_compression
+from .settings import settings
+
+GZIP = "gzip"
+ZSTD = "zstd"
+IDENTITY = "identity"
+
+_zstd: ModuleType | None = None
+_zstd_checked = False
+
+
+def _zstandard() -> ModuleType | None:
+    global _zstd, _zstd_checked
+    if not _zstd_checked:
+        try:
+            _zstd = importlib.import_module("zstandard")
+        except ImportError:
+            _zstd = None
+        _zstd_checked = True
+    return _zstd
+
+
+def available() -> list[str]:
+    """Supported content codings, in server preference order."""
+    return [ZSTD, GZIP] if _zstandard() is not None else [GZIP]
+
+
+def negotiate(accept_encoding: str | None) -> str:
+    """Content coding for an ``Accept-Encoding`` header; ``identity`` if none fits."""
+    if not accept_encoding:
+        return IDENTITY
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, *params = item.split(";")
+        q = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding.strip().lower()] = q
+    best, best_q = IDENTITY, 0.0
+    for coding in available():
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == ZSTD:
+        level = settings.zstd_level
+        return _zstandard().ZstdCompressor(level=level).compress(data)  # type: ignore[union-attr]
+    # mtime=0 keeps the output (and so a cached body) byte-for-byte reproducible.
+    return gzip.compress(data, compresslevel=settings.gzip_level, mtime=0)
+
+
+@dataclass(slots=True)
+class Representation:
+    """A response body and the encodings of it produced so far."""
+
+    content: bytes
+    media_type: str
+    etag: str = field(init=False)
+    _encoded: dict[str, tuple[bytes, float]] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self.etag = '"' + hashlib.blake2b(self.content, digest_size=16).hexdigest() + '"'
+
+    @property
+    def size(self) -> int:
+        return len(self.content) + sum(len(body) for body, _ in self._encoded.values())
+
+    def encoded(self, encoding: str, endpoint: str) -> bytes:
+        """The body in ``encoding``, compressed on first use and kept for the next."""
+        cached = self._encoded.get(encoding)
+        if cached is not None:
+            body, seconds = cached
+            observe_compression(endpoint, encoding, len(self.content), len(body), seconds, True)
+            return body
+        start = time.perf_counter()
+        body = compress(self.content, encoding)
+        seconds = time.perf_counter() - start
+        self._encoded[encoding] = (body, seconds)
+        observe_compression(endpoint, encoding, len(self.content), len(body), seconds, False)
+        return body
+
+
+def _vary(headers: dict[str, str]) -> dict[str, str]:
+    vary = headers.get("Vary")
+    return {**headers, "Vary": f"{vary}, Accept-Encoding" if vary else "Accept-Encoding"}
+
+
+def _matches(rep: Representation, if_none_match: str | None) -> bool:
+    # Weak comparison, as RFC 9110 asks of If-None-Match.
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or rep.etag in tags
+
+
+def respond(
+    rep: Representation,
+    endpoint: str,
+    accept_encoding: str | None,
+    if_none_match: str | None = None,
+    headers: dict[str, str] | None = None,
+) -> Response:
+    """``rep`` in the negotiated coding, or 304 if the client already has it.
+
+    Small bodies are sent uncompressed. The ETag names the content, so a compressed
+    body carries it as a weak validator.
+    """
+    headers = _vary(headers or {})
+    if _matches(rep, if_none_match):
+        return Response(status_code=304, headers={**headers, "ETag": rep.etag})
+    encoding = negotiate(accept_encoding)
+    if encoding == IDENTITY or len(rep.content) < settings.compression_min_bytes:
+        observe_compression(endpoint, IDENTITY, len(rep.content), len(rep.content), 0.0, False)
+        headers["ETag"] = rep.etag
+        return Response(content=rep.content, media_type=rep.media_type, headers=headers)
+    body = rep.encoded(encoding, endpoint)
+    headers["Content-Encoding"] = encoding
+    headers["ETag"] = "W/" + rep.etag
+    return Response(content=body, media_type=rep.media_type, headers=headers)
+
+
+
+async def respond_async(
+    rep: Representation,
+    endpoint: str,
+    accept_encoding: str | None,
+    if_none_match: str | None = None,
+    headers: dict[str, str] | None = None,
+) -> Response:
+    """``respond`` for the event loop; a compression not yet cached runs in a thread."""
+    encoding = negotiate(accept_encoding)
+    if (
+        encoding == IDENTITY
+        or encoding in rep._encoded
+        or len(rep.content) < settings.compression_min_bytes
+        or _matches(rep, if_none_match)
+    ):
+        return respond(rep, endpoint, accept_encoding, if_none_match, headers)
+    return await asyncio.to_thread(
+        respond, rep, endpoint, accept_encoding, if_none_match, headers
+    )
@@ -0,0 +1,134 @@
+"""In-process broadcast of newly appended receipts and ledger entries.
+
+Log-follower subscribers publish each record appended after startup to every
+matching subscriber queue. Queues are bounded: a subscriber that falls behind is
+marked as overflowed and dropped (it receives a final ``overflow`` event and is
+expected to reconnect and refetch), so a slow client never blocks writers or grows
+memory without bound.
+
+Records are published from whichever thread synced the log: the shard executors,
+the replica poller or the event loop itself. Each subscriber remembers its event
+loop, and records from other threads reach its queue through
+``call_soon_threadsafe``, since ``asyncio.Queue`` is not thread-safe.
+"""
+
+import asyncio
+import contextlib
+import os
+from typing import Any
+
+from .logtail import LogFollower, ledger_log, receipts_log
+from .metrics import observe_event_drop, observe_event_subscribers
+from .settings import settings
+
+EVENT_KINDS = ("receipt", "ledger")
+
+
+class Subscriber:
+    __slots__ = ("kinds", "loop", "overflowed", "payload_type", "queue", "trace_id")
+
+    def __init__(
+        self,
+        trace_id: str | None,
+        payload_type: str | None,
+        kinds: frozenset[str],
+        buffer_size: int,
+    ):
+        self.trace_id = trace_id
+        self.payload_type = payload_type
+        self.kinds = kinds
+        self.queue: asyncio.Queue[tuple[str, int, dict[str, Any]]] = asyncio.Queue(buffer_size)
+        self.overflowed = False
+        self.loop = asyncio.get_running_loop()
+
+    def matches(self, kind: str, record: dict[str, Any]) -> bool:
+        if kind not in self.kinds:
+            return False
+        if self.trace_id is not None and record.get("trace_id") != self.trace_id:
+            return False
+        # Receipts carry no payload_type, so that filter selects ledger entries only.
+        return self.payload_type is None or record.get("payload_type") == self.payload_type
+
+    def deliver(self, event: tuple[str, int, dict[str, Any]]) -> None:
+        try:
+            on_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._put(event)
+            return
+        # A closed loop has nobody left listening.
+        with contextlib.suppress(RuntimeError):
+            self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: tuple[str, int, dict[str, Any]]) -> None:
+        # Runs on the subscriber's loop, so the drop decision sees the real queue.
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow consumer: stop feeding it rather than buffering without bound.
+            self.overflowed = True
+            observe_event_drop()
+
+
+class Broadcaster:
+    def __init__(self) -> None:
+        self._subscribers: set[Subscriber] = set()
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(
+        self,
+        trace_id: str | None = None,
+        payload_type: str | None = None,
+        kinds: frozenset[str] = frozenset(EVENT_KINDS),
+    ) -> Subscriber:
+        sub = Subscriber(trace_id, payload_type, kinds, settings.events_buffer_size)
+        self._subscribers.add(sub)
+        observe_event_subscribers(len(self._subscribers))
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        self._subscribers.discard(sub)
+        observe_event_subscribers(len(self._subscribers))
+
+    def publish(self, kind: str, offset: int, record: dict[str, Any]) -> None:
+        for sub in tuple(self._subscribers):
+            if not sub.overflowed and sub.matches(kind, record):
+                sub.deliver((kind, offset, record))
+
+
+class _EventFeed:
+    """Log subscriber that publishes records appended after it (re)started."""
+
+    def __init__(self, kind: str, log: LogFollower, broadcaster: Broadcaster):
+        self._kind = kind
+        self._log = log
+        self._broadcaster = broadcaster
+        self._live_from = 0
+
+    def reset(self) -> None:
+        # A (re)played log is history, not news: only publish what lands afterwards.
+        try:
+            self._live_from = os.path.getsize(self._log.path)
+        except OSError:
+            self._live_from = 0
+
+    def apply(self, offset: int, record: dict[str, Any]) -> None:
+        if offset >= self._live_from and len(self._broadcaster):
+            self._broadcaster.publish(self._kind, offset, record)
+
+
+broadcaster = Broadcaster()
+# Offsets are per file, so each receipt shard gets its own feed.
+receipts_log.subscribe_each(lambda log: _EventFeed("receipt", log, broadcaster))
+ledger_log.subscribe(_EventFeed("ledger", ledger_log, broadcaster))
+
+
+def poll_logs() -> None:
+    """Pick up appends made by other processes sharing the data directory."""
+    receipts_log.sync()
+    ledger_log.sync()
@@ -0,0 +1,84 @@
+"""Pure ASGI middleware recording per-route HTTP request metrics.
+
+Requests are labelled by the matched route template (``/v1/receipts/chain/{trace_id}``)
+rather than the raw path, so ids in URLs do not create new time series. Paths that
+match no route share one label, and the number of distinct templates is capped as a
+backstop against mounted sub-apps or dynamically registered routes.
+"""
+
+import re
+import time
+from typing import Any
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import startup
+from .metrics import observe_http_request
+from .settings import settings
+
+UNMATCHED = "<unmatched>"
+OTHER = "<other>"
+
+_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+_PARAM = re.compile(r"{([^}:]+)(?::[^}]+)?}")
+
+
+def route_template(scope: Scope) -> str | None:
+    """Return the matched route's path template, including any router prefix."""
+    route: Any = scope.get("route")
+    path_format = getattr(route, "path_format", None) or getattr(route, "path", None)
+    if not isinstance(path_format, str):
+        return None
+    # Routes served through an included router may only know their own part of the
+    # template; recover the prefix from the part of the URL in front of it.
+    params = scope.get("path_params") or {}
+    concrete = _PARAM.sub(
+        lambda m: str(params.get(m.group(1), m.group(0))), getattr(route, "path", path_format)
+    )
+    path = scope.get("path", "")
+    if path != concrete and path.endswith(concrete):
+        return path[: len(path) - len(concrete)] + path_format
+    return path_format
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp, max_paths: int | None = None) -> None:
+        self.app = app
+        self.max_paths = settings.http_metrics_max_paths if max_paths is None else max_paths
+        self._paths: set[str] = set()
+
+    def _path_label(self, scope: Scope) -> str:
+        template = route_template(scope)
+        if template is None:
+            return UNMATCHED
+        if template not in self._paths:
+            if len(self._paths) >= self.max_paths:
+                return OTHER
+            self._paths.add(template)
+        return template
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if startup.time_to_first_request is None:
+                startup.first_request_done(scope["path"])
+            method = scope["method"]
+            observe_http_request(
+                method if method in _METHODS else "other",
+                self._path_label(scope),
+                status,
+                time.perf_counter() - start,
+            )
@@ -0,0 +1,103 @@
+"""Idempotency records shared by every worker through ``idempotency.jsonl``.
+
+The log is the source of truth; each process keeps a read-through cache fed by a
+log follower, so a response stored by one worker is replayed by all of them. A
+``claim`` serializes concurrent first requests for the same key across processes:
+the loser waits, re-reads the log and replays the winner's response.
+
+When the body is in the blob store, a stored response keeps ``null`` in place of
+its ``normalized`` bodies and names the blob (``"blob": <cid>``); they are joined
+back, in their original positions, when the response is replayed.
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from . import blobs
+from .logtail import LogFollower
+from .settings import settings
+from .storage import append_jsonl, named_lock
+
+_cache: dict[str, dict[str, Any]] = {}
+_blob_of: dict[str, str] = {}  # key -> CID of the body stripped from its response
+
+
+class _IdempotencyIndex:
+    def reset(self) -> None:
+        _cache.clear()
+        _blob_of.clear()
+
+    def apply(self, offset: int, record: dict[str, Any]) -> None:
+        key = record.get("key")
+        response = record.get("response")
+        # First record wins, matching the claim protocol.
+        if isinstance(key, str) and isinstance(response, dict) and key not in _cache:
+            _cache[key] = response
+            if isinstance(record.get("blob"), str):
+                _blob_of[key] = record["blob"]
+
+
+idempotency_log = LogFollower(lambda: settings.idempotency_path)
+idempotency_log.subscribe(_IdempotencyIndex())
+
+
+def warm() -> None:
+    idempotency_log.sync()
+
+
+def _hydrate(key: str) -> dict[str, Any] | None:
+    response = _cache.get(key)
+    cid = _blob_of.get(key)
+    if response is None or cid is None:
+        return response
+    normalized = blobs.joined({"cid": cid}).get("normalized")
+    receipt = response.get("receipt")
+    out = {**response, "normalized": normalized}
+    if isinstance(receipt, dict):
+        out["receipt"] = {**receipt, "normalized": normalized}
+    return out
+
+
+def _strip(response: dict[str, Any]) -> tuple[dict[str, Any], str | None]:
+    receipt = response.get("receipt")
+    if not settings.blob_store_enabled or not isinstance(receipt, dict):
+        return response, None
+    cid = receipt.get("cid")
+    if not isinstance(cid, str) or blobs.get_bytes(cid) is None:
+        return response, None
+    # Keep the keys (as null) so the replayed body has the original field order.
+    stripped = {**response, "receipt": {**receipt, "normalized": None}}
+    if "normalized" in response:
+        stripped["normalized"] = None
+    return stripped, cid
+
+
+def lookup(key: str) -> dict[str, Any] | None:
+    """Return the stored response for ``key``, checking other workers' writes on a miss."""
+    if key not in _cache:
+        idempotency_log.sync()
+    return _hydrate(key)
+
+
+def is_cached(key: str) -> bool:
+    """Cheap in-memory check (no log read) used to prioritise replays."""
+    return key in _cache
+
+
+@contextmanager
+def claim(key: str) -> Iterator[dict[str, Any] | None]:
+    """Exclusively hold ``key``; yields the stored response if it was already used."""
+    with named_lock("idempotency", key):
+        idempotency_log.sync()
+        yield _hydrate(key)
+
+
+def store(key: str, response: dict[str, Any]) -> None:
+    """Persist the response for ``key`` (call while holding its claim)."""
+    stripped, cid = _strip(response)
+    record: dict[str, Any] = {"key": key, "response": stripped}
+    if cid is not None:
+        record["blob"] = cid
+    append_jsonl(settings.idempotency_path, record)
+    idempotency_log.sync()
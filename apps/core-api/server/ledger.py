@@ -1,14 +1,9 @@
 # ruff: noqa: I001
-import json
-import os
 import time
 
+from .logtail import ledger_log
 from .settings import settings
-
-def append_jsonl(path: str, obj: dict[str, object]) -> None:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "a", encoding="utf-8") as f:
-        f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+from .storage import append_jsonl
 
 def write_ledger_entry(
     trace_id: str,
@@ -16,6 +11,7 @@ def write_ledger_entry(
     payload_type: str,
     target_type: str | None,
     cid: str,
+    forward_host: str | None = None,
 ) -> None:
     entry = {
         "trace_id": trace_id,
@@ -24,5 +20,7 @@ def write_ledger_entry(
         "payload_type": payload_type,
         "target_type": target_type,
         "cid": cid,
+        "forward_host": forward_host,
     }
     append_jsonl(settings.ledger_path, entry)
+    ledger_log.sync()
@@ -0,0 +1,114 @@
+"""Secondary indexes over ``ledger.jsonl`` for the ledger query API.
+
+Entries are identified by their sequence number (line position in the log). The index
+keeps only byte offsets plus posting lists per ``payload_type``, ``cid`` and
+``trace_id``; every posting list, and the global time index, is ordered by
+``(ts, seq)`` so a time range is a bisect and pagination resumes from a cursor key.
+Matching entries are read back from disk by offset.
+"""
+
+import bisect
+import json
+import sys
+from array import array
+from collections.abc import Iterator
+from typing import Any
+
+from .logtail import ledger_log
+from .mmapread import mapped, read_line_at
+from .settings import settings
+
+SortKey = tuple[str, int]
+
+
+class LedgerIndex:
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.offsets = array("q")
+        self.ts: list[str] = []
+        self.by_ts: list[int] = []
+        self.by_payload_type: dict[str, list[int]] = {}
+        self.by_cid: dict[str, list[int]] = {}
+        self.by_trace: dict[str, list[int]] = {}
+
+    def _key(self, seq: int) -> SortKey:
+        return self.ts[seq], seq
+
+    def _insert(self, postings: list[int], seq: int) -> None:
+        # Appends arrive almost sorted by ts, so this is usually a plain append.
+        if not postings or self._key(postings[-1]) <= self._key(seq):
+            postings.append(seq)
+        else:
+            bisect.insort(postings, seq, key=self._key)
+
+    def apply(self, offset: int, record: dict[str, Any]) -> None:
+        seq = len(self.offsets)
+        self.offsets.append(offset)
+        self.ts.append(sys.intern(str(record.get("ts") or "")))
+        self._insert(self.by_ts, seq)
+        for field, postings in (
+            ("payload_type", self.by_payload_type),
+            ("cid", self.by_cid),
+            ("trace_id", self.by_trace),
+        ):
+            value = record.get(field)
+            if isinstance(value, str):
+                self._insert(postings.setdefault(sys.intern(value), []), seq)
+
+    def query(
+        self,
+        *,
+        payload_type: str | None = None,
+        cid: str | None = None,
+        trace_id: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        after: SortKey | None = None,
+    ) -> Iterator[tuple[SortKey, dict[str, Any]]]:
+        """Yield ``(sort_key, entry)`` for matching entries in ``(ts, seq)`` order."""
+        filters = {"payload_type": payload_type, "cid": cid, "trace_id": trace_id}
+        candidates = self.by_ts
+        for field, postings in (
+            ("payload_type", self.by_payload_type),
+            ("cid", self.by_cid),
+            ("trace_id", self.by_trace),
+        ):
+            value = filters[field]
+            if value is not None:
+                lst = postings.get(value, [])
+                if len(lst) < len(candidates) or candidates is self.by_ts:
+                    candidates = lst
+        start = 0
+        if since is not None:
+            start = bisect.bisect_left(candidates, (since, -1), key=self._key)
+        if after is not None:
+            start = max(start, bisect.bisect_right(candidates, after, key=self._key))
+        if start >= len(candidates):
+            return
+        with mapped(settings.ledger_path) as mm:
+            if mm is None:
+                return
+            for i in range(start, len(candidates)):
+                seq = candidates[i]
+                key = self._key(seq)
+                if until is not None and key[0] > until:
+                    return
+                entry = json.loads(read_line_at(mm, self.offsets[seq]))
+                if all(v is None or entry.get(k) == v for k, v in filters.items()):
+                    yield key, entry
+
+
+_index = LedgerIndex()
+ledger_log.subscribe(_index)
+
+
+def warm() -> None:
+    """Build the ledger indexes from the log (called at startup)."""
+    ledger_log.sync()
+
+
+def query_ledger(**kwargs: Any) -> Iterator[tuple[SortKey, dict[str, Any]]]:
+    ledger_log.sync()
+    return _index.query(**kwargs)
@@ -0,0 +1,282 @@
+"""Incremental followers for the append-only JSONL logs.
+
+In-memory indexes (trace filter, chain heads, ledger indexes, ...) subscribe to a
+``LogFollower`` instead of scanning the files themselves. The follower remembers the
+byte offset it has consumed and, on ``sync()``, parses only the lines appended since,
+so indexes stay current with writes from this process and from any other process
+sharing the data directory.
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack, contextmanager
+from typing import Any, Protocol
+
+from . import shards
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+_READ_CHUNK = 8 << 20  # bytes parsed per read when catching up
+
+
+class LogSubscriber(Protocol):
+    def reset(self) -> None: ...
+
+    def apply(self, offset: int, record: dict[str, Any]) -> None: ...
+
+
+class LogFollower:
+    """Tail a JSONL file and fan each new record out to its subscribers.
+
+    ``path_fn`` is re-evaluated on every sync so that a changed settings path (tests,
+    replicas) or a truncated/replaced file resets the subscribers and replays the log.
+    """
+
+    def __init__(self, path_fn: Callable[[], str]):
+        self._path_fn = path_fn
+        self._path: str | None = None
+        self._ino: int | None = None
+        self.offset = 0
+        self._subscribers: list[LogSubscriber] = []
+        # Writers on different traces may sync from several threads at once.
+        self._lock = threading.RLock()
+
+    @property
+    def path(self) -> str:
+        return self._path_fn()
+
+    def subscribe(self, subscriber: LogSubscriber) -> None:
+        with self._lock:
+            self._subscribe(subscriber)
+
+    def _subscribe(self, subscriber: LogSubscriber) -> None:
+        self._subscribers.append(subscriber)
+        if self.offset:
+            # Late subscribers must see the whole log; replay what the others have
+            # already consumed to the newcomer only.
+            subscriber.reset()
+            try:
+                self._read(self._path or self.path, 0, self.offset, [subscriber])
+            except OSError:
+                self._reset()
+
+    def _reset(self) -> None:
+        self.offset = 0
+        self._ino = None
+        for sub in self._subscribers:
+            sub.reset()
+
+    def sync(self) -> int:
+        """Consume lines appended since the last sync; return the number applied."""
+        if self._caught_up():
+            return 0
+        with self._lock:
+            return self._sync()
+
+    def _caught_up(self) -> bool:
+        # Lock-free check for the common case of nothing new. The fields may be read
+        # mid-update; any doubt falls through to the locked sync.
+        path = self._path
+        if path is None or path != self._path_fn():
+            return False
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return False
+        return st.st_ino == self._ino and st.st_size == self.offset
+
+    def _sync(self) -> int:
+        path = self._path_fn()
+        if path != self._path:
+            self._path = path
+            self._reset()
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            if self.offset:
+                self._reset()
+            return 0
+        if (self._ino is not None and st.st_ino != self._ino) or st.st_size < self.offset:
+            self._reset()
+        self._ino = st.st_ino
+        if st.st_size == self.offset:
+            return 0
+        applied, end = self._read(path, self.offset, st.st_size, self._subscribers)
+        self.offset += end
+        return applied
+
+    @staticmethod
+    def _read(
+        path: str, start: int, size: int, subscribers: list[LogSubscriber]
+    ) -> tuple[int, int]:
+        """Apply complete lines in ``[start, size)``; returns (applied, bytes consumed).
+
+        The range is read ``_READ_CHUNK`` bytes at a time, so replaying a large log
+        does not hold all of it in memory.
+        """
+        applied = 0
+        pos = start
+        carry = b""
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = size - start
+            while remaining > 0:
+                data = f.read(min(_READ_CHUNK, remaining))
+                if not data:
+                    break
+                remaining -= len(data)
+                chunk = carry + data
+                # Only consume complete lines; a concurrent writer may be mid-append.
+                end = chunk.rfind(b"\n") + 1
+                carry = chunk[end:]
+                for raw in chunk[:end].splitlines(keepends=True):
+                    line_offset = pos
+                    pos += len(raw)
+                    try:
+                        rec = json.loads(raw)
+                    except ValueError as exc:  # pragma: no cover - skip malformed lines
+                        logger.debug(
+                            "Skipping malformed line at %s:%d: %s", path, line_offset, exc
+                        )
+                        continue
+                    if not isinstance(rec, dict):
+                        continue
+                    for sub in subscribers:
+                        sub.apply(line_offset, rec)
+                    applied += 1
+        return applied, pos - start
+
+
+class _ShardResetError(Exception):
+    """Raised out of one shard's sync when it must be replayed (see ``ShardedLog``)."""
+
+
+class ShardedLog:
+    """One ``LogFollower`` per receipt shard (see ``shards``) behind the same interface.
+
+    Subscribers receive the records of every shard; offsets are positions within the
+    record's own shard file. ``sync(trace_id)`` catches up on that trace's shard only,
+    which is all a write or chain read needs, under that shard's lock alone: syncs of
+    different shards run in parallel, so subscribers must accept ``apply`` calls from
+    several threads at once (records of one trace always come from one shard, in
+    order). Indexes spanning every trace cannot be rebuilt one shard at a time, so a
+    reset of any shard (replaced file, changed path or shard count) aborts that sync,
+    and every shard is then reset and replayed while all their locks are held.
+
+    ``subscribe_each`` attaches a subscriber per shard instead, for consumers that
+    care about offsets within one file (the event feed).
+    """
+
+    def __init__(self) -> None:
+        self._subscribers: list[LogSubscriber] = []
+        self._factories: list[Callable[[LogFollower], LogSubscriber]] = []
+        self._shards: list[LogFollower] = []
+        self._resetting = False
+        # Guards the shard list and subscribers. Taken before the shards' own locks,
+        # never while holding one, so a one-shard sync cannot deadlock with a reset.
+        self._lock = threading.RLock()
+
+    def _followers(self) -> list[LogFollower]:
+        n = shards.count()
+        if len(self._shards) != n:
+            self._shards = []
+            for i in range(n):
+                follower = LogFollower(functools.partial(shards.path, i))
+                follower.subscribe(_ShardFeed(self))
+                for factory in self._factories:
+                    follower.subscribe(factory(follower))
+                self._shards.append(follower)
+            for sub in self._subscribers:
+                sub.reset()
+        return self._shards
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[list[LogFollower]]:
+        """Hold every shard still, for a reset or a replay to a new subscriber."""
+        with self._lock, ExitStack() as held:
+            followers = self._followers()
+            for f in followers:
+                held.enter_context(f._lock)
+            yield followers
+
+    def subscribe(self, subscriber: LogSubscriber) -> None:
+        with self._exclusive() as followers:
+            self._subscribers.append(subscriber)
+            if not any(f.offset for f in followers):
+                return
+            # Replay what has been consumed so far to the newcomer only.
+            subscriber.reset()
+            for f in followers:
+                if f.offset:
+                    try:
+                        f._read(f._path or f.path, 0, f.offset, [subscriber])
+                    except OSError:
+                        self._reset_all()
+                        return
+
+    def subscribe_each(self, factory: Callable[[LogFollower], LogSubscriber]) -> None:
+        with self._exclusive() as followers:
+            self._factories.append(factory)
+            try:
+                for follower in followers:
+                    follower.subscribe(factory(follower))
+            except _ShardResetError:
+                self._reset_all()
+
+    def _reset_all(self) -> None:
+        # Called with every shard held (``_exclusive``).
+        if self._resetting:
+            return
+        self._resetting = True
+        try:
+            for f in self._shards:
+                f._path = f.path  # a changed path is handled here, once for all shards
+                f._reset()
+            for sub in self._subscribers:
+                sub.reset()
+        finally:
+            self._resetting = False
+
+    def positions(self) -> list[tuple[str, int]]:
+        """``(path, bytes consumed)`` of every shard."""
+        with self._lock:
+            return [(f.path, f.offset) for f in self._followers()]
+
+    def sync(self, trace_id: str | None = None) -> int:
+        """Consume new lines of ``trace_id``'s shard, or of every shard; return the count."""
+        followers = self._shards
+        if len(followers) != shards.count():
+            with self._lock:
+                followers = self._followers()
+        if trace_id is not None:
+            followers = [followers[shards.shard_of(trace_id, len(followers))]]
+        try:
+            return sum(f.sync() for f in followers)
+        except _ShardResetError:
+            with self._exclusive() as followers:
+                self._reset_all()
+                return sum(f.sync() for f in followers)
+
+
+class _ShardFeed:
+    """Forwards one shard's records to the ``ShardedLog`` subscribers."""
+
+    def __init__(self, log: ShardedLog):
+        self._log = log
+
+    def reset(self) -> None:
+        if not self._log._resetting:
+            raise _ShardResetError
+
+    def apply(self, offset: int, record: dict[str, Any]) -> None:
+        for sub in self._log._subscribers:
+            sub.apply(offset, record)
+
+
+receipts_log = ShardedLog()
+ledger_log = LogFollower(lambda: settings.ledger_path)
@@ -1,14 +1,69 @@
-import time
+import asyncio
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from fastapi.responses import JSONResponse
 
+from . import (
+    idempotency,
+    ledger_index,
+    replica,
+    security,
+    shards,
+    startup,
+    trace_index,
+)
+from .admission import AdmissionMiddleware
+from .http_metrics import MetricsMiddleware
+from .metrics import mark_process_dead, render_latest
+from .replica import ReplicaMiddleware
 from .routes import router as api_router
+from .settings import settings
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Build in-memory lookup structures before serving traffic; /readyz reports 503
+    # until every phase has run.
+    startup.begin()
+    with startup.phase("signing_key"):
+        security.get_signing_key()
+        security.jwks_bytes()
+    with startup.phase("trace_index"):
+        shards.check_layout()
+        trace_index.warm()
+    with startup.phase("ledger_index"):
+        ledger_index.warm()
+    with startup.phase("idempotency"):
+        idempotency.warm()
+    if settings.compliance_warm_on_startup:
+        with startup.phase("compliance"):
+            from . import compliance  # only loaded when reports are asked for
+
+            compliance.warm()
+    if settings.replica:
+        with startup.phase("replication"):
+            # Catch up once before serving; failures are logged and retried by the poller.
+            await asyncio.to_thread(replica.poll)
+        replica.start()
+    startup.mark_ready()
+    yield
+    await replica.stop()
+    shards.shutdown()
+    mark_process_dead()
+
+app = FastAPI(title="Signet Protocol Core API", version="0.1.0", lifespan=lifespan)
 
-app = FastAPI(title="Signet Protocol Core API", version="0.1.0")
+# Shed excess exchanges before they queue on the event loop
+app.add_middleware(AdmissionMiddleware)
 
-# CORS (restrict in production)
+# Read replicas refuse exchanges and report their lag on every response
+if settings.replica:
+    app.add_middleware(ReplicaMiddleware)
+
+# CORS (restrict in production). Added after the middlewares above so it wraps them
+# and their 503s carry CORS headers too
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -17,32 +72,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Prometheus metrics
-REQUEST_COUNT = Counter(
-    "signet_http_requests_total", "HTTP requests", ["method", "path", "status"]
-)
-REQUEST_LATENCY = Histogram(
-    "signet_http_request_latency_seconds", "Latency", ["path"]
-)
-
-@app.middleware("http")
-async def metrics_middleware(request: Request, call_next):
-    start = time.time()
-    response = await call_next(request)
-    elapsed = time.time() - start
-    path = request.url.path
-    REQUEST_LATENCY.labels(path=path).observe(elapsed)
-    REQUEST_COUNT.labels(method=request.method, path=path, status=response.status_code).inc()
-    return response
+# Prometheus HTTP metrics, labelled by route template
+app.add_middleware(MetricsMiddleware)
 
 @app.get("/healthz")
 async def healthz():
     return {"ok": True, "service": "signet-core-api"}
 
+@app.get("/readyz")
+async def readyz():
+    body = {"ready": startup.ready, "phases": startup.phases}
+    return JSONResponse(body, status_code=200 if startup.ready else 503)
+
 @app.get("/metrics")
 async def metrics():
-    data = generate_latest()
-    return Response(content=data, media_type=CONTENT_TYPE_LATEST)
+    data, content_type = render_latest()
+    return Response(content=data, media_type=content_type)
 
 # Mount API
 app.include_router(api_router, prefix="")
@@ -1,8 +1,43 @@
 from __future__ import annotations
 
-from prometheus_client import Counter, Histogram
+import os
+import threading
+import time
+from typing import Any
 
-"""Prometheus metrics for Signet exchanges."""
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+from .settings import settings
+
+"""Prometheus metrics for Signet exchanges.
+
+With several workers, set ``PROMETHEUS_MULTIPROC_DIR`` to an empty directory before
+starting the server: every process then writes its samples to mmap files there and
+``/metrics`` aggregates them at scrape time (see ``render_latest``).
+"""
+
+# prometheus_client picks its value storage from this variable at import time.
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+# HTTP requests by method, route template and status (see server.http_metrics).
+http_requests_total = Counter(
+    "signet_http_requests_total",
+    "HTTP requests",
+    labelnames=("method", "path", "status"),
+)
+http_request_latency_seconds = Histogram(
+    "signet_http_request_latency_seconds",
+    "Latency",
+    labelnames=("path",),
+)
 
 # Total exchanges by result classification.
 exchanges_total = Counter(
@@ -32,6 +67,143 @@ exchange_latency_seconds = Histogram(
     buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
 )
 
+# Trace membership filter guarding chain/export lookups.
+# Every worker builds the filter from the same log, so report the largest one.
+trace_filter_items = Gauge(
+    "signet_trace_filter_items",
+    "Trace ids held in the receipt lookup filter",
+    multiprocess_mode="max",
+)
+trace_filter_bytes = Gauge(
+    "signet_trace_filter_bytes",
+    "Memory used by the receipt lookup filter bit arrays",
+    multiprocess_mode="max",
+)
+trace_filter_fp_rate = Gauge(
+    "signet_trace_filter_false_positive_rate",
+    "Estimated false-positive rate of the receipt lookup filter",
+    multiprocess_mode="max",
+)
+trace_lookups_total = Counter(
+    "signet_trace_lookups_total",
+    "Chain lookups by filter outcome (filtered, hit, false_positive)",
+    labelnames=("result",),
+)
+
+# Server-sent event subscribers and slow-consumer drops.
+event_subscribers = Gauge(
+    "signet_event_subscribers",
+    "Connected /v1/events subscribers",
+    multiprocess_mode="livesum",
+)
+event_drops_total = Counter(
+    "signet_event_subscriber_drops_total",
+    "Subscribers disconnected for falling behind their event buffer",
+)
+
+# Requests per API key name by quota outcome (allowed, rate_limited,
+# concurrency_limited, unauthorized) and requests currently in flight per key.
+api_key_requests_total = Counter(
+    "signet_api_key_requests_total",
+    "Authenticated requests by API key name and quota outcome",
+    labelnames=("key", "result"),
+)
+api_key_in_flight = Gauge(
+    "signet_api_key_in_flight",
+    "Requests in flight per API key name",
+    labelnames=("key",),
+    multiprocess_mode="livesum",
+)
+
+# Admission control for /v1/exchange (see server.admission).
+admission_limit = Gauge(
+    "signet_admission_limit",
+    "Current adaptive concurrency limit for /v1/exchange",
+    multiprocess_mode="livesum",
+)
+admission_in_flight = Gauge(
+    "signet_admission_in_flight",
+    "Admitted /v1/exchange requests in flight",
+    multiprocess_mode="livesum",
+)
+admission_queue_depth = Gauge(
+    "signet_admission_queue_depth",
+    "Requests waiting for an admission slot",
+    multiprocess_mode="livesum",
+)
+admission_shed_total = Counter(
+    "signet_admission_shed_total",
+    "Requests shed with 503 by reason (queue_full, queue_timeout, standing_queue)",
+    labelnames=("reason",),
+)
+
+# Startup phases, readiness and time from process start to the first real request.
+startup_phase_seconds = Gauge(
+    "signet_startup_phase_seconds",
+    "Duration of each startup phase in seconds",
+    labelnames=("phase",),
+    multiprocess_mode="max",
+)
+ready = Gauge(
+    "signet_ready",
+    "1 once startup has finished and the worker serves traffic",
+    multiprocess_mode="min",
+)
+time_to_first_request_seconds = Gauge(
+    "signet_time_to_first_request_seconds",
+    "Seconds from process start until the first non-probe request completed",
+    multiprocess_mode="max",
+)
+
+# Read replicas (see server.replica).
+replication_lag_bytes = Gauge(
+    "signet_replication_lag_bytes",
+    "Bytes of a source log not yet applied by this replica",
+    labelnames=("log",),
+    multiprocess_mode="max",
+)
+replication_lag_seconds = Gauge(
+    "signet_replication_lag_seconds",
+    "Seconds since this replica was last fully caught up with its source",
+    multiprocess_mode="max",
+)
+
+# Chain/export response compression (see server.compression); identity responses
+# count the same bytes in and out.
+compression_input_bytes_total = Counter(
+    "signet_compression_input_bytes_total",
+    "Uncompressed bytes of chain/export responses by endpoint and content coding",
+    labelnames=("endpoint", "encoding"),
+)
+compression_output_bytes_total = Counter(
+    "signet_compression_output_bytes_total",
+    "Bytes sent for chain/export responses by endpoint and content coding",
+    labelnames=("endpoint", "encoding"),
+)
+compression_seconds_total = Counter(
+    "signet_compression_seconds_total",
+    "Time spent compressing response bodies",
+    labelnames=("endpoint", "encoding"),
+)
+compression_saved_seconds_total = Counter(
+    "signet_compression_saved_seconds_total",
+    "Compression time avoided by serving an already compressed body",
+    labelnames=("endpoint", "encoding"),
+)
+export_cache_total = Counter(
+    "signet_export_cache_total",
+    "Export bundle cache lookups by result (hit, miss)",
+    labelnames=("result",),
+)
+
+# Per-stage latency inside exchange/write_receipt/export (see server.tracing).
+stage_latency_seconds = Histogram(
+    "signet_stage_latency_seconds",
+    "Latency of individual pipeline stages in seconds",
+    labelnames=("operation", "stage"),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+
 def observe_success(duration: float):  # convenience wrappers
     exchanges_total.labels(result="ok").inc()
     exchange_latency_seconds.observe(duration)
@@ -45,5 +217,116 @@ def observe_error(duration: float):
     exchanges_total.labels(result="error").inc()
     exchange_latency_seconds.observe(duration)
 
+def observe_conflict(duration: float):
+    exchanges_total.labels(result="conflict").inc()
+    exchange_latency_seconds.observe(duration)
+
+def observe_not_found(duration: float):
+    exchanges_total.labels(result="not_found").inc()
+    exchange_latency_seconds.observe(duration)
+
 def observe_forward(host: str):
     forward_total.labels(host=host).inc()
+
+def observe_trace_filter(items: int, size_bytes: int, fp_rate: float):
+    trace_filter_items.set(items)
+    trace_filter_bytes.set(size_bytes)
+    trace_filter_fp_rate.set(fp_rate)
+
+def observe_trace_lookup(result: str):
+    trace_lookups_total.labels(result=result).inc()
+
+def observe_event_subscribers(count: int):
+    event_subscribers.set(count)
+
+def observe_event_drop():
+    event_drops_total.inc()
+
+def observe_api_key_request(key: str, result: str):
+    api_key_requests_total.labels(key=key, result=result).inc()
+
+def observe_api_key_in_flight(key: str, count: int):
+    api_key_in_flight.labels(key=key).set(count)
+
+def observe_admission(limit: float, in_flight: int, queue_depth: int):
+    admission_limit.set(limit)
+    admission_in_flight.set(in_flight)
+    admission_queue_depth.set(queue_depth)
+
+def observe_admission_shed(reason: str):
+    admission_shed_total.labels(reason=reason).inc()
+
+def observe_startup_phase(phase: str, duration: float):
+    startup_phase_seconds.labels(phase=phase).set(duration)
+
+def observe_ready(is_ready: bool):
+    ready.set(1 if is_ready else 0)
+
+def observe_time_to_first_request(seconds: float):
+    time_to_first_request_seconds.set(seconds)
+
+def observe_replication_lag(lag_bytes: dict[str, int], lag_seconds: float):
+    for log, n in lag_bytes.items():
+        replication_lag_bytes.labels(log=log).set(n)
+    replication_lag_seconds.set(lag_seconds)
+
+def observe_compression(
+    endpoint: str, encoding: str, size_in: int, size_out: int, seconds: float, cached: bool
+):
+    compression_input_bytes_total.labels(endpoint=endpoint, encoding=encoding).inc(size_in)
+    compression_output_bytes_total.labels(endpoint=endpoint, encoding=encoding).inc(size_out)
+    if cached:
+        compression_saved_seconds_total.labels(endpoint=endpoint, encoding=encoding).inc(seconds)
+    elif seconds:
+        compression_seconds_total.labels(endpoint=endpoint, encoding=encoding).inc(seconds)
+
+def observe_export_cache(result: str):
+    export_cache_total.labels(result=result).inc()
+
+def observe_stage(operation: str, stage: str, duration: float):
+    stage_latency_seconds.labels(operation=operation, stage=stage).observe(duration)
+
+# labels() costs a lock and a tuple build per call; the middleware's label sets are
+# bounded, so keep the resolved children.
+_http_children: dict[tuple[str, str, int], tuple[Any, Any]] = {}
+
+def observe_http_request(method: str, path: str, status: int, duration: float):
+    key = (method, path, status)
+    children = _http_children.get(key)
+    if children is None:
+        children = _http_children[key] = (
+            http_requests_total.labels(method=method, path=path, status=str(status)),
+            http_request_latency_seconds.labels(path=path),
+        )
+    children[0].inc()
+    children[1].observe(duration)
+
+_scrape_lock = threading.Lock()
+_scrape_cache: tuple[float, bytes] | None = None
+
+def render_latest() -> tuple[bytes, str]:
+    """Exposition body and content type for ``/metrics``.
+
+    In multiprocess mode the per-worker files are merged on every scrape; the result
+    is reused for ``SP_METRICS_CACHE_TTL`` seconds so concurrent or frequent scrapers
+    do not each re-read every file.
+    """
+    global _scrape_cache
+    if not MULTIPROCESS:
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+    with _scrape_lock:
+        now = time.monotonic()
+        if _scrape_cache is None or now - _scrape_cache[0] >= settings.metrics_cache_ttl:
+            from prometheus_client.multiprocess import MultiProcessCollector
+
+            registry = CollectorRegistry()
+            MultiProcessCollector(registry)
+            _scrape_cache = (now, generate_latest(registry))
+        return _scrape_cache[1], CONTENT_TYPE_LATEST
+
+def mark_process_dead(pid: int | None = None):
+    """Drop this worker's live gauges from the shared directory on shutdown."""
+    if MULTIPROCESS:
+        from prometheus_client.multiprocess import mark_process_dead as _mark_dead
+
+        _mark_dead(os.getpid() if pid is None else pid)
@@ -0,0 +1,132 @@
+"""Memory-mapped access to the JSONL logs.
+
+Scanning ``receipts.jsonl`` through text I/O decodes and ``json.loads`` every line.
+Here the file is mapped read-only and candidate lines are located with a byte search
+for the encoded ``"<field>": <value>`` pair, so only lines that mention the value are
+decoded and parsed; the rest of the file is skipped at ``memchr``/``memmem`` speed. A
+hit is confirmed on the parsed record, since the same bytes may appear inside a
+payload.
+
+``slices()`` exposes the matching lines as ``memoryview``s into the mapping, which
+lets callers copy stored records straight into a response body without
+re-serializing them. The views are only valid inside the ``with`` block.
+``iter_slices()`` yields them lazily, for callers that can stop early.
+"""
+
+import json
+import mmap
+import os
+from collections.abc import Generator, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+
+@contextmanager
+def mapped(path: str) -> Iterator[mmap.mmap | None]:
+    """Read-only mapping of ``path``; None when the file is missing or empty."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        yield None
+        return
+    try:
+        if os.fstat(fd).st_size == 0:
+            yield None
+            return
+        mm = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+    finally:
+        os.close(fd)
+    try:
+        yield mm
+    finally:
+        mm.close()
+
+
+def _needle(field: str, value: str) -> bytes:
+    # Matches how storage.append_jsonl encodes records (json.dumps defaults, no ASCII
+    # escaping).
+    return f"{json.dumps(field)}: {json.dumps(value, ensure_ascii=False)}".encode()
+
+
+def find_lines(
+    mm: mmap.mmap, field: str, value: str
+) -> Iterator[tuple[int, int, dict[str, Any]]]:
+    """Yield ``(start, end, record)`` for complete lines whose ``field`` equals ``value``."""
+    needle = _needle(field, value)
+    pos = mm.find(needle)
+    while pos != -1:
+        start = mm.rfind(b"\n", 0, pos) + 1
+        end = mm.find(b"\n", pos)
+        if end == -1:
+            return  # a writer is mid-append; the partial line is not ours yet
+        try:
+            record = json.loads(mm[start:end])
+        except ValueError:
+            record = None
+        if isinstance(record, dict) and record.get(field) == value:
+            yield start, end, record
+        pos = mm.find(needle, end)
+
+
+def read_matching(path: str, field: str, value: str) -> list[dict[str, Any]]:
+    with mapped(path) as mm:
+        if mm is None:
+            return []
+        return [record for _, _, record in find_lines(mm, field, value)]
+
+
+@contextmanager
+def slices(
+    path: str, field: str, value: str
+) -> Iterator[list[tuple[dict[str, Any], memoryview]]]:
+    """Matching ``(record, raw_line)`` pairs; the views die with the block."""
+    with mapped(path) as mm:
+        if mm is None:
+            yield []
+            return
+        view = memoryview(mm)
+        items = [(record, view[s:e]) for s, e, record in find_lines(mm, field, value)]
+        try:
+            yield items
+        finally:
+            # Release every export of the mapping so it can be closed.
+            for _, line in items:
+                line.release()
+            items.clear()
+            view.release()
+
+
+@contextmanager
+def iter_slices(
+    path: str, field: str, value: str
+) -> Iterator[Iterator[tuple[dict[str, Any], memoryview]]]:
+    """``slices`` found and parsed lazily, in file order, as the iterator advances.
+
+    Stop early to skip the rest of the file; the views die with the block.
+    """
+    with mapped(path) as mm:
+        if mm is None:
+            yield iter(())
+            return
+        view = memoryview(mm)
+        lines: list[memoryview] = []
+
+        def found() -> Generator[tuple[dict[str, Any], memoryview], None, None]:
+            for s, e, record in find_lines(mm, field, value):
+                line = view[s:e]
+                lines.append(line)
+                yield record, line
+
+        it = found()
+        try:
+            yield it
+        finally:
+            it.close()
+            for line in lines:
+                line.release()
+            view.release()
+
+
+def read_line_at(mm: mmap.mmap, offset: int) -> bytes:
+    end = mm.find(b"\n", offset)
+    return mm[offset : end if end != -1 else len(mm)]
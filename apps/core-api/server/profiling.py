@@ -0,0 +1,105 @@
+"""On-demand CPU sampling and tracemalloc diffs for a running worker.
+
+Nothing here runs unless an admin calls the profiling routes, which are only mounted
+when ``SP_PROFILING_ENABLED`` is set.
+
+The CPU profiler is a wall-clock sampler: a helper thread reads
+``sys._current_frames()`` at a fixed interval and counts each distinct stack. Output
+is the "collapsed" format (``frame;frame;frame count`` per line) read by
+flamegraph.pl, speedscope and inferno. Idle threads show up in their waiting frames,
+so filter on the event loop thread (``MainThread``) for CPU hot paths.
+"""
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from types import FrameType
+from typing import Any
+
+_busy = threading.Lock()
+_memory_baseline: tracemalloc.Snapshot | None = None
+
+
+class ProfilerBusyError(Exception):
+    pass
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame: FrameType | None, thread_name: str) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    labels.reverse()
+    return ";".join(labels)
+
+
+def sample_stacks(seconds: float, interval: float) -> Counter[str]:
+    """Sample every thread's stack for ``seconds``; blocks the calling thread."""
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusyError
+    try:
+        me = threading.get_ident()
+        stacks: Counter[str] = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    stacks[_collapse(frame, names.get(ident, f"thread-{ident}"))] += 1
+            time.sleep(interval)
+        return stacks
+    finally:
+        _busy.release()
+
+
+def collapsed(stacks: Counter[str]) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def memory_start(frames: int) -> None:
+    """Start tracing allocations (if needed) and take the baseline snapshot."""
+    global _memory_baseline
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    _memory_baseline = tracemalloc.take_snapshot()
+
+
+def memory_diff(limit: int, group_by: str, reset: bool) -> dict[str, Any]:
+    """Top allocation growth since the baseline; ``reset`` moves the baseline forward."""
+    global _memory_baseline
+    if _memory_baseline is None or not tracemalloc.is_tracing():
+        raise LookupError("memory tracing not started")
+    snapshot = tracemalloc.take_snapshot()
+    stats = snapshot.compare_to(_memory_baseline, group_by)
+    if reset:
+        _memory_baseline = snapshot
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "traced_bytes": current,
+        "traced_peak_bytes": peak,
+        "top": [
+            {
+                "size_diff": s.size_diff,
+                "size": s.size,
+                "count_diff": s.count_diff,
+                "count": s.count,
+                "traceback": [f"{f.filename}:{f.lineno}" for f in s.traceback],
+            }
+            for s in stats[:limit]
+        ],
+    }
+
+
+def memory_stop() -> None:
+    global _memory_baseline
+    _memory_baseline = None
+    tracemalloc.stop()
@@ -1,19 +1,20 @@
-import json
 import logging
-import os
 import time
-from typing import Any, List, Dict, TypedDict, Union
+from collections.abc import Iterator
+from contextlib import ExitStack, contextmanager
+from typing import Any, List, Dict, TypedDict, Union, cast
 
+from . import blobs, chain_heads, shards
+from .compact import CompactReceipt
+from .logtail import receipts_log
+from .mmapread import iter_slices, read_matching
 from .settings import settings
+from .storage import append_jsonl, named_lock
+from .tracing import stage
 from .utils import cid_for_json
 
 logger = logging.getLogger(__name__)
 
-def append_jsonl(path: str, obj: dict[str, object]) -> None:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "a", encoding="utf-8") as f:
-        f.write(json.dumps(obj, ensure_ascii=False) + "\n")
-
 class ReceiptRecord(TypedDict, total=False):
     trace_id: str
     ts: str
@@ -24,47 +25,147 @@ class ReceiptRecord(TypedDict, total=False):
     hop: int
     normalized: Dict[str, Any]
 
+def _hop_key(r: ReceiptRecord) -> int:
+    hop_val: Union[int, Any] = r.get("hop", 0)
+    return hop_val if isinstance(hop_val, int) else 0
+
 def read_chain(trace_id: str) -> list[ReceiptRecord]:
-    items: List[ReceiptRecord] = []
-    path = settings.receipts_path
-    if not os.path.exists(path):
-        return []
-    with open(path, encoding="utf-8") as f:
-        for line in f:
-            try:
-                rec = json.loads(line)
-                if rec.get("trace_id") == trace_id:
-                    items.append(rec)
-            except Exception as exc:  # pragma: no cover - skip malformed lines
-                logger.debug("Skipping malformed receipt line: %s", exc)
-                continue
-    def _hop_key(r: ReceiptRecord) -> int:
-        hop_val: Union[int, Any] = r.get("hop", 0)
-        return hop_val if isinstance(hop_val, int) else 0
+    items: List[ReceiptRecord] = read_matching(  # type: ignore[assignment]
+        shards.path_for(trace_id), "trace_id", trace_id
+    )
     items.sort(key=_hop_key)
-    return items
+    return [cast(ReceiptRecord, blobs.joined(r)) for r in items]
 
-def write_receipt(trace_id: str, hop: int, normalized: Dict[str, Any]) -> ReceiptRecord:
-    ts = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
-    cid = cid_for_json(normalized)
-    prev = None
-    prev_cid = None
-    chain = read_chain(trace_id)
-    if chain:
-        prev = chain[-1].get("receipt_hash")
-        prev_cid = chain[-1].get("cid")
+@contextmanager
+def chain_slices(
+    trace_id: str, from_hop: int = 0, limit: int | None = None, bodies: bool = True
+) -> Iterator[list[tuple[ReceiptRecord, bytes | memoryview]]]:
+    """Receipts of ``trace_id`` in hop order, each with its JSON line as served.
+
+    Only hops ``>= from_hop`` are returned, at most ``limit`` of them. Lines are
+    views into the mapped log, valid only inside the ``with`` block, or bytes with the
+    body joined back from the blob store (skipped when ``bodies`` is false, so a
+    blob-backed line stays bodiless); copy them into a response body instead of
+    re-serializing the records. Records are as stored (a blob-backed one has no
+    ``normalized``).
+
+    Compare-and-append writes a trace's hops in order, so the scan stops at the
+    ``limit``-th match; lines further down the file are never parsed.
+    """
+    with iter_slices(shards.path_for(trace_id), "trace_id", trace_id) as found:
+        selected: list[tuple[ReceiptRecord, bytes | memoryview]] = []
+        for record, line in found:
+            rec = cast(ReceiptRecord, record)
+            if _hop_key(rec) >= from_hop:
+                selected.append((rec, line))
+                if limit is not None and len(selected) >= limit:
+                    break
+        selected.sort(key=lambda item: _hop_key(item[0]))
+        if bodies:
+            selected = [(r, blobs.join_line(line, r)) for r, line in selected]
+        yield selected
+
+class HeadMovedError(Exception):
+    """The chain head no longer matches the hash a compare-and-append expected."""
+
+    def __init__(self, head: CompactReceipt | None):
+        super().__init__("chain head moved")
+        self.head = head
+
+
+def _build(
+    trace_id: str, ts: str, cid: str, hop: int, head: CompactReceipt | None,
+    normalized: Dict[str, Any],
+) -> ReceiptRecord:
+    prev = head.receipt_hash if head else None
     receipt_hash = cid_for_json({"ts": ts, "cid": cid, "prev": prev, "hop": hop})
-    # Persist minimal receipt plus the normalized object so downstream verifiers
-    # (console chain viewer, SDKs) can recompute the CID deterministically.
-    rec: ReceiptRecord = {
+    # Serve the minimal receipt plus the normalized object so downstream verifiers
+    # (console chain viewer, SDKs) can recompute the CID deterministically; the log
+    # keeps only the CID when the body is in the blob store.
+    return {
         "trace_id": trace_id,
         "ts": ts,
         "cid": cid,
         "receipt_hash": receipt_hash,
         "prev_receipt_hash": prev,
-        "prev_cid": prev_cid,
+        "prev_cid": head.cid if head else None,
         "hop": hop,
         "normalized": normalized,
     }
-    append_jsonl(settings.receipts_path, rec)  # type: ignore[arg-type]
+
+
+def _put_blob(cid: str, normalized: Dict[str, Any]) -> bool:
+    """Store the body ahead of the append; True if the log line should omit it.
+
+    Before the append, so a stored receipt never references a missing body.
+    """
+    if not settings.blob_store_enabled:
+        return False
+    with stage("write_receipt", "blob_put"):
+        return blobs.put(cid, normalized)
+
+
+def _compare_and_append(rec: ReceiptRecord, external: bool) -> bool:
+    """Append ``rec`` only if its trace's head is still ``rec["prev_receipt_hash"]``.
+
+    The record is fully built before this is called; the per-trace lock (one stripe,
+    never the whole log) is held just for the head check and the append, so writers
+    on different traces do not wait for each other and a moved head costs no write.
+    The catch-up before the check takes the lock of the trace's shard follower, and
+    only when the shard file has grown since the last sync.
+    ``external`` drops the body from the stored line (it is in the blob store).
+    """
+    trace_id = rec["trace_id"]
+    with ExitStack() as held:
+        with stage("write_receipt", "lock_wait"):
+            held.enter_context(named_lock("trace", trace_id))
+        with stage("write_receipt", "append"):
+            # Catch up with appends from other workers before comparing.
+            receipts_log.sync(trace_id)
+            head = chain_heads.head(trace_id)
+            if (head.receipt_hash if head else None) != rec["prev_receipt_hash"]:
+                return False
+            stored = blobs.strip(rec) if external else dict(rec)
+            append_jsonl(shards.path_for(trace_id), stored)
+    # Feed the in-memory indexes (trace filter, chain heads, ...) with the new line.
+    with stage("write_receipt", "index_sync"):
+        receipts_log.sync(trace_id)
+    return True
+
+
+def write_receipt(trace_id: str, hop: int, normalized: Dict[str, Any]) -> ReceiptRecord:
+    """Append ``normalized`` at ``hop``, linked to whatever the trace's head is."""
+    ts = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    with stage("write_receipt", "cid"):
+        cid = cid_for_json(normalized)
+    external = _put_blob(cid, normalized)
+    while True:
+        with stage("write_receipt", "read_head"):
+            receipts_log.sync(trace_id)
+            head = chain_heads.head(trace_id)
+        rec = _build(trace_id, ts, cid, hop, head, normalized)
+        if _compare_and_append(rec, external):
+            return rec
+
+
+def append_receipt(
+    trace_id: str, expected_prev: str, normalized: Dict[str, Any]
+) -> ReceiptRecord:
+    """Compare-and-append hop N+1 to an existing trace.
+
+    Raises ``HeadMovedError`` unless the current head's ``receipt_hash`` equals
+    ``expected_prev`` (``head`` is None when the trace does not exist).
+    """
+    ts = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    with stage("write_receipt", "cid"):
+        cid = cid_for_json(normalized)
+    external = _put_blob(cid, normalized)
+    with stage("write_receipt", "read_head"):
+        receipts_log.sync(trace_id)
+        head = chain_heads.head(trace_id)
+    if head is None or head.receipt_hash != expected_prev:
+        raise HeadMovedError(head)
+    rec = _build(trace_id, ts, cid, head.hop + 1, head, normalized)
+    if not _compare_and_append(rec, external):
+        raise HeadMovedError(chain_heads.head(trace_id))
     return rec
@@ -0,0 +1,237 @@
+"""Read-replica mode.
+
+A replica (``SP_REPLICA=true``) serves the read API (``/v1/receipts/*``, compliance,
+ledger, events) from its own copy of the primary's logs and refuses exchanges:
+
+* with ``SP_REPLICA_PRIMARY_URL`` it pulls the bytes appended to every log (each
+  receipt shard and the ledger) from the primary's ``/v1/replication`` endpoints and
+  appends them to its local files, fetching the blobs new receipts reference first;
+* without it, its paths point at the primary's data directory on a shared
+  filesystem and it tails those files directly.
+
+Either way the local log followers, indexes and caches are built exactly as on the
+primary. A background task polls every ``SP_REPLICA_POLL_INTERVAL`` seconds. Lag is
+reported per log in bytes and as the seconds since the replica last saw itself fully
+caught up, in ``X-SIGNET-Replication-Lag`` on every response, in
+``/v1/replication/status`` and as ``signet_replication_lag_*``.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import time
+from typing import Any
+
+import httpx
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import blobs, shards, startup
+from .auth import API_KEY_HEADER
+from .logtail import ledger_log, receipts_log
+from .metrics import observe_replication_lag
+from .settings import settings
+from .utils import cid_for_json
+
+logger = logging.getLogger(__name__)
+
+LAG_HEADER = b"x-signet-replication-lag"
+
+
+class ReplicationError(Exception):
+    """The primary's data cannot be mirrored as is (layout mismatch, bad blob)."""
+
+
+_caught_up_at: float | None = None
+_lag_bytes: dict[str, int] = {}
+_last_error: str | None = None
+_client: httpx.Client | None = None
+_task: asyncio.Task[None] | None = None
+
+
+def log_paths() -> dict[str, str]:
+    """Replicated logs by name, as used in ``/v1/replication/logs/{name}``."""
+    paths = {f"receipts.{i}": p for i, p in enumerate(shards.paths())}
+    paths["ledger"] = settings.ledger_path
+    return paths
+
+
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+
+def lag_seconds() -> float:
+    since = _caught_up_at if _caught_up_at is not None else startup.started_at
+    return time.monotonic() - since
+
+
+def status() -> dict[str, Any]:
+    if not settings.replica:
+        return {"role": "primary"}
+    return {
+        "role": "replica",
+        "source": settings.replica_primary_url or "shared files",
+        "lag_seconds": round(lag_seconds(), 3),
+        "lag_bytes": dict(_lag_bytes),
+        "error": _last_error,
+    }
+
+
+def _get_client() -> httpx.Client:
+    global _client
+    if _client is None:
+        headers = {API_KEY_HEADER: settings.replica_api_key} if settings.replica_api_key else {}
+        _client = httpx.Client(
+            base_url=str(settings.replica_primary_url).rstrip("/"), headers=headers, timeout=10.0
+        )
+    return _client
+
+
+def _fetch_blobs(client: httpx.Client, chunk: bytes) -> None:
+    for line in chunk.splitlines():
+        record = json.loads(line)
+        cid = record.get("cid")
+        if "normalized" in record or not isinstance(cid, str) or blobs.get_bytes(cid):
+            continue
+        r = client.get(f"/v1/replication/blobs/{cid}")
+        r.raise_for_status()
+        if cid_for_json(json.loads(r.content)) != cid:
+            raise ReplicationError(f"blob {cid} does not match its CID")
+        blobs.put_bytes(cid, r.content)
+
+
+def _pull(client: httpx.Client) -> dict[str, int]:
+    """Copy new bytes of every log from the primary; returns bytes still missing."""
+    manifest = client.get("/v1/replication/manifest")
+    manifest.raise_for_status()
+    primary = manifest.json()
+    if primary["shards"] != shards.count():
+        raise ReplicationError(
+            f"primary has {primary['shards']} receipt shards, this replica {shards.count()}"
+        )
+    lag: dict[str, int] = {}
+    for name, path in log_paths().items():
+        remote = primary["logs"].get(name, 0)
+        local = _size(path)
+        if local > remote:
+            # The primary's log was replaced; start over (followers reset on shrink).
+            os.truncate(path, 0)
+            local = 0
+        while local < remote:
+            r = client.get(f"/v1/replication/logs/{name}", params={"offset": local})
+            if r.status_code == 416:
+                os.truncate(path, 0)
+                local = 0
+                continue
+            r.raise_for_status()
+            remote = int(r.headers.get("X-SIGNET-Log-Size", remote))
+            if not r.content:
+                break  # only a partial line so far
+            if name.startswith("receipts."):
+                _fetch_blobs(client, r.content)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "ab") as f:
+                f.write(r.content)
+            local += len(r.content)
+        lag[name] = max(0, remote - local)
+    return lag
+
+
+def _tail() -> dict[str, int]:
+    """Lag of the local followers behind the (shared) files they tail."""
+    consumed = [*receipts_log.positions(), (ledger_log.path, ledger_log.offset)]
+    return {
+        name: max(0, _size(path) - offset)
+        for name, (path, offset) in zip(log_paths(), consumed, strict=True)
+    }
+
+
+def poll() -> None:
+    """One replication round: mirror (or tail) every log, then update the lag."""
+    global _caught_up_at, _last_error
+    started = time.monotonic()
+    try:
+        lag = _pull(_get_client()) if settings.replica_primary_url else {}
+        receipts_log.sync()
+        ledger_log.sync()
+        if not settings.replica_primary_url:
+            lag = _tail()
+    except (httpx.HTTPError, OSError, ValueError, KeyError, ReplicationError) as exc:
+        _last_error = f"{type(exc).__name__}: {exc}"
+        logger.warning("Replication poll failed: %s", _last_error)
+    else:
+        _last_error = None
+        _lag_bytes.clear()
+        _lag_bytes.update(lag)
+        if not any(lag.values()):
+            _caught_up_at = started
+    observe_replication_lag(_lag_bytes, lag_seconds())
+
+
+async def _run() -> None:
+    while True:
+        await asyncio.sleep(settings.replica_poll_interval)
+        await asyncio.to_thread(poll)
+
+
+def start() -> None:
+    global _task
+    if _task is None:
+        _task = asyncio.get_running_loop().create_task(_run())
+
+
+async def stop() -> None:
+    global _task, _client
+    if _task is not None:
+        _task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await _task
+        _task = None
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+async def _read_only(send: Send) -> None:
+    body = json.dumps({
+        "error": "read_only_replica",
+        "message": "This node is a read replica; send exchanges to the primary",
+    }).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 405,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"allow", b""),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class ReplicaMiddleware:
+    """Refuses exchanges and stamps every response with the replication lag."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if scope["method"] == "POST" and scope["path"] == "/v1/exchange":
+            await _read_only(send)
+            return
+
+        async def send_with_lag(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((LAG_HEADER, f"{lag_seconds():.3f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_lag)
@@ -1,12 +1,24 @@
 from fastapi import APIRouter
 
+from ..settings import settings
 from .system import router as system_router
 from .v1.compliance import router as compliance_router
+from .v1.events import router as events_router
 from .v1.exchange import router as exchange_router
+from .v1.ledger import router as ledger_router
 from .v1.receipts import router as receipts_router
+from .v1.replication import router as replication_router
 
 router = APIRouter()
 router.include_router(system_router)
 router.include_router(exchange_router, prefix="/v1")
 router.include_router(receipts_router, prefix="/v1")
 router.include_router(compliance_router, prefix="/v1")
+router.include_router(ledger_router, prefix="/v1")
+router.include_router(events_router, prefix="/v1")
+router.include_router(replication_router, prefix="/v1")
+
+if settings.profiling_enabled:
+    from .v1.admin import router as admin_router
+
+    router.include_router(admin_router, prefix="/v1")
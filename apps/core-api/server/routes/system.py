@@ -1,9 +1,9 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
 
-from ..security import jwks_response
+from ..security import jwks_bytes
 
 router = APIRouter()
 
 @router.get("/.well-known/jwks.json")
 def jwks():
-    return jwks_response()
+    return Response(content=jwks_bytes(), media_type="application/json")
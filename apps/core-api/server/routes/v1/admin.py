@@ -0,0 +1,51 @@
+import asyncio
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from ... import profiling
+from ...auth import require_admin
+from ...settings import settings
+
+# Only included when SP_PROFILING_ENABLED is set (see routes/__init__.py).
+router = APIRouter(prefix="/admin/profile", tags=["admin"], dependencies=[Depends(require_admin)])
+
+@router.get("/cpu", response_class=PlainTextResponse)
+async def cpu_profile(
+    seconds: float = Query(10.0, gt=0),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+):
+    """Sample all thread stacks for ``seconds``; returns collapsed stacks for flamegraphs."""
+    if seconds > settings.profiling_max_seconds:
+        raise HTTPException(
+            status_code=400, detail=f"seconds must be <= {settings.profiling_max_seconds}"
+        )
+    try:
+        stacks = await asyncio.to_thread(profiling.sample_stacks, seconds, interval_ms / 1000)
+    except profiling.ProfilerBusyError as exc:
+        raise HTTPException(status_code=409, detail="A profile is already running") from exc
+    return PlainTextResponse(profiling.collapsed(stacks))
+
+@router.post("/memory/start")
+def memory_start(frames: int = Query(10, ge=1, le=100)):
+    """Start tracemalloc and record the baseline later diffs compare against."""
+    profiling.memory_start(frames)
+    return {"tracing": True, "frames": frames}
+
+@router.get("/memory/diff")
+def memory_diff(
+    limit: int = Query(25, ge=1, le=500),
+    group_by: Literal["lineno", "filename", "traceback"] = "lineno",
+    reset: bool = False,
+):
+    """Largest allocation growth since the baseline (or the last ``reset``)."""
+    try:
+        return profiling.memory_diff(limit, group_by, reset)
+    except LookupError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+@router.post("/memory/stop")
+def memory_stop():
+    profiling.memory_stop()
+    return {"tracing": False}
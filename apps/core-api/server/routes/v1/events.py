@@ -0,0 +1,75 @@
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator, Mapping
+from typing import Any
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from ... import blobs
+from ...events import EVENT_KINDS, Subscriber, broadcaster, poll_logs
+from ...settings import settings
+
+router = APIRouter(tags=["events"])
+
+def _format(kind: str, offset: int, record: Mapping[str, Any]) -> bytes:
+    if kind == "receipt":
+        record = blobs.joined(record)  # only for events actually delivered
+    data = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {kind}:{offset}\nevent: {kind}\ndata: {data}\n\n".encode()
+
+async def _stream(request: Request, sub: Subscriber) -> AsyncIterator[bytes]:
+    # Tell EventSource clients how long to wait before reconnecting.
+    yield b"retry: 2000\n\n"
+    last_sent = time.monotonic()
+    try:
+        while True:
+            try:
+                kind, offset, record = await asyncio.wait_for(
+                    sub.queue.get(), timeout=settings.events_poll_interval
+                )
+            except TimeoutError:
+                if await request.is_disconnected():
+                    return
+                poll_logs()
+                if sub.queue.empty() and not sub.overflowed:
+                    if time.monotonic() - last_sent >= settings.events_keepalive_interval:
+                        last_sent = time.monotonic()
+                        yield b": keepalive\n\n"
+                    continue
+                kind, offset, record = sub.queue.get_nowait()
+            yield _format(kind, offset, record)
+            last_sent = time.monotonic()
+            if sub.overflowed and sub.queue.empty():
+                yield b"event: overflow\ndata: {}\n\n"
+                return
+    finally:
+        broadcaster.unsubscribe(sub)
+
+@router.get("/events")
+async def events(
+    request: Request,
+    trace_id: str | None = None,
+    payload_type: str | None = None,
+    kinds: str = Query(",".join(EVENT_KINDS), description="Comma-separated: receipt,ledger"),
+):
+    """Server-sent events for receipts and ledger entries appended from now on.
+
+    ``payload_type`` matches ledger entries only; receipts carry no payload type.
+    A client that falls behind receives an ``overflow`` event and is disconnected.
+    """
+    wanted = frozenset(k.strip() for k in kinds.split(",") if k.strip())
+    if not wanted or not wanted <= set(EVENT_KINDS):
+        raise HTTPException(status_code=400, detail="Unknown event kind")
+    if len(broadcaster) >= settings.events_max_subscribers:
+        raise HTTPException(
+            status_code=503, detail="Too many event subscribers", headers={"Retry-After": "5"}
+        )
+    poll_logs()
+    sub = broadcaster.subscribe(trace_id=trace_id, payload_type=payload_type, kinds=wanted)
+    return StreamingResponse(
+        _stream(request, sub),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,31 +1,34 @@
 import json
 import logging
-import os
 import time
 import uuid
 from typing import Any
 
-from fastapi import APIRouter, HTTPException, Request, Response
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
 
+from ... import chain_heads, codecs, idempotency, shards
+from ...auth import require_api_key
 from ...hel import is_forward_allowed
 from ...ledger import write_ledger_entry
-from ...metrics import observe_denied, observe_error, observe_forward, observe_success
-from ...receipts import write_receipt
+from ...logtail import receipts_log
+from ...metrics import (
+    observe_conflict,
+    observe_denied,
+    observe_error,
+    observe_forward,
+    observe_not_found,
+    observe_success,
+)
+from ...receipts import HeadMovedError, append_receipt, write_receipt
 from ...settings import settings
-
-# In-memory idempotency cache: key -> stored response dict.
-_IDEMPOTENCY_CACHE: dict[str, dict] = {}
-_IDEMPOTENCY_PATH = os.path.join("data", "idempotency.jsonl")
-
-def _persist_idempotency(key: str, payload: dict) -> None:
-    os.makedirs(os.path.dirname(_IDEMPOTENCY_PATH), exist_ok=True)
-    line = json.dumps({"key": key, "response": payload}, separators=(",", ":"))
-    with open(_IDEMPOTENCY_PATH, "a", encoding="utf-8") as f:
-        f.write(line + "\n")
+from ...tracing import operation, stage
 
 router = APIRouter(tags=["exchange"])
 
+_MAX_TRACE_ID_LEN = 128
+
 class ExchangeRequest(BaseModel):
     payload_type: str
     target_type: str | None = None
@@ -40,64 +43,172 @@ class ExchangeResponse(BaseModel):
     forwarded: dict[str, Any] | None = None
     idempotent: bool = False
 
-@router.post("/exchange", response_model=ExchangeResponse)
-async def exchange(req: ExchangeRequest, request: Request):
+# The body is parsed by the handler (see parse_request); document it for OpenAPI.
+_REQUEST_SCHEMA = {"schema": ExchangeRequest.model_json_schema()}
+_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": dict.fromkeys((codecs.JSON, codecs.MSGPACK, codecs.CBOR), _REQUEST_SCHEMA),
+    }
+}
+
+@router.post(
+    "/exchange",
+    response_model=ExchangeResponse,
+    dependencies=[Depends(require_api_key)],
+    openapi_extra=_REQUEST_BODY,
+)
+async def exchange(request: Request):
     start = time.perf_counter()
-    idem_key = request.headers.get("X-SIGNET-Idempotency-Key")
+    with operation("exchange"):
+        # Refuse oversized bodies by header before reading them.
+        too_large = _check_content_length(request)
+        if too_large is not None:
+            return too_large
+        try:
+            media_type = codecs.request_type(request.headers.get("content-type"))
+        except codecs.UnsupportedMediaTypeError:
+            return _json_response(415, {
+                "error": "unsupported_media_type",
+                "message": f"Send {', '.join(codecs.available())}",
+            })
+        raw = await request.body()
+        if len(raw) > settings.max_exchange_body_bytes:
+            return _payload_too_large()
+        with stage("exchange", "validate"):
+            req = parse_request(raw, media_type)
+        # New traces get their id here so the exchange can run on its shard's writer pool.
+        trace_id = request.headers.get("X-SIGNET-Trace") or str(uuid.uuid4())
+        return await shards.run(trace_id, _handle_exchange, req, request, start, trace_id)
+
+def _record_decision(allowed: bool, reason: str) -> None:
+    # Imported on the first decision, which keeps the compliance module out of startup.
+    from ...compliance import record_decision
+
+    record_decision(allowed, reason)
+
+def parse_request(raw: bytes, media_type: str = codecs.JSON) -> ExchangeRequest:
+    """Validate the body straight from bytes; ``payload`` stays an opaque mapping.
 
-    # Content-Length guard (header)
+    Errors are raised as FastAPI's ``RequestValidationError`` so clients get the
+    same 422 as from a declared body parameter.
+    """
+    try:
+        if media_type == codecs.JSON:
+            return ExchangeRequest.model_validate_json(raw)
+        try:
+            data = codecs.decode(raw, media_type)
+        except ValueError as exc:
+            raise RequestValidationError([{
+                "type": codecs.error_type(media_type),
+                "loc": ("body",),
+                "msg": str(exc),
+                "input": None,
+            }]) from None
+        return ExchangeRequest.model_validate(data)
+    except ValidationError as exc:
+        raise RequestValidationError([
+            {**err, "loc": ("body", *err["loc"])} for err in exc.errors(include_url=False)
+        ]) from None
+
+def _json_response(status_code: int, body: dict[str, Any]) -> Response:
+    return Response(
+        content=json.dumps(body), status_code=status_code, media_type="application/json"
+    )
+
+def _payload_too_large() -> Response:
+    return _json_response(413, {
+        "error": "payload_too_large",
+        "message": "Request body exceeds size limit",
+    })
+
+def _check_content_length(request: Request) -> Response | None:
     cl_header = request.headers.get("content-length")
     if cl_header:
         try:
             if int(cl_header) > settings.max_exchange_body_bytes:
-                return Response(
-                    content=json.dumps({
-                        "error": "payload_too_large",
-                        "message": "Request body exceeds size limit",
-                    }),
-                    status_code=413,
-                    media_type="application/json",
-                )
+                return _payload_too_large()
         except ValueError:
             logging.getLogger(__name__).debug("Invalid Content-Length header: %s", cl_header)
-    if idem_key and idem_key in _IDEMPOTENCY_CACHE:
-        cached = _IDEMPOTENCY_CACHE[idem_key]
-        # Ensure idempotent flag true
-        if isinstance(cached, dict):
-            cached["idempotent"] = True
-        body_json = json.dumps(cached, separators=(",", ":"))
-        trace_cached = cached.get("trace_id", "") if isinstance(cached, dict) else ""
-        return Response(
-            content=body_json,
-            media_type="application/json",
-            headers={
-                "X-SIGNET-Idempotent": "true",
-                "X-SIGNET-Trace": trace_cached,
-            },
-        )
+    return None
+
+def _continuation(request: Request) -> tuple[str, str] | Response | None:
+    """``(trace_id, expected_prev)`` when the client extends an existing trace."""
+    trace_id = request.headers.get("X-SIGNET-Trace")
+    if trace_id is None:
+        return None
+    expected_prev = request.headers.get("X-SIGNET-Prev-Receipt-Hash")
+    if not trace_id or len(trace_id) > _MAX_TRACE_ID_LEN or not expected_prev:
+        return _json_response(400, {
+            "error": "invalid_continuation",
+            "message": "X-SIGNET-Trace requires X-SIGNET-Prev-Receipt-Hash "
+            "(the receipt_hash of the trace's current head)",
+        })
+    return trace_id, expected_prev
+
+def _handle_exchange(
+    req: ExchangeRequest, request: Request, start: float, trace_id: str
+) -> Response:
+    idem_key = request.headers.get("X-SIGNET-Idempotency-Key")
+    accept = codecs.negotiate(request.headers.get("accept"))
+    continuation = _continuation(request)
+    if isinstance(continuation, Response):
+        return continuation
+    if idem_key:
+        with stage("exchange", "idempotency_lookup"):
+            cached = idempotency.lookup(idem_key)
+        if cached is not None:
+            return _replay(cached, accept)
+        # Serialize first use of a key across workers; a loser replays the winner.
+        with idempotency.claim(idem_key) as cached:
+            if cached is not None:
+                return _replay(cached, accept)
+            return _process_exchange(req, idem_key, start, trace_id, continuation, accept)
+    return _process_exchange(req, None, start, trace_id, continuation, accept)
+
+def _trace_not_found(trace_id: str, start: float) -> Response:
+    observe_not_found(time.perf_counter() - start)
+    return _json_response(404, {
+        "error": "trace_not_found",
+        "message": f"Unknown trace {trace_id}",
+    })
 
-    trace_id = str(uuid.uuid4())
+def _replay(cached: dict[str, Any], media_type: str) -> Response:
+    # Ensure idempotent flag true (on a copy; the cache is shared)
+    return Response(
+        content=codecs.encode({**cached, "idempotent": True}, media_type),
+        media_type=media_type,
+        headers={
+            "X-SIGNET-Idempotent": "true",
+            "X-SIGNET-Trace": str(cached.get("trace_id", "")),
+        },
+    )
+
+def _process_exchange(
+    req: ExchangeRequest,
+    idem_key: str | None,
+    start: float,
+    trace_id: str,
+    continuation: tuple[str, str] | None = None,
+    media_type: str = codecs.JSON,
+) -> Response:
     normalized: dict[str, Any] = {"Document": {"Echo": req.payload}}
-    # Enforce computed size after normalization (approx):
-    try:
-        body_bytes = json.dumps(req.model_dump()).encode("utf-8")
-        if len(body_bytes) > settings.max_exchange_body_bytes:
-            return Response(
-                content=json.dumps({
-                    "error": "payload_too_large",
-                    "message": "Request body exceeds size limit",
-                }),
-                status_code=413,
-                media_type="application/json",
-            )
-    except Exception as exc:  # pragma: no cover - defensive
-        logging.getLogger(__name__).debug("Failed to compute body size: %s", exc)
     allowed, reason = True, "no_forward"
     forwarded = None
+    forward_host = None
     try:
+        if continuation:
+            # Before policy and forwarding: an unknown trace is rejected outright.
+            with stage("exchange", "trace_lookup"):
+                receipts_log.sync(trace_id)
+                known = chain_heads.head(trace_id) is not None
+            if not known:
+                return _trace_not_found(trace_id, start)
         if req.forward_url:
-            allowed, reason = is_forward_allowed(req.forward_url)
+            with stage("exchange", "policy"):
+                allowed, reason = is_forward_allowed(req.forward_url)
             if not allowed:
+                _record_decision(False, reason)
                 duration = time.perf_counter() - start
                 observe_denied(duration, reason)
                 # Structured policy violation response
@@ -115,37 +226,56 @@ async def exchange(req: ExchangeRequest, request: Request):
 
             host = urlparse(req.forward_url).hostname or "unknown"
             observe_forward(host)
+            forward_host = host
             forwarded = {"status_code": 202, "host": req.forward_url}
 
-        receipt = write_receipt(trace_id=trace_id, hop=1, normalized=normalized)
-        write_ledger_entry(
-            trace_id=trace_id,
-            hop=1,
-            payload_type=req.payload_type,
-            target_type=req.target_type,
-            cid=str(receipt["cid"]),
-        )
+        with stage("exchange", "write_receipt"):
+            if continuation:
+                try:
+                    receipt = append_receipt(trace_id, continuation[1], normalized)
+                except HeadMovedError as exc:
+                    if exc.head is None:
+                        return _trace_not_found(trace_id, start)
+                    observe_conflict(time.perf_counter() - start)
+                    return _json_response(409, {
+                        "error": "head_moved",
+                        "message": "Trace head does not match X-SIGNET-Prev-Receipt-Hash",
+                        "head": {"receipt_hash": exc.head.receipt_hash, "hop": exc.head.hop},
+                    })
+            else:
+                receipt = write_receipt(trace_id=trace_id, hop=1, normalized=normalized)
+        with stage("exchange", "write_ledger"):
+            write_ledger_entry(
+                trace_id=trace_id,
+                hop=receipt["hop"],
+                payload_type=req.payload_type,
+                target_type=req.target_type,
+                cid=str(receipt["cid"]),
+                forward_host=forward_host,
+            )
+        _record_decision(True, reason)
         policy = {"engine": "HEL", "allowed": allowed, "reason": reason, "cid": receipt["cid"]}
-        # Convert receipt TypedDict to plain dict for Pydantic model compatibility
-        resp_model = ExchangeResponse(
-            trace_id=trace_id,
-            normalized=normalized,
-            policy=policy,
-            receipt=dict(receipt),
-            forwarded=forwarded,
-            idempotent=False,
-        )
+        # Built once, in ExchangeResponse field order; nothing here needs validating.
+        body = {
+            "trace_id": trace_id,
+            "normalized": normalized,
+            "policy": policy,
+            "receipt": receipt,
+            "forwarded": forwarded,
+            "idempotent": False,
+        }
+        with stage("exchange", "serialize"):
+            content = codecs.encode(body, media_type)
         duration = time.perf_counter() - start
         observe_success(duration)
         # Persist idempotency record
         if idem_key:
-            payload_dict = json.loads(resp_model.model_dump_json())
-            _IDEMPOTENCY_CACHE[idem_key] = payload_dict
-            _persist_idempotency(idem_key, payload_dict)
+            with stage("exchange", "idempotency_persist"):
+                idempotency.store(idem_key, body)
         # Return with trace header
         return Response(
-            content=resp_model.model_dump_json(),
-            media_type="application/json",
+            content=content,
+            media_type=media_type,
             headers={
                 "X-SIGNET-Trace": trace_id,
             },
@@ -0,0 +1,73 @@
+import base64
+import binascii
+from datetime import UTC, datetime
+from itertools import islice
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+
+from ...ledger_index import SortKey, query_ledger
+
+router = APIRouter(tags=["ledger"])
+
+_TS_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+class LedgerEntry(BaseModel):
+    trace_id: str
+    hop: int
+    ts: str
+    payload_type: str
+    target_type: str | None = None
+    cid: str
+    forward_host: str | None = None
+
+class LedgerPage(BaseModel):
+    items: list[LedgerEntry]
+    next_cursor: str | None = None
+
+def _encode_cursor(key: SortKey) -> str:
+    return base64.urlsafe_b64encode(f"{key[0]}|{key[1]}".encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> SortKey:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, seq = raw.rsplit("|", 1)
+        return ts, int(seq)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
+def _normalize_ts(value: str | None, name: str) -> str | None:
+    """Accept any ISO-8601 timestamp and map it onto the ledger's UTC format."""
+    if value is None:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} timestamp") from exc
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(UTC)
+    return dt.strftime(_TS_FORMAT)
+
+# Sync, so the index lookup and the mmap reads run in the threadpool, not on the loop.
+@router.get("/ledger", response_model=LedgerPage)
+def list_ledger(
+    payload_type: str | None = None,
+    cid: str | None = None,
+    trace_id: str | None = None,
+    since: str | None = Query(None, description="Inclusive lower bound on ts (ISO-8601)"),
+    until: str | None = Query(None, description="Inclusive upper bound on ts (ISO-8601)"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = None,
+):
+    """Query ledger entries by payload type, CID, trace and time range, oldest first."""
+    matches = query_ledger(
+        payload_type=payload_type,
+        cid=cid,
+        trace_id=trace_id,
+        since=_normalize_ts(since, "since"),
+        until=_normalize_ts(until, "until"),
+        after=_decode_cursor(cursor) if cursor else None,
+    )
+    page = list(islice(matches, limit + 1))
+    next_cursor = _encode_cursor(page[limit - 1][0]) if len(page) > limit else None
+    return {"items": [entry for _, entry in page[:limit]], "next_cursor": next_cursor}
@@ -1,16 +1,40 @@
+import asyncio
+import base64
+import binascii
 import json
 import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from contextlib import ExitStack
 from typing import Any
 
-from fastapi import APIRouter, HTTPException, Response
+from fastapi import APIRouter, Header, HTTPException, Query, Response
 from pydantic import BaseModel
 
-from ...receipts import read_chain
+from ... import blobs, chain_heads, codecs, compression
+from ...compression import Representation
+from ...logtail import receipts_log
+from ...metrics import observe_export_cache, observe_trace_lookup
+from ...receipts import chain_slices
 from ...security import sign_bundle
 from ...settings import settings
+from ...tracing import operation, stage
+from ...trace_index import might_contain
 
 router = APIRouter(tags=["receipts"])
 
+def _check_known(trace_id: str) -> None:
+    # Unknown trace ids are rejected by the in-memory filter without touching the log.
+    if not might_contain(trace_id):
+        observe_trace_lookup("filtered")
+        raise HTTPException(status_code=404, detail="Chain not found")
+
+def _check_found(found: bool) -> None:
+    if not found:
+        observe_trace_lookup("false_positive")
+        raise HTTPException(status_code=404, detail="Chain not found")
+    observe_trace_lookup("hit")
+
 class Receipt(BaseModel):
     trace_id: str
     ts: str
@@ -21,30 +45,208 @@ class Receipt(BaseModel):
     hop: int
     normalized: dict[str, object] | None = None
 
+_RECEIPT_FIELDS = tuple(Receipt.model_fields)
+# ``fields=links``: everything but the body, i.e. the hashes that link the chain.
+_LINK_FIELDS = frozenset(_RECEIPT_FIELDS) - {"normalized"}
+
+def _encode_cursor(hop: int) -> str:
+    return base64.urlsafe_b64encode(str(hop).encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
+def _parse_fields(fields: str | None) -> frozenset[str] | None:
+    if fields is None:
+        return None
+    wanted: set[str] = set()
+    for name in filter(None, (f.strip() for f in fields.split(","))):
+        if name == "links":
+            wanted |= _LINK_FIELDS
+        elif name in _RECEIPT_FIELDS:
+            wanted.add(name)
+        else:
+            raise HTTPException(status_code=400, detail=f"Unknown field {name!r}")
+    if not wanted:
+        raise HTTPException(status_code=400, detail="fields must name at least one field")
+    return frozenset(wanted)
+
+def _project(
+    record: Mapping[str, Any], line: bytes | memoryview, fields: frozenset[str], bodies: bool
+) -> bytes:
+    # chain_slices joined the body into the line when bodies were asked for.
+    line_keys = record.keys() | {"normalized"} if bodies else record.keys()
+    if fields >= line_keys:
+        return bytes(line)  # the line already is exactly the projection
+    if "normalized" in fields:
+        record = blobs.joined(record)
+    # Same encoding as the stored lines.
+    return json.dumps(
+        {k: record[k] for k in _RECEIPT_FIELDS if k in fields and k in record},
+        ensure_ascii=False,
+    ).encode()
+
+def _as_object(record: Mapping[str, Any], fields: frozenset[str] | None) -> Mapping[str, Any]:
+    """A receipt for binary encodings, which are built from records rather than lines."""
+    if fields is None or "normalized" in fields:
+        record = blobs.joined(record)
+    if fields is None:
+        return record
+    return {k: record[k] for k in _RECEIPT_FIELDS if k in fields and k in record}
+
 @router.get("/receipts/chain/{trace_id}", response_model=list[Receipt])
-async def get_chain(trace_id: str):
-    chain = read_chain(trace_id)
-    if not chain:
-        raise HTTPException(status_code=404, detail="Chain not found")
-    return chain
+async def get_chain(
+    trace_id: str,
+    from_hop: int | None = Query(None, ge=0, description="First hop to return (inclusive)"),
+    limit: int | None = Query(None, ge=1, le=10000),
+    fields: str | None = Query(
+        None, description="Comma-separated receipt fields; 'links' = all but normalized"
+    ),
+    cursor: str | None = None,
+    accept: str | None = Header(None),
+    accept_encoding: str | None = Header(None),
+    if_none_match: str | None = Header(None),
+):
+    """The chain in hop order, or one page of it.
+
+    With ``limit``, a further page is announced by ``X-SIGNET-Next-Cursor``; pass it
+    back as ``cursor``. ``fields`` trims each receipt (``fields=links`` leaves out
+    the bodies), so a client syncing a long trace can fetch just the new hops' hashes
+    with ``from_hop=<last seen + 1>&fields=links``.
+    """
+    if cursor is not None and from_hop is not None:
+        raise HTTPException(status_code=400, detail="Use either cursor or from_hop")
+    start = _decode_cursor(cursor) if cursor is not None else from_hop or 0
+    wanted = _parse_fields(fields)
+    _check_known(trace_id)
+    media_type = codecs.negotiate(accept)
+    # The scan, encoding and compression block; keep them off the event loop.
+    return await asyncio.to_thread(
+        _chain_response, trace_id, start, limit, wanted, media_type, accept_encoding,
+        if_none_match,
+    )
+
+def _chain_response(
+    trace_id: str,
+    start: int,
+    limit: int | None,
+    wanted: frozenset[str] | None,
+    media_type: str,
+    accept_encoding: str | None,
+    if_none_match: str | None,
+) -> Response:
+    bodies = wanted is None or "normalized" in wanted
+    headers: dict[str, str] = {"Vary": "Accept"}
+    # Stored lines are already valid Receipt JSON; copy them out of the mapped log.
+    with chain_slices(trace_id, start, None if limit is None else limit + 1, bodies) as items:
+        if items:
+            observe_trace_lookup("hit")
+        else:
+            # Past the head is an empty page, not a missing chain.
+            _check_found(start > 0 and chain_heads.head(trace_id) is not None)
+        if limit is not None and len(items) > limit:
+            headers["X-SIGNET-Next-Cursor"] = _encode_cursor(int(items[limit][0]["hop"]))
+            del items[limit:]
+        if media_type != codecs.JSON:
+            content = codecs.encode([_as_object(rec, wanted) for rec, _ in items], media_type)
+        elif wanted is None:
+            content = b"[" + b", ".join(line for _, line in items) + b"]"
+        else:
+            lines = [_project(rec, line, wanted, bodies) for rec, line in items]
+            content = b"[" + b", ".join(lines) + b"]"
+    rep = Representation(content, media_type)
+    return compression.respond(rep, "chain", accept_encoding, if_none_match, headers)
+
+# Signed bundles by (trace_id, head receipt_hash, media type). A bundle changes only
+# when its trace grows, so for SP_EXPORT_CACHE_TTL seconds it is served as is: the
+# same exported_at and signature, and the encodings already compressed.
+_BundleKey = tuple[str, str, str]
+_bundles: OrderedDict[_BundleKey, tuple[float, dict[str, str], Representation]] = OrderedDict()
+
+def _cached_bundle(key: _BundleKey) -> tuple[dict[str, str], Representation] | None:
+    entry = _bundles.get(key)
+    if entry is None or time.monotonic() - entry[0] > settings.export_cache_ttl:
+        _bundles.pop(key, None)
+        observe_export_cache("miss")
+        return None
+    _bundles.move_to_end(key)
+    observe_export_cache("hit")
+    return entry[1], entry[2]
+
+def _cache_bundle(key: _BundleKey, headers: dict[str, str], rep: Representation) -> None:
+    _bundles[key] = (time.monotonic(), headers, rep)
+    total = sum(entry[2].size for entry in _bundles.values())
+    while total > settings.export_cache_max_bytes and len(_bundles) > 1:
+        _, (_, _, evicted) = _bundles.popitem(last=False)
+        total -= evicted.size
 
 @router.get("/receipts/export/{trace_id}")
-async def export_chain(trace_id: str):
-    chain = read_chain(trace_id)
-    if not chain:
-        raise HTTPException(status_code=404, detail="Chain not found")
-    bundle: dict[str, Any] = {
-        "trace_id": trace_id,
-        "chain": chain,
-        "exported_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-    }
-    bundle_cid = str(chain[-1]["receipt_hash"])  # simple stand-in
-    exported_at = str(bundle["exported_at"])
-    signature = sign_bundle(bundle_cid, trace_id, exported_at)
-    # Signed export headers (stable contract)
-    headers: dict[str, str] = {
-        "X-SIGNET-Response-CID": bundle_cid,
-        "X-SIGNET-Signature": signature,
-        "X-SIGNET-KID": settings.kid,
-    }
-    return Response(content=json.dumps(bundle), media_type="application/json", headers=headers)
+async def export_chain(
+    trace_id: str,
+    accept: str | None = Header(None),
+    accept_encoding: str | None = Header(None),
+    if_none_match: str | None = Header(None),
+):
+    media_type = codecs.negotiate(accept)
+    with operation("export"):
+        _check_known(trace_id)
+        receipts_log.sync(trace_id)
+        head = chain_heads.head(trace_id)
+        head_hash = head.receipt_hash if head is not None else None
+        cached = _cached_bundle((trace_id, head_hash, media_type)) if head_hash else None
+        if cached is not None:
+            with stage("export", "compress"):
+                return await compression.respond_async(
+                    cached[1], "export", accept_encoding, if_none_match, cached[0]
+                )
+        # Reading, signing, encoding and compressing a bundle block; run them in a
+        # thread. The cache itself is only touched here, on the event loop.
+        bundle_cid, headers, rep, response = await asyncio.to_thread(
+            _export_response, trace_id, media_type, accept_encoding, if_none_match
+        )
+        _cache_bundle((trace_id, bundle_cid, media_type), headers, rep)
+        return response
+
+def _export_response(
+    trace_id: str, media_type: str, accept_encoding: str | None, if_none_match: str | None
+) -> tuple[str, dict[str, str], Representation, Response]:
+    with ExitStack() as held:
+        with stage("export", "read_chain"):
+            items = held.enter_context(chain_slices(trace_id))
+        _check_found(bool(items))
+        exported_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        bundle_cid = str(items[-1][0]["receipt_hash"])  # simple stand-in
+        with stage("export", "sign"):
+            signature = sign_bundle(bundle_cid, trace_id, exported_at)
+        # Signed export headers (stable contract)
+        headers: dict[str, str] = {
+            "X-SIGNET-Response-CID": bundle_cid,
+            "X-SIGNET-Signature": signature,
+            "X-SIGNET-KID": settings.kid,
+            "Vary": "Accept",
+        }
+        with stage("export", "serialize"):
+            if media_type != codecs.JSON:
+                content = codecs.encode({
+                    "trace_id": trace_id,
+                    "chain": [blobs.joined(rec) for rec, _ in items],
+                    "exported_at": exported_at,
+                }, media_type)
+            else:
+                # Same document as json.dumps({"trace_id", "chain", "exported_at"}), with
+                # the chain spliced in from the log instead of re-encoded.
+                content = b"".join((
+                    b'{"trace_id": ',
+                    json.dumps(trace_id).encode(),
+                    b', "chain": [',
+                    b", ".join(line for _, line in items),
+                    b'], "exported_at": ',
+                    json.dumps(exported_at).encode(),
+                    b"}",
+                ))
+    rep = Representation(content, media_type)
+    with stage("export", "compress"):
+        response = compression.respond(rep, "export", accept_encoding, if_none_match, headers)
+    return bundle_cid, headers, rep, response
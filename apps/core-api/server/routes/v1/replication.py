@@ -0,0 +1,62 @@
+import asyncio
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+
+from ... import blobs, replica, shards
+from ...auth import require_admin
+from ...settings import settings
+
+router = APIRouter(prefix="/replication", tags=["replication"])
+
+def _read_chunk(path: str, offset: int) -> tuple[bytes, int]:
+    """Complete lines from ``offset`` (at most one chunk) and the current log size."""
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        size = 0
+    if offset > size:
+        raise HTTPException(status_code=416, detail="Offset beyond end of log")
+    if offset == size:
+        return b"", size
+    with open(path, "rb") as f:
+        f.seek(offset)
+        chunk = f.read(min(size - offset, settings.replication_chunk_bytes))
+    # A writer may be mid-append; ship whole lines only.
+    return chunk[: chunk.rfind(b"\n") + 1], size
+
+@router.get("/status")
+async def replication_status() -> dict[str, object]:
+    """Role of this node and, on a replica, how far behind its source it is."""
+    return replica.status()
+
+@router.get("/manifest", dependencies=[Depends(require_admin)])
+async def manifest() -> dict[str, object]:
+    """Receipt shard count and the current size of every replicated log."""
+    sizes = {}
+    for name, path in replica.log_paths().items():
+        try:
+            sizes[name] = os.path.getsize(path)
+        except FileNotFoundError:
+            sizes[name] = 0
+    return {"shards": shards.count(), "logs": sizes}
+
+@router.get("/logs/{name}", dependencies=[Depends(require_admin)])
+async def read_log(name: str, offset: int = Query(0, ge=0)) -> Response:
+    """Raw JSONL bytes of log ``name`` from ``offset``; replicas append them verbatim."""
+    path = replica.log_paths().get(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Unknown log")
+    chunk, size = await asyncio.to_thread(_read_chunk, path, offset)
+    return Response(
+        content=chunk,
+        media_type="application/x-ndjson",
+        headers={"X-SIGNET-Log-Size": str(size)},
+    )
+
+@router.get("/blobs/{cid}", dependencies=[Depends(require_admin)])
+async def read_blob(cid: str) -> Response:
+    data = blobs.get_bytes(cid)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Unknown blob")
+    return Response(content=data, media_type="application/json")
@@ -1,4 +1,5 @@
 import base64
+import json
 import logging
 import time
 from typing import Any
@@ -9,15 +10,19 @@ from .settings import settings
 
 _cached_pub: dict[str, Any] | None = None
 _cached_at: float = 0.0
+_jwks_bytes: tuple[dict[str, Any], bytes] | None = None
+_configured: tuple[str, SigningKey] | None = None
 
 _dev_warned = False
 _dev_sk: SigningKey | None = None
 
 def get_signing_key() -> SigningKey:
-    global _dev_warned
+    global _dev_warned, _configured
     if settings.private_key_b64:
-        raw = base64.urlsafe_b64decode(settings.private_key_b64 + "===")
-        return SigningKey(raw)
+        if _configured is None or _configured[0] != settings.private_key_b64:
+            raw = base64.urlsafe_b64decode(settings.private_key_b64 + "===")
+            _configured = (settings.private_key_b64, SigningKey(raw))
+        return _configured[1]
     global _dev_sk
     if _dev_sk is None:
         if not _dev_warned:
@@ -42,6 +47,14 @@ def current_jwk() -> dict[str, Any]:
 def jwks_response() -> dict[str, Any]:
     return {"keys": [current_jwk()]}
 
+def jwks_bytes() -> bytes:
+    """Serialized JWKS document, re-encoded only when the cached JWK changes."""
+    global _jwks_bytes
+    jwk = current_jwk()
+    if _jwks_bytes is None or _jwks_bytes[0] is not jwk:
+        _jwks_bytes = (jwk, json.dumps({"keys": [jwk]}, separators=(",", ":")).encode())
+    return _jwks_bytes[1]
+
 def sign_bundle(bundle_cid: str, trace_id: str, exported_at: str) -> str:
     message = f"{bundle_cid}|{trace_id}|{exported_at}".encode()
     sig = get_signing_key().sign(message).signature
@@ -32,14 +32,61 @@ def _parse_allowlist(value: str | list[str] | None) -> list[str]:
 
 
 class Settings(BaseSettings):
-    api_keys: dict[str, dict] = {}
+    api_keys: dict[str, dict] = {}  # key -> {name, admin, rate_per_sec, burst, max_concurrency}
+    api_key_rate_per_sec: float = 50.0  # per-key defaults when the key sets no override
+    api_key_burst: float | None = None  # defaults to one second of rate
+    api_key_max_concurrency: int = 16
     hel_allowlist: str | None = None  # raw env string; parsed version exposed via property
     private_key_b64: str | None = None
     kid: str = "local-dev-kid-1"
     ledger_path: str = "data/ledger.jsonl"
     receipts_path: str = "data/receipts.jsonl"
+    receipt_shards: int = 1  # >1 splits receipts by trace_id hash (see server/shards.py)
+    receipt_shard_workers: int = 8  # exchange threads per shard in each worker process
+    idempotency_path: str = "data/idempotency.jsonl"
+    lock_dir: str | None = None  # defaults to <receipts dir>/locks
+    blob_store_enabled: bool = False  # large normalized bodies stored once, by CID
+    blob_min_bytes: int = 4096  # smaller bodies stay inline in the log
+    blob_cache_bytes: int = 16 << 20  # recently read blob bodies kept in memory
+    blobs_dir: str | None = None  # defaults to <receipts dir>/blobs
+    lock_stripes: int = 256  # lock files per namespace (trace, idempotency)
     jwks_cache_ttl: int = 3600
     max_exchange_body_bytes: int = 65536  # 64 KiB default limit
+    compression_min_bytes: int = 1024  # chain/export bodies below this are sent as is
+    gzip_level: int = 6
+    zstd_level: int = 3
+    export_cache_ttl: float = 300.0  # seconds a signed bundle (and exported_at) is reused
+    export_cache_max_bytes: int = 64 << 20  # bundles plus their compressed encodings
+    trace_filter_capacity: int = 1_000_000  # initial trace_id filter sizing (grows past it)
+    trace_filter_error_rate: float = 0.001
+    events_buffer_size: int = 256  # per-subscriber queue; overflow disconnects the client
+    events_max_subscribers: int = 1000
+    events_poll_interval: float = 1.0  # seconds between checks for other writers' appends
+    events_keepalive_interval: float = 15.0
+    metrics_cache_ttl: float = 1.0  # seconds a merged multiprocess scrape is reused
+    http_metrics_max_paths: int = 200  # distinct route labels before folding into "<other>"
+    admission_enabled: bool = True  # adaptive concurrency limit on POST /v1/exchange
+    admission_initial_limit: int = 32
+    admission_min_limit: int = 4
+    admission_max_limit: int = 512
+    admission_max_queue: int = 256
+    admission_target_delay: float = 0.05  # seconds; CoDel target for queue delay
+    admission_interval: float = 0.5  # seconds above target before shedding (CoDel interval)
+    admission_queue_timeout: float = 2.0
+    admission_backoff: float = 0.9  # multiplicative limit decrease on shed
+    admission_retry_after: int = 1
+    stage_metrics_enabled: bool = True  # per-stage latency histograms
+    otel_enabled: bool = False  # OpenTelemetry spans for sampled operations
+    otel_sample_ratio: float = 0.01
+    otel_exporter: str = "none"  # none | console | otlp
+    replica: bool = False  # read-only follower: refuses exchanges, reports replication lag
+    replica_primary_url: str | None = None  # pull logs over HTTP; else tail shared files
+    replica_api_key: str | None = None  # admin API key of the primary
+    replica_poll_interval: float = 1.0
+    replication_chunk_bytes: int = 4 << 20  # max bytes served per replication request
+    compliance_warm_on_startup: bool = False  # else built on the first compliance request
+    profiling_enabled: bool = False  # mounts /v1/admin/profile/* (admin API keys only)
+    profiling_max_seconds: float = 60.0
 
     model_config = SettingsConfigDict(env_prefix="SP_", env_file=".env", env_file_encoding="utf-8")
 
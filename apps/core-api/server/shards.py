@@ -0,0 +1,203 @@
+"""Receipt log sharding by trace_id.
+
+With ``SP_RECEIPT_SHARDS=N`` (N > 1) receipts are spread over N files next to
+``SP_RECEIPTS_PATH`` (``receipts.000-of-008.jsonl`` ...), chosen by a stable hash of
+the trace_id. A trace lives entirely in one shard, so a write appends to, and a
+chain read scans, only that file, and the log follower catches up on that shard
+alone. Exchanges run on a writer pool per shard (``SP_RECEIPT_SHARD_WORKERS``
+threads each, 8 by default) instead of the event loop, so writes to different
+shards proceed in parallel. An exchange holds its thread until it completes
+(forward included), which caps a process at shards times workers exchanges in
+progress. N = 1, the default, is the single ``receipts.jsonl``.
+
+The shard count is part of the data layout: file names carry it, and a server
+started with a different N sees none of the existing receipts. Stop the server and
+re-split the data with ``python -m server.shards migrate --to N``.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+_executors: dict[int, ThreadPoolExecutor] = {}
+_waits: contextvars.ContextVar[list[float] | None] = contextvars.ContextVar(
+    "shard_pool_waits", default=None
+)
+
+
+def count() -> int:
+    return max(1, settings.receipt_shards)
+
+
+def shard_of(trace_id: str, n: int | None = None) -> int:
+    """Shard index of ``trace_id``; stable across processes and restarts."""
+    n = count() if n is None else n
+    if n == 1:
+        return 0
+    digest = hashlib.blake2b(trace_id.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % n
+
+
+def path(index: int, n: int | None = None) -> str:
+    n = count() if n is None else n
+    if n == 1:
+        return settings.receipts_path
+    stem, ext = os.path.splitext(settings.receipts_path)
+    return f"{stem}.{index:03d}-of-{n:03d}{ext}"
+
+
+def paths(n: int | None = None) -> list[str]:
+    n = count() if n is None else n
+    return [path(i, n) for i in range(n)]
+
+
+def path_for(trace_id: str) -> str:
+    return path(shard_of(trace_id))
+
+
+def check_layout() -> None:
+    """Warn when receipts exist only in another shard layout (unmigrated data)."""
+    if any(os.path.exists(p) for p in paths()):
+        return
+    stem, ext = os.path.splitext(os.path.basename(settings.receipts_path))
+    directory = os.path.dirname(settings.receipts_path) or "."
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    others = [n for n in names if n.startswith(stem + ".") and n.endswith(ext)]
+    if others:
+        logger.warning(
+            "No receipts in the %d-shard layout, but found %s; run "
+            "`python -m server.shards migrate --to %d`",
+            count(), ", ".join(sorted(others)), count(),
+        )
+
+
+def _executor(index: int) -> ThreadPoolExecutor:
+    ex = _executors.get(index)
+    if ex is None:
+        ex = _executors.setdefault(index, ThreadPoolExecutor(
+            max_workers=settings.receipt_shard_workers,
+            thread_name_prefix=f"signet-shard-{index}",
+        ))
+    return ex
+
+
+@contextlib.contextmanager
+def measure_wait() -> Iterator[list[float]]:
+    """Collect how long each ``run`` inside the block queued for a pool thread."""
+    waits: list[float] = []
+    token = _waits.set(waits)
+    try:
+        yield waits
+    finally:
+        _waits.reset(token)
+
+
+async def run(trace_id: str, fn: Callable[..., Any], *args: Any) -> Any:
+    """Run blocking ``fn(*args)`` on the writer pool of ``trace_id``'s shard."""
+    context = contextvars.copy_context()
+    waits = _waits.get()
+    submitted = time.monotonic()
+
+    def call() -> Any:
+        if waits is not None:
+            waits.append(time.monotonic() - submitted)
+        return context.run(fn, *args)
+
+    return await asyncio.get_running_loop().run_in_executor(_executor(shard_of(trace_id)), call)
+
+
+def shutdown() -> None:
+    for ex in _executors.values():
+        ex.shutdown(wait=True)
+    _executors.clear()
+
+
+def migrate(to: int, source: int = 1, remove_source: bool = False) -> dict[str, int]:
+    """Re-split the receipts of the ``source`` layout into ``to`` shards.
+
+    Lines are copied byte for byte and keep their order, so each chain stays in hop
+    order. Targets are written to temporary files and renamed at the end; existing
+    targets are refused. Run with the server stopped.
+    """
+    if to < 1 or source < 1 or to == source:
+        raise ValueError("--to and --from must be different positive shard counts")
+    targets = paths(to)
+    existing = [p for p in targets if os.path.exists(p)]
+    if existing:
+        raise FileExistsError(f"target shard files already exist: {', '.join(existing)}")
+    stats = {"records": 0, "skipped": 0}
+    outs = [open(p + ".tmp", "wb") for p in targets]  # noqa: SIM115 - closed below
+    try:
+        for src in paths(source):
+            if not os.path.exists(src):
+                continue
+            with open(src, "rb") as f:
+                for line in f:
+                    try:
+                        trace_id = json.loads(line).get("trace_id")
+                    except (ValueError, AttributeError):
+                        trace_id = None
+                    if not isinstance(trace_id, str) or not line.endswith(b"\n"):
+                        stats["skipped"] += 1
+                        continue
+                    outs[shard_of(trace_id, to)].write(line)
+                    stats["records"] += 1
+    except BaseException:
+        for out in outs:
+            out.close()
+            os.remove(out.name)
+        raise
+    for out, target in zip(outs, targets, strict=True):
+        out.flush()
+        os.fsync(out.fileno())
+        out.close()
+        os.replace(out.name, target)
+    if remove_source:
+        for src in paths(source):
+            if os.path.exists(src):
+                os.remove(src)
+    return stats
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m server.shards")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    m = sub.add_parser("migrate", help="re-split receipts into a new shard count")
+    m.add_argument("--to", type=int, required=True, help="target shard count")
+    m.add_argument("--from", dest="source", type=int, default=1, help="current shard count")
+    m.add_argument("--remove-source", action="store_true")
+    args = p.parse_args(argv)
+    try:
+        stats = migrate(args.to, args.source, args.remove_source)
+    except (ValueError, FileExistsError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    for target in paths(args.to):
+        print(target)
+    print(
+        f"migrated {stats['records']} receipts into {args.to} shards"
+        f" ({stats['skipped']} malformed lines skipped)",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Startup phases, readiness and time-to-first-request.
+
+The lifespan runs each warm-up step through ``phase()`` so its duration is exported
+as ``signet_startup_phase_seconds{phase}``; ``/readyz`` answers 503 until they have
+all finished. ``imports`` covers interpreter start up to the lifespan (module
+imports, app construction). Time-to-first-request is measured from process start
+to the end of the first non-probe request, which on an auto-stopped machine is what
+the waking client actually waits for.
+"""
+
+import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from .metrics import observe_ready, observe_startup_phase, observe_time_to_first_request
+
+# Requests from health checks and scrapers do not count as the first request.
+PROBE_PATHS = frozenset({"/healthz", "/readyz", "/metrics"})
+
+
+def _process_age() -> float | None:
+    """Seconds since this process was started, from /proc (None elsewhere)."""
+    try:
+        with open("/proc/self/stat", encoding="ascii") as f:
+            # Field 22 (starttime) follows the parenthesised command name.
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime", encoding="ascii") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# Process start on the monotonic clock; falls back to when this module was imported.
+_age = _process_age()
+started_at = time.monotonic() - (_age if _age is not None else 0.0)
+
+ready = False
+phases: dict[str, float] = {}
+time_to_first_request: float | None = None
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = time.perf_counter() - start
+        observe_startup_phase(name, phases[name])
+
+
+def begin() -> None:
+    """Record the import phase; call first thing in the lifespan."""
+    global ready
+    ready = False
+    observe_ready(False)
+    phases.clear()
+    phases["imports"] = time.monotonic() - started_at
+    observe_startup_phase("imports", phases["imports"])
+
+
+def mark_ready() -> None:
+    global ready
+    ready = True
+    observe_ready(True)
+
+
+def first_request_done(path: str) -> None:
+    """Called by the HTTP metrics middleware until the first real request completes."""
+    global time_to_first_request
+    if time_to_first_request is None and path not in PROBE_PATHS:
+        time_to_first_request = time.monotonic() - started_at
+        observe_time_to_first_request(time_to_first_request)
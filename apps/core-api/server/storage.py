@@ -0,0 +1,83 @@
+"""Multi-process safe primitives for the JSONL data directory.
+
+Several uvicorn workers may share one data directory. Appends go through a single
+``O_APPEND`` write per record so concurrent writers never interleave partial lines,
+and read-modify-append sequences (chain heads, idempotency claims) are serialized
+with ``named_lock``: an advisory file lock striped over a fixed number of lock files
+per namespace, combined with a thread lock for writers inside one process.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from .settings import settings
+
+# Branch on sys.platform (not ImportError) so mypy checks only this platform's calls.
+if sys.platform == "win32":  # pragma: no cover - Windows
+    import msvcrt
+else:
+    import fcntl
+
+# Lock stripes are keyed by (lock file path); each holds a thread lock and an open fd.
+_stripes: dict[str, tuple[threading.Lock, int]] = {}
+_stripes_guard = threading.Lock()
+
+
+def append_jsonl(path: str, obj: dict[str, object]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    line = (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        # One write() per record: O_APPEND makes it land whole at the end of the file.
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def _lock_dir() -> str:
+    return settings.lock_dir or os.path.join(os.path.dirname(settings.receipts_path), "locks")
+
+
+def _stripe(namespace: str, name: str) -> tuple[threading.Lock, int]:
+    digest = hashlib.blake2b(name.encode(), digest_size=8).digest()
+    index = int.from_bytes(digest, "little") % settings.lock_stripes
+    path = os.path.join(_lock_dir(), f"{namespace}-{index:04d}.lock")
+    stripe = _stripes.get(path)
+    if stripe is None:
+        with _stripes_guard:
+            stripe = _stripes.get(path)
+            if stripe is None:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+                stripe = _stripes[path] = (threading.Lock(), fd)
+    return stripe
+
+
+@contextmanager
+def named_lock(namespace: str, name: str) -> Iterator[None]:
+    """Hold an exclusive cross-process lock for ``name`` within ``namespace``.
+
+    Different namespaces use different lock files, so a holder of an ``idempotency``
+    lock may take a ``trace`` lock without self-deadlocking on a shared stripe. Never
+    await while holding one: the lock is blocking.
+    """
+    tlock, fd = _stripe(namespace, name)
+    with tlock:
+        if sys.platform == "win32":  # pragma: no cover - Windows
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if sys.platform == "win32":  # pragma: no cover - Windows
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(fd, fcntl.LOCK_UN)
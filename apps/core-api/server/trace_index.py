@@ -0,0 +1,133 @@
+"""In-memory membership filter of known trace_ids.
+
+Chain lookups for unknown traces (typos, scanners) used to cost a full scan of
+``receipts.jsonl`` before answering 404. The filter answers "definitely unknown" in a
+few microseconds; only "maybe known" falls through to the file.
+"""
+
+import hashlib
+import math
+import threading
+from typing import Any
+
+from .logtail import receipts_log
+from .metrics import observe_trace_filter
+from .settings import settings
+
+_LN2_SQ = math.log(2) ** 2
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter using double hashing over a blake2b digest."""
+
+    __slots__ = ("bits", "capacity", "count", "error_rate", "k", "m")
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.m = max(8, math.ceil(-self.capacity * math.log(error_rate) / _LN2_SQ))
+        self.k = max(1, round(self.m / self.capacity * math.log(2)))
+        self.bits = bytearray((self.m + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> list[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        m = self.m
+        return [(h1 + i * h2) % m for i in range(self.k)]
+
+    def add(self, key: str) -> None:
+        bits = self.bits
+        for pos in self._positions(key):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def estimated_fp_rate(self) -> float:
+        return (1.0 - math.exp(-self.k * self.count / self.m)) ** self.k
+
+
+class ScalableBloomFilter:
+    """Chain of Bloom filters that grows instead of degrading past its capacity.
+
+    Each new stage doubles the capacity and halves the error rate so the compound
+    false-positive rate stays bounded by roughly twice the configured rate.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.stages: list[BloomFilter] = [BloomFilter(capacity, error_rate / 2)]
+
+    def add(self, key: str) -> None:
+        stage = self.stages[-1]
+        if stage.count >= stage.capacity:
+            stage = BloomFilter(stage.capacity * 2, stage.error_rate / 2)
+            self.stages.append(stage)
+        stage.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        return any(key in stage for stage in self.stages)
+
+    @property
+    def count(self) -> int:
+        return sum(stage.count for stage in self.stages)
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(len(stage.bits) for stage in self.stages)
+
+    def estimated_fp_rate(self) -> float:
+        miss = 1.0
+        for stage in self.stages:
+            miss *= 1.0 - stage.estimated_fp_rate()
+        return 1.0 - miss
+
+
+class TraceIndex:
+    """Receipt-log subscriber maintaining the trace_id filter."""
+
+    def __init__(self) -> None:
+        self.filter = self._new_filter()
+        # Shards are synced in parallel; setting bits is a read-modify-write.
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _new_filter() -> ScalableBloomFilter:
+        return ScalableBloomFilter(settings.trace_filter_capacity, settings.trace_filter_error_rate)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.filter = self._new_filter()
+
+    def apply(self, offset: int, record: dict[str, Any]) -> None:
+        trace_id = record.get("trace_id")
+        # Only the first hop introduces a trace; later hops are already members.
+        if isinstance(trace_id, str) and (record.get("hop") == 1 or trace_id not in self.filter):
+            with self._lock:
+                self.filter.add(trace_id)
+            self.report()
+
+    def report(self) -> None:
+        f = self.filter
+        observe_trace_filter(f.count, f.size_bytes, f.estimated_fp_rate())
+
+
+_index = TraceIndex()
+receipts_log.subscribe(_index)
+
+
+def warm() -> None:
+    """Build the filter from the receipt log (called at startup)."""
+    receipts_log.sync()
+    _index.report()
+
+
+def might_contain(trace_id: str) -> bool:
+    """Return False only if ``trace_id`` has definitely never been written."""
+    if trace_id in _index.filter:
+        return True
+    # Catch up on appends from other writers before answering "unknown".
+    return bool(receipts_log.sync(trace_id)) and trace_id in _index.filter
@@ -0,0 +1,81 @@
+"""Per-stage latency histograms and sampled OpenTelemetry spans.
+
+``operation()`` wraps a whole request-level unit of work (an exchange, an export) and
+makes the sampling decision once; ``stage()`` times one step inside it. Stage timings
+always feed the ``signet_stage_latency_seconds`` histogram (a perf_counter pair and
+one observe). Spans are only created for sampled operations, so unsampled requests
+never pay for span objects; the OpenTelemetry SDK is imported on first use.
+"""
+
+import logging
+import random
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any
+
+from .metrics import observe_stage
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+_sampled: ContextVar[bool] = ContextVar("signet_trace_sampled", default=False)
+_tracer: Any = None
+
+
+def _get_tracer() -> Any:
+    global _tracer
+    if _tracer is None:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+        # Sampling is decided per operation below, so the provider records everything
+        # it is handed.
+        provider = TracerProvider(resource=Resource.create({"service.name": "signet-core-api"}))
+        exporter: Any = None
+        if settings.otel_exporter == "console":
+            exporter = ConsoleSpanExporter()
+        elif settings.otel_exporter == "otlp":
+            try:
+                from opentelemetry.exporter.otlp.proto.http.trace_exporter import (  # type: ignore[import-not-found]
+                    OTLPSpanExporter,
+                )
+            except ImportError:
+                logger.warning("SP_OTEL_EXPORTER=otlp needs opentelemetry-exporter-otlp-proto-http")
+            else:
+                exporter = OTLPSpanExporter()
+        if exporter is not None:
+            provider.add_span_processor(BatchSpanProcessor(exporter))
+        trace.set_tracer_provider(provider)
+        _tracer = trace.get_tracer("signet.core")
+    return _tracer
+
+
+@contextmanager
+def operation(name: str) -> Iterator[None]:
+    """Root of a traced unit of work; decides whether its stages produce spans."""
+    if not settings.otel_enabled or random.random() >= settings.otel_sample_ratio:  # noqa: S311
+        yield
+        return
+    token = _sampled.set(True)
+    try:
+        with _get_tracer().start_as_current_span(name):
+            yield
+    finally:
+        _sampled.reset(token)
+
+
+@contextmanager
+def stage(op: str, name: str) -> Iterator[None]:
+    """Time one step of ``op``; emits a child span when the operation is sampled."""
+    span = _get_tracer().start_as_current_span(f"{op}.{name}") if _sampled.get() else nullcontext()
+    start = time.perf_counter()
+    try:
+        with span:
+            yield
+    finally:
+        if settings.stage_metrics_enabled:
+            observe_stage(op, name, time.perf_counter() - start)
@@ -0,0 +1,149 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from prometheus_client import REGISTRY
+
+from server import admission, idempotency, shards
+from server.admission import AdmissionController
+from server.main import app
+from server.settings import settings
+
+
+def _shed(reason: str) -> float:
+    return REGISTRY.get_sample_value("signet_admission_shed_total", {"reason": reason}) or 0.0
+
+
+@pytest.fixture
+def tight(monkeypatch):
+    monkeypatch.setattr(settings, "admission_initial_limit", 1)
+    monkeypatch.setattr(settings, "admission_min_limit", 1)
+    monkeypatch.setattr(settings, "admission_max_queue", 1)
+    monkeypatch.setattr(settings, "admission_queue_timeout", 0.2)
+
+
+def test_queue_full_and_fifo_handoff(tight):
+    async def run():
+        ctl = AdmissionController()
+        assert await ctl.acquire() == 0.0
+        waiter = asyncio.create_task(ctl.acquire())
+        await asyncio.sleep(0)
+        assert ctl.queue_depth == 1
+        before = _shed("queue_full")
+        assert await ctl.acquire() is None
+        assert _shed("queue_full") == before + 1
+        ctl.release(0.0)
+        assert await waiter is not None
+        assert ctl.in_flight == 1
+        ctl.release(0.0)
+        assert ctl.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_queue_timeout_sheds_and_backs_off(tight, monkeypatch):
+    monkeypatch.setattr(settings, "admission_initial_limit", 10)
+    monkeypatch.setattr(settings, "admission_queue_timeout", 0.05)
+
+    async def run():
+        ctl = AdmissionController()
+        for _ in range(10):
+            await ctl.acquire()
+        before = _shed("queue_timeout")
+        assert await ctl.acquire() is None
+        assert _shed("queue_timeout") == before + 1
+        assert ctl.queue_depth == 0
+        assert ctl.limit == 9.0
+
+    asyncio.run(run())
+
+
+def test_standing_queue_is_shed(tight, monkeypatch):
+    monkeypatch.setattr(settings, "admission_max_queue", 4)
+    monkeypatch.setattr(settings, "admission_target_delay", 0.0)
+    monkeypatch.setattr(settings, "admission_interval", 0.0)
+    monkeypatch.setattr(settings, "admission_queue_timeout", 5.0)
+
+    async def run():
+        ctl = AdmissionController()
+        await ctl.acquire()
+        first = asyncio.create_task(ctl.acquire())
+        second = asyncio.create_task(ctl.acquire())
+        await asyncio.sleep(0.01)
+        before = _shed("standing_queue")
+        # First dequeue starts the CoDel interval; the next one is past it.
+        ctl.release(0.0)
+        assert await first is not None
+        ctl.release(0.0)
+        assert await second is None
+        assert _shed("standing_queue") == before + 1
+
+    asyncio.run(run())
+
+
+def test_pool_backlog_cuts_the_limit(tight, monkeypatch):
+    monkeypatch.setattr(settings, "admission_initial_limit", 4)
+    monkeypatch.setattr(settings, "admission_interval", 0.0)
+
+    async def run():
+        ctl = AdmissionController()
+        for _ in range(4):
+            await ctl.acquire()
+        # Admitted without queueing, but stuck behind busy shard threads.
+        ctl.release(0.0, pool_delay=1.0)
+        assert ctl.limit == pytest.approx(3.6)
+        ctl.release(0.0)
+        ctl.release(0.0)
+        assert ctl.limit == pytest.approx(3.6 + 1 / 3.6)
+
+    asyncio.run(run())
+
+
+def test_shard_pool_waits_are_measured():
+    async def run():
+        with shards.measure_wait() as waits:
+            assert await shards.run("trace-a", lambda: 42) == 42
+            assert await shards.run("trace-b", lambda: 43) == 43
+        return waits
+
+    waits = asyncio.run(run())
+    assert len(waits) == 2 and all(w >= 0 for w in waits)
+
+
+@pytest.mark.asyncio
+async def test_middleware_sheds_writes_but_serves_stored_replays(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ledger_path", str(tmp_path / "ledger.jsonl"))
+    monkeypatch.setattr(settings, "receipts_path", str(tmp_path / "receipts.jsonl"))
+    monkeypatch.setattr(settings, "idempotency_path", str(tmp_path / "idempotency.jsonl"))
+    monkeypatch.setattr(settings, "admission_max_queue", 0)
+    body = {"payload_type": "admission.test", "payload": {"n": 1}}
+    headers = {"X-SIGNET-Idempotency-Key": "admission-replay"}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        assert (await ac.post("/v1/exchange", json=body, headers=headers)).status_code == 200
+        assert idempotency.is_cached("admission-replay")
+        saved = admission.controller.in_flight, admission.controller.limit
+        admission.controller.in_flight = 10_000
+        try:
+            r = await ac.post("/v1/exchange", json=body)
+            assert r.status_code == 503
+            assert r.headers["Retry-After"] == "1"
+            assert r.json()["error"] == "overloaded"
+            replay = await ac.post("/v1/exchange", json=body, headers=headers)
+            assert replay.status_code == 200
+            assert replay.headers["X-SIGNET-Idempotent"] == "true"
+            # Reads are never subject to admission control.
+            assert (await ac.get("/healthz")).status_code == 200
+        finally:
+            admission.controller.in_flight, admission.controller.limit = saved
+
+
+@pytest.mark.asyncio
+async def test_shed_response_carries_cors_headers(monkeypatch):
+    monkeypatch.setattr(settings, "admission_max_queue", 0)
+    monkeypatch.setattr(admission.controller, "in_flight", 10_000)
+    body = {"payload_type": "admission.test", "payload": {"n": 2}}
+    headers = {"Origin": "https://console.example"}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        r = await ac.post("/v1/exchange", json=body, headers=headers)
+    assert r.status_code == 503
+    assert r.headers["access-control-allow-origin"] == "https://console.example"
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from prometheus_client import REGISTRY
+
+from server import auth
+from server.main import app
+from server.settings import settings
+
+BODY = {"payload_type": "auth.test", "payload": {"x": 1}}
+
+
+def _quota(key: str, result: str) -> float:
+    value = REGISTRY.get_sample_value(
+        "signet_api_key_requests_total", {"key": key, "result": result}
+    )
+    return value or 0.0
+
+
+@pytest.fixture
+def keyed(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ledger_path", str(tmp_path / "ledger.jsonl"))
+    monkeypatch.setattr(settings, "receipts_path", str(tmp_path / "receipts.jsonl"))
+    monkeypatch.setattr(
+        settings,
+        "api_keys",
+        {
+            "sk-noisy": {"name": "noisy", "rate_per_sec": 0.5, "burst": 2},
+            "sk-busy": {"name": "busy", "max_concurrency": 1},
+            "sk-burst": {"name": "burst", "rate_per_sec": 0.001, "burst": 5},
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_exchange_requires_valid_key(keyed):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        assert (await ac.post("/v1/exchange", json=BODY)).status_code == 401
+        r = await ac.post("/v1/exchange", json=BODY, headers={"X-SIGNET-API-Key": "sk-wrong"})
+        assert r.status_code == 401
+        r = await ac.post("/v1/exchange", json=BODY, headers={"X-SIGNET-API-Key": "sk-busy"})
+        assert r.status_code == 200
+        # Reads stay open.
+        assert (await ac.get("/v1/receipts/chain/nope")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_returns_429_with_retry_after(keyed):
+    before = _quota("noisy", "rate_limited")
+    headers = {"X-SIGNET-API-Key": "sk-noisy"}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        for _ in range(2):
+            assert (await ac.post("/v1/exchange", json=BODY, headers=headers)).status_code == 200
+        r = await ac.post("/v1/exchange", json=BODY, headers=headers)
+    assert r.status_code == 429
+    assert r.headers["Retry-After"] == "2"
+    assert _quota("noisy", "rate_limited") == before + 1
+    assert _quota("noisy", "allowed") >= 2
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_per_key(keyed):
+    busy = auth.authenticate("sk-busy")
+    busy.in_flight = 1
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            r = await ac.post("/v1/exchange", json=BODY, headers={"X-SIGNET-API-Key": "sk-busy"})
+    finally:
+        busy.in_flight = 0
+    assert r.status_code == 429
+    assert r.headers["Retry-After"] == "1"
+    assert _quota("busy", "concurrency_limited") >= 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_spend_each_token_once(keyed):
+    headers = {"X-SIGNET-API-Key": "sk-burst"}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        responses = await asyncio.gather(
+            *(ac.post("/v1/exchange", json=BODY, headers=headers) for _ in range(20))
+        )
+    assert sorted(r.status_code for r in responses) == [200] * 5 + [429] * 15
+    assert auth.authenticate("sk-burst").in_flight == 0
@@ -0,0 +1,45 @@
+from bench.exchange_path import measure_exchange_path
+from bench.harness import compare, run_matrix
+from bench.overhead import measure_overhead
+from server.settings import settings
+
+
+def test_bench_smoke_inproc(tmp_path, monkeypatch):
+    # run_matrix points settings at the seeded dir; let monkeypatch restore them.
+    for name in ("receipts_path", "ledger_path", "idempotency_path", "max_exchange_body_bytes"):
+        monkeypatch.setattr(settings, name, getattr(settings, name))
+    report = run_matrix(
+        modes=["inproc"],
+        scenarios=["exchange", "replay", "chain", "export"],
+        payload_sizes=[1024],
+        ledger_sizes=[64],
+        requests=5,
+        concurrency=2,
+        workers=1,
+        cache_dir=str(tmp_path),
+    )
+    rows = report["results"]
+    assert [r["scenario"] for r in rows] == ["exchange", "replay", "chain", "export"]
+    assert all(r["errors"] == 0 and r["rps"] > 0 for r in rows)
+    assert rows[0]["alloc_peak_bytes_p50"] > 0
+    # Appends from the run are rolled back so the cached seed is reusable.
+    with open(tmp_path / "ledger-64" / "receipts.jsonl", encoding="utf-8") as f:
+        assert sum(1 for _ in f) == 64
+
+
+def test_bench_compare_flags_regressions():
+    base = {"results": [{"key": "a", "rps": 100.0, "p99_ms": 10.0}, {"key": "b", "rps": 100.0, "p99_ms": 10.0}]}
+    head = {"results": [{"key": "a", "rps": 95.0, "p99_ms": 10.5}, {"key": "b", "rps": 70.0, "p99_ms": 10.0}]}
+    rows = {r["key"]: r for r in compare(base, head, threshold=0.1)}
+    assert not rows["a"]["regression"]
+    assert rows["b"]["regression"]
+
+
+def test_bench_middleware_overhead_smoke():
+    r = measure_overhead(iterations=200, repeats=1)
+    assert r["bare_ns"] > 0 and r["instrumented_ns"] > 0
+
+
+def test_bench_exchange_path_smoke():
+    (row,) = measure_exchange_path([1024], iterations=20, repeats=1)
+    assert row["model_ns"] > 0 and row["fast_ns"] > 0
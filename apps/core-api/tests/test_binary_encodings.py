@@ -0,0 +1,98 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from server import codecs
+from server.main import app
+from server.settings import settings
+from server.utils import cid_for_json
+
+PAYLOAD = {"name": "Zoë", "amount": 12.5, "lines": [{"sku": "A-1", "qty": 3}], "paid": None}
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "receipts_path", str(tmp_path / "receipts.jsonl"))
+    monkeypatch.setattr(settings, "ledger_path", str(tmp_path / "ledger.jsonl"))
+    monkeypatch.setattr(settings, "idempotency_path", str(tmp_path / "idempotency.jsonl"))
+
+
+@pytest.fixture(params=[codecs.MSGPACK, codecs.CBOR])
+def media_type(request):
+    pytest.importorskip({codecs.MSGPACK: "msgpack", codecs.CBOR: "cbor2"}[request.param])
+    return request.param
+
+
+def _client():
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_binary_round_trip_keeps_cids(data_dir, media_type):
+    body = {"payload_type": "binary.test", "payload": PAYLOAD}
+    binary = {"content-type": media_type, "accept": media_type}
+    async with _client() as ac:
+        j = (await ac.post("/v1/exchange", json=body)).json()
+        r = await ac.post("/v1/exchange", content=codecs.encode(body, media_type), headers=binary)
+        assert r.headers["content-type"] == media_type
+        b = codecs.decode(r.content, media_type)
+        # Same payload, same CID, whatever the wire encoding.
+        assert b["receipt"]["cid"] == j["receipt"]["cid"] == cid_for_json(b["normalized"])
+
+        chain_url = f"/v1/receipts/chain/{b['trace_id']}"
+        as_json = (await ac.get(chain_url)).json()
+        c = await ac.get(chain_url, headers={"accept": media_type})
+        assert "Accept" in c.headers["vary"]
+        assert codecs.decode(c.content, media_type) == as_json
+        e = await ac.get(f"/v1/receipts/export/{b['trace_id']}", headers={"accept": media_type})
+        bundle = codecs.decode(e.content, media_type)
+        assert bundle["chain"] == as_json
+        assert e.headers["X-SIGNET-Response-CID"] == as_json[-1]["receipt_hash"]
+
+
+@pytest.mark.asyncio
+async def test_binary_projections_match_json(data_dir, media_type, monkeypatch):
+    # Binary chains are built from the stored records, with blob-backed bodies joined.
+    monkeypatch.setattr(settings, "blob_store_enabled", True)
+    monkeypatch.setattr(settings, "blob_min_bytes", 0)
+    body = {"payload_type": "binary.test", "payload": PAYLOAD}
+    async with _client() as ac:
+        trace_id = (await ac.post("/v1/exchange", json=body)).json()["trace_id"]
+        chain_url = f"/v1/receipts/chain/{trace_id}"
+        for fields in (None, "hop,normalized", "cid,receipt_hash"):
+            params = {"fields": fields} if fields else None
+            as_json = (await ac.get(chain_url, params=params)).json()
+            c = await ac.get(chain_url, params=params, headers={"accept": media_type})
+            assert codecs.decode(c.content, media_type) == as_json
+    assert as_json[0].keys() == {"cid", "receipt_hash"}
+
+
+@pytest.mark.asyncio
+async def test_binary_replay_follows_accept(data_dir, media_type):
+    body = {"payload_type": "binary.test", "payload": PAYLOAD}
+    idem = {"X-SIGNET-Idempotency-Key": f"binary-{media_type}"}
+    async with _client() as ac:
+        first = await ac.post("/v1/exchange", json=body, headers=idem)
+        replay = await ac.post("/v1/exchange", json=body, headers={**idem, "accept": media_type})
+    assert codecs.decode(replay.content, media_type) == {**first.json(), "idempotent": True}
+
+
+@pytest.mark.asyncio
+async def test_rejected_binary_bodies(data_dir, media_type):
+    headers = {"content-type": media_type}
+    not_json = codecs.encode({"payload_type": "x", "payload": {"raw": b"\x00"}}, media_type)
+    async with _client() as ac:
+        r = await ac.post("/v1/exchange", content=not_json, headers=headers)
+        assert r.status_code == 422
+        assert r.json()["detail"][0]["type"] == codecs.error_type(media_type)
+        r = await ac.post("/v1/exchange", content=b"\xc1", headers=headers)
+        assert r.status_code == 422
+        r = await ac.post("/v1/exchange", content=b"x", headers={"content-type": "text/plain"})
+        assert r.status_code == 415
+
+
+def test_negotiate():
+    assert codecs.negotiate(None) == codecs.JSON
+    assert codecs.negotiate("text/html, */*;q=0.1") == codecs.JSON
+    assert codecs.negotiate("application/x-unknown") == codecs.JSON
+    if codecs.CBOR in codecs.available():
+        assert codecs.negotiate("application/json;q=0.5, application/cbor") == codecs.CBOR
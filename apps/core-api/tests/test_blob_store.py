@@ -0,0 +1,116 @@
+import json
+import os
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from server import blobs
+from server.main import app
+from server.receipts import chain_slices, read_chain, write_receipt
+from server.routes.v1.events import _format
+from server.settings import settings
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "receipts_path", str(tmp_path / "receipts.jsonl"))
+    monkeypatch.setattr(settings, "ledger_path", str(tmp_path / "ledger.jsonl"))
+    monkeypatch.setattr(settings, "idempotency_path", str(tmp_path / "idempotency.jsonl"))
+    monkeypatch.setattr(settings, "blob_store_enabled", True)
+    monkeypatch.setattr(settings, "blob_min_bytes", 0)
+    return tmp_path
+
+
+def _blob_files(root) -> list[str]:
+    return [name for _, _, files in os.walk(root / "blobs") for name in files]
+
+
+@pytest.mark.asyncio
+async def test_identical_payloads_share_one_blob(data_dir):
+    body = {"payload_type": "blob.test", "payload": {"text": "héllo", "n": [1, 2, 3]}}
+    idem = {"X-SIGNET-Idempotency-Key": "k1"}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        first = await ac.post("/v1/exchange", json=body, headers=idem)
+        second = await ac.post("/v1/exchange", json=body)
+        replay = await ac.post("/v1/exchange", json=body, headers=idem)
+        chain = (await ac.get(f"/v1/receipts/chain/{first.json()['trace_id']}")).json()
+        export = await ac.get(f"/v1/receipts/export/{first.json()['trace_id']}")
+
+    assert first.json()["receipt"]["cid"] == second.json()["receipt"]["cid"]
+    assert len(_blob_files(data_dir)) == 1
+    lines = (data_dir / "receipts.jsonl").read_text().splitlines()
+    assert len(lines) == 2 and all('"normalized"' not in line for line in lines)
+    stored = (data_dir / "idempotency.jsonl").read_text()
+    assert "héllo" not in stored and '"blob": "sha256:' in stored
+
+    # Every response still carries the body, in the original field order.
+    normalized = first.json()["normalized"]
+    assert chain == [first.json()["receipt"]]
+    assert export.json()["chain"] == chain
+    assert replay.headers["X-SIGNET-Idempotent"] == "true"
+    assert replay.json() == {**first.json(), "idempotent": True}
+    assert list(replay.json()) == list(first.json())
+    assert list(replay.json()["receipt"]) == list(first.json()["receipt"])
+    assert replay.json()["receipt"]["normalized"] == normalized
+
+
+def test_inline_and_blob_backed_lines_read_alike(data_dir, monkeypatch):
+    monkeypatch.setattr(settings, "blob_store_enabled", False)
+    write_receipt("mixed", 1, {"v": "inline"})
+    monkeypatch.setattr(settings, "blob_store_enabled", True)
+    write_receipt("mixed", 2, {"v": "stored"})
+
+    assert [r["normalized"] for r in read_chain("mixed")] == [{"v": "inline"}, {"v": "stored"}]
+    with chain_slices("mixed") as items:
+        served = [json.loads(bytes(line)) for _, line in items]
+    assert served == read_chain("mixed")
+    stored = json.loads((data_dir / "receipts.jsonl").read_text().splitlines()[1])
+    event = _format("receipt", 0, stored)
+    assert b'"normalized":{"v":"stored"}' in event
+
+
+def test_gc_removes_only_unreferenced_blobs(data_dir):
+    live = write_receipt("gc", 1, {"keep": True})["cid"]
+    orphan = "sha256:" + "ab" * 32
+    blobs.put(orphan, {"drop": True})
+    for cid in (live, orphan):
+        os.utime(blobs._path(cid), (0, 0))
+
+    assert blobs.gc(dry_run=True) == [blobs._path(orphan)]
+    assert os.path.exists(blobs._path(orphan))
+    assert blobs.gc() == [blobs._path(orphan)]
+    assert _blob_files(data_dir) == [live[7:] + ".json"]
+    # Fresh blobs are kept: their receipt may still be on its way.
+    blobs.put(orphan, {"drop": True})
+    assert blobs.gc() == []
+
+
+def test_bodies_below_threshold_stay_inline(data_dir, monkeypatch):
+    monkeypatch.setattr(settings, "blob_min_bytes", 64)
+    write_receipt("sized", 1, {"v": "small"})
+    write_receipt("sized", 2, {"v": "x" * 64})
+    lines = [json.loads(line) for line in (data_dir / "receipts.jsonl").read_text().splitlines()]
+    assert lines[0]["normalized"] == {"v": "small"}
+    assert "normalized" not in lines[1]
+    assert _blob_files(data_dir) == [lines[1]["cid"][7:] + ".json"]
+    assert [r["normalized"]["v"] for r in read_chain("sized")] == ["small", "x" * 64]
+
+
+def test_put_of_existing_blob_refreshes_mtime(data_dir):
+    cid = "sha256:" + "cd" * 32
+    blobs.put(cid, {"again": True})
+    os.utime(blobs._path(cid), (0, 0))
+    # A writer about to reference the blob again must keep gc away from it.
+    assert blobs.put(cid, {"again": True})
+    assert blobs.gc() == []
+
+
+def test_read_cache_is_bounded_by_bytes(data_dir, monkeypatch):
+    monkeypatch.setattr(settings, "blob_cache_bytes", 100)
+    cache = blobs._ReadCache()
+    for i in range(5):
+        cache.put(f"p{i}", b"x" * 40)
+    assert cache.get("p0") is None and cache.get("p4") == b"x" * 40
+    assert cache._bytes <= 100
+    cache.put("big", b"x" * 101)  # larger than the whole budget: not cached
+    assert cache.get("big") is None
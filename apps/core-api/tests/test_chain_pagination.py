@@ -0,0 +1,71 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from server.main import app
+from server.receipts import write_receipt
+from server.settings import settings
+
+
+@pytest.fixture
+def chain(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "receipts_path", str(tmp_path / "receipts.jsonl"))
+    monkeypatch.setattr(settings, "ledger_path", str(tmp_path / "ledger.jsonl"))
+    # Hops 1-2 stored inline, 3-5 in the blob store: both must page alike.
+    monkeypatch.setattr(settings, "blob_min_bytes", 0)
+    monkeypatch.setattr(settings, "blob_store_enabled", False)
+    for hop in (1, 2):
+        write_receipt("paged", hop, {"hop": hop})
+    monkeypatch.setattr(settings, "blob_store_enabled", True)
+    for hop in (3, 4, 5):
+        write_receipt("paged", hop, {"hop": hop})
+
+
+async def _get(params: dict | None = None, trace_id: str = "paged"):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        return await ac.get(f"/v1/receipts/chain/{trace_id}", params=params)
+
+
+@pytest.mark.asyncio
+async def test_cursor_pages_through_chain(chain):
+    full = (await _get()).json()
+    assert [r["hop"] for r in full] == [1, 2, 3, 4, 5]
+
+    pages, params = [], {"limit": 2}
+    while True:
+        r = await _get(params)
+        pages.append([rec["hop"] for rec in r.json()])
+        if "X-SIGNET-Next-Cursor" not in r.headers:
+            break
+        params = {"limit": 2, "cursor": r.headers["X-SIGNET-Next-Cursor"]}
+    assert pages == [[1, 2], [3, 4], [5]]
+
+
+@pytest.mark.asyncio
+async def test_from_hop_returns_only_new_hops(chain):
+    assert [r["hop"] for r in (await _get({"from_hop": 4})).json()] == [4, 5]
+    r = await _get({"from_hop": 6})
+    assert r.status_code == 200 and r.json() == []
+    assert (await _get({"from_hop": 2}, trace_id="missing")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_fields_trim_receipts(chain):
+    full = (await _get()).json()
+    links = (await _get({"fields": "links"})).json()
+    assert links == [{k: v for k, v in r.items() if k != "normalized"} for r in full]
+    slim = (await _get({"fields": "hop,receipt_hash,prev_receipt_hash", "from_hop": 2})).json()
+    assert slim == [
+        {"receipt_hash": r["receipt_hash"], "prev_receipt_hash": r["prev_receipt_hash"],
+         "hop": r["hop"]}
+        for r in full[1:]
+    ]
+    bodies = (await _get({"fields": "hop,normalized"})).json()
+    assert bodies == [{"hop": r["hop"], "normalized": r["normalized"]} for r in full]
+
+
+@pytest.mark.asyncio
+async def test_invalid_page_parameters(chain):
+    assert (await _get({"fields": "secret"})).status_code == 400
+    assert (await _get({"cursor": "!!"})).status_code == 400
+    assert (await _get({"cursor": "Mw", "from_hop": 1})).status_code == 400
+    assert (await _get({"limit": 0})).status_code == 422
@@ -0,0 +1,86 @@
+import json
+import sys
+import tracemalloc
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from server import chain_heads
+from server.compact import CompactReceipt
+from server.main import app
+from server.receipts import read_chain, write_receipt
+from server.settings import settings
+
+
+def _record(i: int) -> dict:
+    return {
+        "trace_id": f"compact-{i}",
+        "ts": "2026-01-02T03:04:05Z",
+        "cid": "sha256:" + f"{i:064x}",
+        "receipt_hash": "sha256:" + f"{i + 1:064x}",
+        "prev_receipt_hash": None,
+        "prev_cid": None,
+        "hop": 1,
+        "normalized": {"Document": {"Echo": {"i": i}}},
+    }
+
+
+def test_round_trip_is_lossless():
+    rec = _record(7) | {"prev_receipt_hash": "sha256:" + "ab" * 32, "prev_cid": "sha256:" + "cd" * 32}
+    compact = CompactReceipt.from_wire(json.loads(json.dumps(rec)))
+    assert json.dumps(compact.to_wire()) == json.dumps(rec)
+    assert compact.trace_id is sys.intern("compact-7")
+    assert isinstance(compact.ts, int)
+
+    # Non-canonical values are kept verbatim instead of being normalised.
+    odd = rec | {"cid": "sha256:" + "AB" * 32, "ts": "2026-01-02 03:04:05"}
+    assert CompactReceipt.from_wire(odd).to_wire() == odd
+
+
+    # Keys the record lacks are not filled in with nulls.
+    partial = {k: v for k, v in rec.items() if k not in ("prev_receipt_hash", "prev_cid", "ts")}
+    assert json.dumps(CompactReceipt.from_wire(partial).to_wire()) == json.dumps(partial)
+    raw_partial = partial | {"cid": "not-a-digest"}
+    assert CompactReceipt.from_wire(raw_partial).to_wire() == raw_partial
+
+
+def test_compact_heads_are_much_smaller_than_dicts():
+    n = 2000
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        dicts = [json.loads(json.dumps(_record(i) | {"normalized": None})) for i in range(n)]
+        dict_bytes = tracemalloc.get_traced_memory()[0] - base
+        base = tracemalloc.get_traced_memory()[0]
+        compact = [CompactReceipt.from_wire(d, keep_normalized=False) for d in dicts]
+        compact_bytes = tracemalloc.get_traced_memory()[0] - base
+    finally:
+        tracemalloc.stop()
+    assert len(compact) == n
+    assert compact_bytes < dict_bytes / 3
+
+
+@pytest.mark.asyncio
+async def test_write_links_to_cached_head(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "receipts_path", str(tmp_path / "receipts.jsonl"))
+    monkeypatch.setattr(settings, "ledger_path", str(tmp_path / "ledger.jsonl"))
+    first = write_receipt("heads-1", 1, {"a": 1})
+    second = write_receipt("heads-1", 2, {"a": 2})
+    assert second["prev_receipt_hash"] == first["receipt_hash"]
+    assert second["prev_cid"] == first["cid"]
+    head = chain_heads.head("heads-1")
+    assert head is not None and head.hop == 2
+    assert head.to_wire() == {k: v for k, v in second.items() if k != "normalized"}
+    assert [r["hop"] for r in read_chain("heads-1")] == [1, 2]
+
+    # Appends by another writer are picked up before linking.
+    other = dict(second, hop=3, receipt_hash="sha256:" + "ee" * 32)
+    with open(settings.receipts_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(other) + "\n")
+    third = write_receipt("heads-1", 4, {"a": 4})
+    assert third["prev_receipt_hash"] == "sha256:" + "ee" * 32
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        r = await ac.post("/v1/exchange", json={"payload_type": "compact", "payload": {}})
+        assert chain_heads.head(r.json()["trace_id"]).cid == r.json()["receipt"]["cid"]
@@ -0,0 +1,86 @@
+import json
+import threading
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from server import compliance
+from server.compliance import ComplianceAggregates
+from server.main import app
+from server.settings import settings
+
+
+@pytest.mark.asyncio
+async def test_compliance_reports_from_aggregates(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ledger_path", str(tmp_path / "ledger.jsonl"))
+    monkeypatch.setattr(settings, "receipts_path", str(tmp_path / "receipts.jsonl"))
+    monkeypatch.setattr(settings, "hel_allowlist", ["127.0.0.1"])
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        r = await ac.post(
+            "/v1/exchange",
+            json={"payload_type": "demo.echo", "payload": {"a": 1}, "forward_url": "https://127.0.0.1/hook"},
+        )
+        assert r.status_code == 200
+        trace_id = r.json()["trace_id"]
+        await ac.post("/v1/exchange", json={"payload_type": "demo.other", "payload": {}})
+        denied = await ac.post(
+            "/v1/exchange",
+            json={"payload_type": "demo.echo", "payload": {}, "forward_url": "http://127.0.0.1/x"},
+        )
+        assert denied.status_code == 403
+
+        d = (await ac.get("/v1/compliance/dashboard")).json()
+        assert d["status"] == {"annex4": "ready", "pmm": "ready"}
+        totals = d["totals"]
+        assert totals["exchanges"] == 2
+        assert totals["traces"] == 2
+        assert totals["payload_types"] == {"demo.echo": 1, "demo.other": 1}
+        assert totals["forward_hosts"] == {"127.0.0.1": 1}
+        assert totals["denials"]["by_reason"]["insecure_scheme"]["count"] >= 1
+
+        annex = (await ac.get(f"/v1/compliance/annex4/{trace_id}")).json()["annex4"]
+        sections = {s["id"]: s for s in annex["sections"]}
+        assert sections["A"]["payload_types"] == {"demo.echo": 1}
+        assert sections["B"]["forward_hosts"] == {"127.0.0.1": 1}
+        assert sections["C"]["status"] == "intact"
+
+        # A tampered hop appended to the log is picked up incrementally.
+        with open(settings.receipts_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "trace_id": trace_id, "ts": "2025-01-01T00:00:00Z", "cid": "sha256:00",
+                "receipt_hash": "sha256:ff", "prev_receipt_hash": "sha256:bad", "hop": 2,
+            }) + "\n")
+        pmm = (await ac.get(f"/v1/compliance/pmm/{trace_id}")).json()["pmm"]
+        assert pmm["status"] == "alert"
+        issues = {i["issue"] for i in pmm["chain_integrity"]["issues"]}
+        assert issues == {"prev_receipt_hash_mismatch", "receipt_hash_mismatch"}
+        assert "drift" not in pmm
+        d = (await ac.get("/v1/compliance/dashboard")).json()
+        assert d["status"]["pmm"] == "alert"
+        assert d["totals"]["broken_chains"] == 1
+
+        assert (await ac.get("/v1/compliance/annex4/missing")).status_code == 404
+
+
+def test_reset_drops_traces_left_in_neither_log():
+    agg = ComplianceAggregates()
+    agg.apply_receipt({"trace_id": "both", "hop": 1, "prev_receipt_hash": None})
+    agg.apply_ledger({"trace_id": "both", "payload_type": "demo.echo"})
+    agg.apply_receipt({"trace_id": "receipt-only", "hop": 1, "prev_receipt_hash": None})
+    agg.reset_receipts()
+    assert set(agg.traces) == {"both"}
+    agg.reset_ledger()
+    assert agg.traces == {}
+
+
+@pytest.mark.asyncio
+async def test_reports_warm_up_off_the_event_loop(monkeypatch):
+    threads = []
+    monkeypatch.setattr(compliance, "warm", lambda: threads.append(threading.get_ident()))
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        assert (await ac.get("/v1/compliance/dashboard")).status_code == 200
+        assert (await ac.get("/v1/compliance/pmm/unknown")).status_code == 404
+    assert len(threads) == 2
+    assert threading.get_ident() not in threads
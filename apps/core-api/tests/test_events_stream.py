@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from server.events import broadcaster
+from server.main import app
+from server.routes.v1.events import _stream
+from server.settings import settings
+
+
+class _FakeRequest:
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+async def _next_event(gen) -> tuple[str, dict]:
+    while True:
+        chunk = (await asyncio.wait_for(gen.__anext__(), timeout=5)).decode()
+        fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines() if ": " in line)
+        if "event" in fields:
+            return fields["event"], json.loads(fields["data"])
+
+
+@pytest.mark.asyncio
+async def test_events_filtered_by_trace_and_payload_type(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ledger_path", str(tmp_path / "ledger.jsonl"))
+    monkeypatch.setattr(settings, "receipts_path", str(tmp_path / "receipts.jsonl"))
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        # History before subscribing is not replayed.
+        await ac.post("/v1/exchange", json={"payload_type": "ev.old", "payload": {}})
+        by_type = broadcaster.subscribe(payload_type="ev.new")
+        everything = broadcaster.subscribe()
+        r = await ac.post("/v1/exchange", json={"payload_type": "ev.new", "payload": {"n": 1}})
+        trace_id = r.json()["trace_id"]
+
+        gen = _stream(_FakeRequest(), everything)
+        kind, rec = await _next_event(gen)
+        assert (kind, rec["trace_id"], rec["hop"]) == ("receipt", trace_id, 1)
+        kind, rec = await _next_event(gen)
+        assert (kind, rec["payload_type"]) == ("ledger", "ev.new")
+        await gen.aclose()
+
+        kind, offset, rec = by_type.queue.get_nowait()
+        assert kind == "ledger" and rec["trace_id"] == trace_id
+        assert by_type.queue.empty()
+        broadcaster.unsubscribe(by_type)
+        assert len(broadcaster) == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_dropped(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ledger_path", str(tmp_path / "ledger.jsonl"))
+    monkeypatch.setattr(settings, "receipts_path", str(tmp_path / "receipts.jsonl"))
+    monkeypatch.setattr(settings, "events_buffer_size", 2)
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.get("/v1/receipts/chain/warmup")
+        sub = broadcaster.subscribe(kinds=frozenset({"receipt"}))
+        for i in range(4):
+            await ac.post("/v1/exchange", json={"payload_type": "ev.slow", "payload": {"i": i}})
+        assert sub.overflowed
+        gen = _stream(_FakeRequest(), sub)
+        chunks = [c async for c in gen]
+        assert chunks[-1].startswith(b"event: overflow")
+        assert sum(c.startswith(b"id: receipt") for c in chunks) == 2
+        assert len(broadcaster) == 0
+
+        metrics = (await ac.get("/metrics")).text
+        assert "signet_event_subscriber_drops_total" in metrics
+
+
+@pytest.mark.asyncio
+async def test_events_rejects_unknown_kind():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        r = await ac.get("/v1/events", params={"kinds": "receipt,bogus"})
+        assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_events_published_from_shard_threads(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ledger_path", str(tmp_path / "ledger.jsonl"))
+    monkeypatch.setattr(settings, "receipts_path", str(tmp_path / "receipts.jsonl"))
+    loop = asyncio.get_running_loop()
+    # Debug mode turns a queue wakeup from a foreign thread into a RuntimeError.
+    loop.set_debug(True)
+    sub = broadcaster.subscribe(kinds=frozenset({"receipt"}))
+    waiting = asyncio.create_task(sub.queue.get())
+    try:
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            r = await ac.post("/v1/exchange", json={"payload_type": "ev.thread", "payload": {}})
+            assert r.status_code == 200
+            kind, _, rec = await asyncio.wait_for(waiting, timeout=5)
+            assert (kind, rec["trace_id"]) == ("receipt", r.json()["trace_id"])
+    finally:
+        waiting.cancel()
+        broadcaster.unsubscribe(sub)
+        loop.set_debug(False)
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from server.main import app
+from server.settings import settings
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "receipts_path", str(tmp_path / "receipts.jsonl"))
+    monkeypatch.setattr(settings, "ledger_path", str(tmp_path / "ledger.jsonl"))
+    monkeypatch.setattr(settings, "idempotency_path", str(tmp_path / "idempotency.jsonl"))
+
+
+async def _post(content: bytes, headers: dict | None = None):
+    headers = {"content-type": "application/json", **(headers or {})}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        return await ac.post("/v1/exchange", content=content, headers=headers)
+
+
+@pytest.mark.asyncio
+async def test_replay_returns_stored_bytes(data_dir):
+    body = json.dumps({"payload_type": "fast.path", "payload": {"name": "Zoë", "n": 1}}).encode()
+    idem = {"X-SIGNET-Idempotency-Key": "fast-1"}
+    first = await _post(body, idem)
+    replay = await _post(body, idem)
+    assert first.status_code == replay.status_code == 200
+    assert "Zoë".encode() in first.content  # not \u-escaped
+    assert replay.content == first.content.replace(
+        b'"idempotent":false', b'"idempotent":true'
+    )
+
+
+@pytest.mark.asyncio
+async def test_invalid_bodies_keep_validation_shape(data_dir, monkeypatch):
+    r = await _post(b'{"payload": {}}')
+    assert r.status_code == 422
+    assert r.json()["detail"][0]["loc"] == ["body", "payload_type"]
+    r = await _post(b'{"payload_type": "x",')
+    assert r.status_code == 422
+    assert r.json()["detail"][0]["type"] == "json_invalid"
+
+    monkeypatch.setattr(settings, "max_exchange_body_bytes", 64)
+    big = json.dumps({"payload_type": "x", "payload": {"blob": "x" * 100}}).encode()
+    assert (await _post(big)).status_code == 413
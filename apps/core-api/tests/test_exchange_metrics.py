@@ -5,6 +5,7 @@ import pytest
 from httpx import AsyncClient, ASGITransport
 
 from server.main import app
+from server.settings import settings
 
 
 async def _metrics_text(ac: AsyncClient) -> str:
@@ -22,7 +23,11 @@ def _find_metric(text: str, name: str, labels: dict[str, str]) -> float:
 
 
 @pytest.mark.asyncio
-async def test_idempotency_and_metrics():
+async def test_idempotency_and_metrics(tmp_path, monkeypatch):
+    # Idempotency keys persist in SP_IDEMPOTENCY_PATH; keep each run's keys to itself.
+    monkeypatch.setattr(settings, "receipts_path", str(tmp_path / "receipts.jsonl"))
+    monkeypatch.setattr(settings, "ledger_path", str(tmp_path / "ledger.jsonl"))
+    monkeypatch.setattr(settings, "idempotency_path", str(tmp_path / "idempotency.jsonl"))
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
         # Successful exchange
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from prometheus_client import REGISTRY
+
+from server.http_metrics import OTHER, UNMATCHED, MetricsMiddleware
+from server.main import app
+
+
+def _count(method: str, path: str, status: str) -> float:
+    value = REGISTRY.get_sample_value(
+        "signet_http_requests_total", {"method": method, "path": path, "status": status}
+    )
+    return value or 0.0
+
+
+@pytest.mark.asyncio
+async def test_requests_labelled_by_route_template():
+    template = "/v1/receipts/chain/{trace_id}"
+    before = _count("GET", template, "404")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        for trace_id in ("tmpl-a", "tmpl-b", "tmpl-c"):
+            await ac.get(f"/v1/receipts/chain/{trace_id}")
+        await ac.get("/no/such/route")
+        await ac.get("/healthz")
+    assert _count("GET", template, "404") == before + 3
+    assert _count("GET", "/v1/receipts/chain/tmpl-a", "404") == 0
+    assert _count("GET", UNMATCHED, "404") >= 1
+    assert _count("GET", "/healthz", "200") >= 1
+    assert REGISTRY.get_sample_value(
+        "signet_http_request_latency_seconds_count", {"path": template}
+    ) >= 3
+
+
+def test_distinct_route_labels_are_capped():
+    class _Route:
+        def __init__(self, path: str) -> None:
+            self.path = path
+
+    async def endpoint(scope, receive, send):
+        scope["route"] = _Route(scope["path"])
+        await send({"type": "http.response.start", "status": 204, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    mw = MetricsMiddleware(endpoint, max_paths=2)
+
+    async def run():
+        for path in ("/cap/a", "/cap/b", "/cap/c", "/cap/d", "/cap/a"):
+            await mw({"type": "http", "method": "GET", "path": path}, None, send)
+
+    before = _count("GET", OTHER, "204")
+    asyncio.run(run())
+    assert _count("GET", "/cap/a", "204") == 2
+    assert _count("GET", "/cap/c", "204") == 0
+    assert _count("GET", OTHER, "204") == before + 2
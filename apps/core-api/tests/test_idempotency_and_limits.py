@@ -3,8 +3,15 @@ from httpx import AsyncClient, ASGITransport
 from server.main import app
 from server.settings import settings
 
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    # Idempotency keys persist in SP_IDEMPOTENCY_PATH; keep each run's keys to itself.
+    monkeypatch.setattr(settings, "receipts_path", str(tmp_path / "receipts.jsonl"))
+    monkeypatch.setattr(settings, "ledger_path", str(tmp_path / "ledger.jsonl"))
+    monkeypatch.setattr(settings, "idempotency_path", str(tmp_path / "idempotency.jsonl"))
+
 @pytest.mark.asyncio
-async def test_idempotent_replay_same_response():
+async def test_idempotent_replay_same_response(data_dir):
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
         key = "test-idem-key-123"
@@ -40,3 +47,28 @@ async def test_payload_size_limit(monkeypatch):
         j = r.json()
         assert j["error"] == "payload_too_large"
         assert "exceeds" in j["message"].lower()
+
+@pytest.mark.asyncio
+async def test_idempotency_claim_runs_off_event_loop(data_dir, monkeypatch):
+    # claim() takes a blocking file lock; it must never run on the event loop thread.
+    from contextlib import contextmanager
+    import threading
+    from server.routes.v1 import exchange as exchange_route
+    real_claim = exchange_route.idempotency.claim
+    threads = []
+
+    @contextmanager
+    def recording_claim(key):
+        threads.append(threading.current_thread())
+        with real_claim(key) as cached:
+            yield cached
+
+    monkeypatch.setattr(exchange_route.idempotency, "claim", recording_claim)
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        r = await ac.post("/v1/exchange", headers={"X-SIGNET-Idempotency-Key": "off-loop"}, json={
+            "payload_type": "demo.echo",
+            "payload": {"v": 1},
+        })
+        assert r.status_code == 200
+    assert threads and threading.current_thread() not in threads
@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from server.main import app
+from server.routes.v1 import ledger as ledger_routes
+from server.settings import settings
+
+
+@pytest.mark.asyncio
+async def test_ledger_query_filters_and_pagination(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ledger_path", str(tmp_path / "ledger.jsonl"))
+    monkeypatch.setattr(settings, "receipts_path", str(tmp_path / "receipts.jsonl"))
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        cids = []
+        for i in range(5):
+            r = await ac.post("/v1/exchange", json={"payload_type": "ledger.a", "payload": {"i": i}})
+            cids.append(r.json()["receipt"]["cid"])
+        await ac.post("/v1/exchange", json={"payload_type": "ledger.b", "payload": {"i": 0}})
+
+        r = await ac.get("/v1/ledger", params={"payload_type": "ledger.a", "limit": 2})
+        assert r.status_code == 200
+        page = r.json()
+        assert len(page["items"]) == 2
+        seen = [e["cid"] for e in page["items"]]
+        while page["next_cursor"]:
+            r = await ac.get(
+                "/v1/ledger",
+                params={"payload_type": "ledger.a", "limit": 2, "cursor": page["next_cursor"]},
+            )
+            page = r.json()
+            seen += [e["cid"] for e in page["items"]]
+        assert seen == cids
+
+        # cid 0 is shared by ledger.a #0 and ledger.b (same payload -> same CID)
+        r = await ac.get("/v1/ledger", params={"cid": cids[0]})
+        assert {e["payload_type"] for e in r.json()["items"]} == {"ledger.a", "ledger.b"}
+        r = await ac.get("/v1/ledger", params={"cid": cids[0], "payload_type": "ledger.b"})
+        assert len(r.json()["items"]) == 1
+
+        r = await ac.get("/v1/ledger", params={"until": "2000-01-01T00:00:00Z"})
+        assert r.json()["items"] == []
+        r = await ac.get("/v1/ledger", params={"since": "2000-01-01T00:00:00+00:00"})
+        assert len(r.json()["items"]) == 6
+
+        assert (await ac.get("/v1/ledger", params={"cursor": "!!"})).status_code == 400
+        assert (await ac.get("/v1/ledger", params={"since": "yesterday"})).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_ledger_query_runs_off_the_event_loop(monkeypatch):
+    threads = []
+
+    def query_ledger(**filters):
+        threads.append(threading.get_ident())
+        return iter(())
+
+    monkeypatch.setattr(ledger_routes, "query_ledger", query_ledger)
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        r = await ac.get("/v1/ledger", params={"payload_type": "ledger.none"})
+    assert r.json() == {"items": [], "next_cursor": None}
+    assert threads and threads[0] != threading.get_ident()
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from server import mmapread
+from server.main import app
+from server.mmapread import read_matching, slices
+from server.receipts import chain_slices, write_receipt
+from server.settings import settings
+
+
+def test_byte_search_confirms_field_matches(tmp_path):
+    path = tmp_path / "receipts.jsonl"
+    lines = [
+        {"trace_id": "t-1", "hop": 1, "normalized": {"note": "t-2"}},
+        # The searched value embedded in a payload must not match.
+        {"trace_id": "t-3", "hop": 1, "normalized": {"trace_id": "t-1x", "s": '"trace_id": "t-1"'}},
+        {"trace_id": "t-1", "hop": 2, "normalized": {"ü": "ü"}},
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        for rec in lines:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        f.write('{"trace_id": "t-1", "hop": 3')  # partial append in progress
+    assert [r["hop"] for r in read_matching(str(path), "trace_id", "t-1")] == [1, 2]
+    assert read_matching(str(path), "trace_id", "t-2") == []
+    assert read_matching(str(tmp_path / "missing.jsonl"), "trace_id", "t-1") == []
+    with slices(str(path), "trace_id", "t-1") as items:
+        assert [json.loads(bytes(line)) for _, line in items] == [lines[0], lines[2]]
+
+
+@pytest.mark.asyncio
+async def test_chain_and_export_bodies_from_stored_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "receipts_path", str(tmp_path / "receipts.jsonl"))
+    monkeypatch.setattr(settings, "ledger_path", str(tmp_path / "ledger.jsonl"))
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        r = await ac.post("/v1/exchange", json={"payload_type": "mmap", "payload": {"k": "välue"}})
+        trace_id = r.json()["trace_id"]
+        receipt = r.json()["receipt"]
+        chain = (await ac.get(f"/v1/receipts/chain/{trace_id}")).json()
+        assert chain == [receipt]
+        export = await ac.get(f"/v1/receipts/export/{trace_id}")
+        bundle = export.json()
+        assert bundle["trace_id"] == trace_id
+        assert bundle["chain"] == [receipt]
+        assert bundle["chain"][0]["normalized"] == {"Document": {"Echo": {"k": "välue"}}}
+        assert export.headers["X-SIGNET-Response-CID"] == receipt["receipt_hash"]
+        page = (await ac.get("/v1/ledger", params={"trace_id": trace_id})).json()
+        assert [e["cid"] for e in page["items"]] == [receipt["cid"]]
+
+
+def test_chain_slices_stop_at_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "receipts_path", str(tmp_path / "receipts.jsonl"))
+    for hop in range(1, 11):
+        write_receipt("long", hop, {"hop": hop})
+    parsed = []
+    find_lines = mmapread.find_lines
+
+    def counting(*args):
+        for item in find_lines(*args):
+            parsed.append(item[2]["hop"])
+            yield item
+
+    monkeypatch.setattr(mmapread, "find_lines", counting)
+    with chain_slices("long", from_hop=3, limit=3) as items:
+        assert [r["hop"] for r, _ in items] == [3, 4, 5]
+    assert parsed == [1, 2, 3, 4, 5]
@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_WORKER = """
+import sys
+from server.metrics import (
+    mark_process_dead, observe_denied, observe_event_subscribers, observe_success,
+)
+for _ in range(5):
+    observe_success(0.01)
+observe_denied(0.01, "forward_host_not_allowlisted")
+observe_event_subscribers(2)
+if sys.argv[1] == "exit":
+    mark_process_dead()
+"""
+
+_SCRAPE = """
+import sys
+from server.metrics import render_latest
+sys.stdout.write(render_latest()[0].decode())
+"""
+
+
+def _run(code: str, env: dict[str, str], *args: str) -> str:
+    out = subprocess.run(
+        [sys.executable, "-c", code, *args], cwd=_APP_DIR, env=env, capture_output=True, text=True,
+        check=True,
+    )
+    return out.stdout
+
+
+def _value(text: str, prefix: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{prefix} not in scrape")
+
+
+def test_scrape_aggregates_all_workers(tmp_path):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    _run(_WORKER, env, "exit")
+    _run(_WORKER, env, "exit")
+    _run(_WORKER, env, "live")
+    text = _run(_SCRAPE, env)
+    assert _value(text, 'signet_exchanges_total{result="ok"}') == 15
+    assert _value(text, 'signet_exchanges_total{result="denied"}') == 3
+    assert _value(text, 'signet_denied_total{reason="forward_host_not_allowlisted"}') == 3
+    assert _value(text, "signet_exchange_total_latency_seconds_count") == 18
+    # livesum gauges only count workers that have not shut down.
+    assert _value(text, "signet_event_subscribers") == 2
@@ -0,0 +1,63 @@
+import json
+import multiprocessing as mp
+import os
+
+
+def _append_hops(data_dir: str, trace_id: str, n: int, go) -> None:
+    os.environ["SP_RECEIPTS_PATH"] = os.path.join(data_dir, "receipts.jsonl")
+    from server.receipts import write_receipt
+
+    go.wait()
+    for i in range(n):
+        write_receipt(trace_id=trace_id, hop=1, normalized={"Document": {"Echo": {"i": i}}})
+
+
+def _claim_key(data_dir: str, key: str, results) -> None:
+    os.environ["SP_RECEIPTS_PATH"] = os.path.join(data_dir, "receipts.jsonl")
+    os.environ["SP_IDEMPOTENCY_PATH"] = os.path.join(data_dir, "idempotency.jsonl")
+    from server import idempotency
+
+    with idempotency.claim(key) as cached:
+        if cached is None:
+            idempotency.store(key, {"trace_id": f"winner-{os.getpid()}"})
+            results.put(("created", os.getpid()))
+        else:
+            results.put(("replayed", cached["trace_id"]))
+
+
+def test_concurrent_processes_do_not_fork_chain(tmp_path):
+    ctx = mp.get_context("spawn")
+    go = ctx.Event()
+    procs = [
+        ctx.Process(target=_append_hops, args=(str(tmp_path), "shared-trace", 25, go))
+        for _ in range(4)
+    ]
+    for p in procs:
+        p.start()
+    go.set()
+    for p in procs:
+        p.join(60)
+        assert p.exitcode == 0
+    with open(tmp_path / "receipts.jsonl", encoding="utf-8") as f:
+        chain = [json.loads(line) for line in f]
+    assert len(chain) == 100
+    # Every receipt links to the one written just before it: a single linear chain.
+    prevs = [r["prev_receipt_hash"] for r in chain]
+    assert prevs[0] is None
+    assert prevs[1:] == [r["receipt_hash"] for r in chain[:-1]]
+
+
+def test_idempotency_claim_shared_across_processes(tmp_path):
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_claim_key, args=(str(tmp_path), "same-key", results)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+        assert p.exitcode == 0
+    outcomes = [results.get(timeout=5) for _ in procs]
+    created = [o for o in outcomes if o[0] == "created"]
+    assert len(created) == 1
+    winner = f"winner-{created[0][1]}"
+    assert all(o[1] == winner for o in outcomes if o[0] == "replayed")
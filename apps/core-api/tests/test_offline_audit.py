@@ -0,0 +1,31 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+from signet_verify.audit import audit
+
+from server.main import app
+from server.settings import settings
+
+
+@pytest.mark.asyncio
+async def test_server_data_dir_audits_clean(tmp_path, monkeypatch):
+    # Sharded receipts with bodies in the blob store: the layout the audit must read.
+    monkeypatch.setattr(settings, "receipts_path", str(tmp_path / "receipts.jsonl"))
+    monkeypatch.setattr(settings, "ledger_path", str(tmp_path / "ledger.jsonl"))
+    monkeypatch.setattr(settings, "idempotency_path", str(tmp_path / "idempotency.jsonl"))
+    monkeypatch.setattr(settings, "receipt_shards", 3)
+    monkeypatch.setattr(settings, "blob_store_enabled", True)
+    monkeypatch.setattr(settings, "blob_min_bytes", 0)
+    body = {"payload_type": "audit.test", "payload": {"name": "Zoë"}}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        for _ in range(6):
+            first = (await ac.post("/v1/exchange", json=body)).json()
+            headers = {
+                "X-SIGNET-Trace": first["trace_id"],
+                "X-SIGNET-Prev-Receipt-Hash": first["receipt"]["receipt_hash"],
+            }
+            assert (await ac.post("/v1/exchange", json=body, headers=headers)).status_code == 200
+
+    totals = audit(str(tmp_path), str(tmp_path / "report.jsonl"), workers=2, quiet=True)
+    assert (tmp_path / "report.jsonl").read_text() == ""
+    assert totals["receipts"] == totals["ledger_entries"] == 12
+    assert totals["traces"] == 6 and totals["discrepancies"] == 0
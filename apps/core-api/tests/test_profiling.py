@@ -0,0 +1,72 @@
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+
+from server.main import app as main_app
+from server.routes.v1.admin import router as admin_router
+from server.settings import settings
+
+ADMIN = {"X-SIGNET-API-Key": "admin-key"}
+
+
+@pytest.fixture
+def admin_app(monkeypatch):
+    monkeypatch.setattr(
+        settings,
+        "api_keys",
+        {"admin-key": {"name": "ops", "admin": True}, "tenant-key": {"name": "acme"}},
+    )
+    app = FastAPI()
+    app.include_router(admin_router, prefix="/v1")
+    return app
+
+
+@pytest.mark.asyncio
+async def test_profiling_routes_not_mounted_by_default():
+    async with AsyncClient(transport=ASGITransport(app=main_app), base_url="http://test") as ac:
+        r = await ac.get("/v1/admin/profile/cpu", params={"seconds": 0.1}, headers=ADMIN)
+        assert r.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_profiling_requires_admin_key(admin_app):
+    async with AsyncClient(transport=ASGITransport(app=admin_app), base_url="http://test") as ac:
+        assert (await ac.post("/v1/admin/profile/memory/start")).status_code == 401
+        r = await ac.post(
+            "/v1/admin/profile/memory/start", headers={"X-SIGNET-API-Key": "tenant-key"}
+        )
+        assert r.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_cpu_profile_collapsed_stacks(admin_app):
+    async with AsyncClient(transport=ASGITransport(app=admin_app), base_url="http://test") as ac:
+        r = await ac.get(
+            "/v1/admin/profile/cpu", params={"seconds": 0.2, "interval_ms": 2}, headers=ADMIN
+        )
+        assert r.status_code == 200
+        lines = r.text.splitlines()
+        assert lines
+        stack, count = lines[0].rsplit(" ", 1)
+        assert int(count) >= 1
+        assert any(line.startswith("MainThread;") for line in lines)
+        r = await ac.get("/v1/admin/profile/cpu", params={"seconds": 3600}, headers=ADMIN)
+        assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_memory_diff_reports_growth(admin_app):
+    async with AsyncClient(transport=ASGITransport(app=admin_app), base_url="http://test") as ac:
+        assert (await ac.get("/v1/admin/profile/memory/diff", headers=ADMIN)).status_code == 409
+        assert (await ac.post("/v1/admin/profile/memory/start", headers=ADMIN)).status_code == 200
+        try:
+            hoard = [bytearray(1024) for _ in range(2000)]
+            r = await ac.get("/v1/admin/profile/memory/diff", params={"limit": 5}, headers=ADMIN)
+            assert r.status_code == 200
+            body = r.json()
+            assert len(body["top"]) <= 5
+            assert body["top"][0]["size_diff"] >= 1024 * 2000
+            assert "test_profiling.py" in body["top"][0]["traceback"][0]
+            del hoard
+        finally:
+            await ac.post("/v1/admin/profile/memory/stop", headers=ADMIN)
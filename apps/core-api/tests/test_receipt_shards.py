@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from server import chain_heads, shards
+from server.logtail import LogFollower, receipts_log
+from server.main import app
+from server.receipts import read_chain, write_receipt
+from server.settings import settings
+from server.storage import append_jsonl
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "receipts_path", str(tmp_path / "receipts.jsonl"))
+    monkeypatch.setattr(settings, "ledger_path", str(tmp_path / "ledger.jsonl"))
+    monkeypatch.setattr(settings, "idempotency_path", str(tmp_path / "idempotency.jsonl"))
+    return tmp_path
+
+
+def _trace_ids(path: str) -> set[str]:
+    with open(path, encoding="utf-8") as f:
+        return {json.loads(line)["trace_id"] for line in f}
+
+
+@pytest.mark.asyncio
+async def test_traces_spread_over_shards(data_dir, monkeypatch):
+    monkeypatch.setattr(settings, "receipt_shards", 4)
+    body = {"payload_type": "shard.test", "payload": {"n": 1}}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        firsts = await asyncio.gather(*(ac.post("/v1/exchange", json=body) for _ in range(24)))
+        first = firsts[0].json()
+        headers = {
+            "X-SIGNET-Trace": first["trace_id"],
+            "X-SIGNET-Prev-Receipt-Hash": first["receipt"]["receipt_hash"],
+        }
+        assert (await ac.post("/v1/exchange", json=body, headers=headers)).status_code == 200
+        chain = (await ac.get(f"/v1/receipts/chain/{first['trace_id']}")).json()
+
+    assert all(r.status_code == 200 for r in firsts)
+    assert [r["hop"] for r in chain] == [1, 2]
+    assert not os.path.exists(settings.receipts_path)
+    found = [p for p in shards.paths() if os.path.exists(p)]
+    assert len(found) > 1
+    for index, path in enumerate(shards.paths()):
+        if os.path.exists(path):
+            # Each trace lives in exactly the shard its hash selects.
+            assert {shards.shard_of(t) for t in _trace_ids(path)} == {index}
+
+
+def test_trace_sync_reads_only_its_shard(data_dir, monkeypatch):
+    monkeypatch.setattr(settings, "receipt_shards", 4)
+    write_receipt("only-here", 1, {"n": 1})
+    offsets = [f.offset for f in receipts_log._followers()]
+    assert [i for i, o in enumerate(offsets) if o] == [shards.shard_of("only-here")]
+
+
+def test_shards_sync_without_waiting_for_each_other(data_dir, monkeypatch):
+    monkeypatch.setattr(settings, "receipt_shards", 4)
+    traces = [f"lock-{i}" for i in range(40)]
+    slow = traces[0]
+    other = next(t for t in traces if shards.shard_of(t) != shards.shard_of(slow))
+    write_receipt(slow, 1, {"n": 1})
+    append_jsonl(shards.path_for(slow), {"trace_id": slow, "hop": 2})
+    release = threading.Event()
+    read = LogFollower._read
+
+    def slow_read(path, *args):
+        if path == shards.path_for(slow):
+            release.wait(5)
+        return read(path, *args)
+
+    monkeypatch.setattr(LogFollower, "_read", staticmethod(slow_read))
+    # A long catch-up on one shard must not hold up writes to another.
+    catching_up = threading.Thread(target=receipts_log.sync, args=(slow,))
+    catching_up.start()
+    writer = threading.Thread(target=write_receipt, args=(other, 1, {"n": 1}))
+    writer.start()
+    writer.join(timeout=5)
+    blocked = writer.is_alive()
+    release.set()
+    catching_up.join()
+    writer.join()
+    assert not blocked
+    assert chain_heads.head(other) is not None
+
+
+def test_migrate_splits_existing_log(data_dir, monkeypatch):
+    traces = [f"trace-{i}" for i in range(20)]
+    for trace_id in traces:
+        write_receipt(trace_id, 1, {"t": trace_id})
+        write_receipt(trace_id, 2, {"t": trace_id, "n": 2})
+    before = {t: read_chain(t) for t in traces}
+
+    stats = shards.migrate(to=4)
+    assert stats == {"records": 40, "skipped": 0}
+    with pytest.raises(FileExistsError):
+        shards.migrate(to=4)
+
+    monkeypatch.setattr(settings, "receipt_shards", 4)
+    assert {t: read_chain(t) for t in traces} == before
+    receipts_log.sync()
+    assert chain_heads.head("trace-3").hop == 2
+    assert sum(len(_trace_ids(p)) for p in shards.paths()) == len(traces)
@@ -0,0 +1,128 @@
+import os
+from contextlib import contextmanager
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from httpx import ASGITransport, AsyncClient
+
+from server import replica
+from server.main import app
+from server.receipts import read_chain, write_receipt
+from server.replica import ReplicaMiddleware
+from server.settings import settings
+
+ADMIN_KEY = "replication-admin-key"
+
+
+def _point_at(directory) -> None:
+    settings.receipts_path = str(directory / "receipts.jsonl")
+    settings.ledger_path = str(directory / "ledger.jsonl")
+    settings.idempotency_path = str(directory / "idempotency.jsonl")
+
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+    for name in ("receipts_path", "ledger_path", "idempotency_path", "api_keys", "replica"):
+        monkeypatch.setattr(settings, name, getattr(settings, name))
+    settings.api_keys = {ADMIN_KEY: {"name": "replica", "admin": True}}
+    monkeypatch.setattr(settings, "blob_store_enabled", True)
+    monkeypatch.setattr(settings, "blob_min_bytes", 0)
+    primary, follower = tmp_path / "primary", tmp_path / "replica"
+    primary.mkdir()
+    follower.mkdir()
+    _point_at(primary)
+    yield primary, follower
+    monkeypatch.setattr(replica, "_client", None)
+    monkeypatch.setattr(replica, "_caught_up_at", None)
+
+
+@contextmanager
+def _on(directory, restore):
+    _point_at(directory)
+    try:
+        yield
+    finally:
+        _point_at(restore)
+
+
+def _primary_client(primary, follower) -> httpx.Client:
+    """A client for the replication API of a primary whose data is in ``primary``."""
+    server = TestClient(app)
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        with _on(primary, follower):
+            r = server.request(
+                request.method, request.url.path, params=request.url.params,
+                headers=dict(request.headers),
+            )
+        return httpx.Response(r.status_code, headers=r.headers, content=r.content)
+
+    return httpx.Client(
+        transport=httpx.MockTransport(handle),
+        base_url="http://primary",
+        headers={"X-SIGNET-API-Key": ADMIN_KEY},
+    )
+
+
+def test_replica_mirrors_primary_logs_and_blobs(dirs, monkeypatch):
+    primary, follower = dirs
+    for trace_id in ("a", "b"):
+        write_receipt(trace_id, 1, {"t": trace_id})
+    write_receipt("a", 2, {"t": "a", "n": 2})
+    expected = read_chain("a")
+
+    _point_at(follower)
+    monkeypatch.setattr(settings, "replica", True)
+    monkeypatch.setattr(settings, "replica_primary_url", "http://primary")
+    monkeypatch.setattr(replica, "_client", _primary_client(primary, follower))
+    replica.poll()
+
+    assert replica.status()["error"] is None
+    assert (follower / "receipts.jsonl").read_bytes() == (primary / "receipts.jsonl").read_bytes()
+    assert read_chain("a") == expected  # bodies joined from the mirrored blobs
+    assert replica.status()["lag_bytes"] == {"receipts.0": 0, "ledger": 0}
+    assert replica.lag_seconds() < 5
+
+    with _on(primary, follower):
+        write_receipt("b", 2, {"t": "b", "n": 2})
+    replica.poll()
+    assert [r["hop"] for r in read_chain("b")] == [1, 2]
+
+
+def test_replication_api_requires_admin_key(dirs):
+    with TestClient(app) as client:
+        assert client.get("/v1/replication/manifest").status_code == 401
+        r = client.get(
+            "/v1/replication/logs/nope", headers={"X-SIGNET-API-Key": ADMIN_KEY}
+        )
+        assert r.status_code == 404
+        assert client.get("/v1/replication/status").json() == {"role": "primary"}
+
+
+def test_shared_file_replica_reports_partial_lag(dirs, monkeypatch):
+    primary, _ = dirs
+    monkeypatch.setattr(settings, "replica", True)
+    monkeypatch.setattr(settings, "replica_primary_url", None)
+    write_receipt("shared", 1, {"n": 1})
+    replica.poll()
+    assert replica.status()["lag_bytes"]["receipts.0"] == 0
+
+    partial = b'{"trace_id": "shared", "hop"'  # a writer mid-append
+    with open(primary / "receipts.jsonl", "ab") as f:
+        f.write(partial)
+    replica.poll()
+    assert replica.status()["lag_bytes"]["receipts.0"] == len(partial)
+    size = os.path.getsize(primary / "receipts.jsonl")
+    os.truncate(primary / "receipts.jsonl", size - len(partial))
+
+
+@pytest.mark.asyncio
+async def test_replica_refuses_exchanges_and_reports_lag(dirs):
+    transport = ASGITransport(app=ReplicaMiddleware(app))
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        r = await ac.post("/v1/exchange", json={"payload_type": "x", "payload": {}})
+        assert r.status_code == 405
+        assert r.json()["error"] == "read_only_replica"
+        r = await ac.get("/healthz")
+        assert float(r.headers["X-SIGNET-Replication-Lag"]) >= 0
@@ -0,0 +1,113 @@
+import threading
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from prometheus_client import REGISTRY
+
+from server.main import app
+from server.receipts import write_receipt
+from server.settings import settings
+
+
+@pytest.fixture
+def trace(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "receipts_path", str(tmp_path / "receipts.jsonl"))
+    monkeypatch.setattr(settings, "ledger_path", str(tmp_path / "ledger.jsonl"))
+    for hop in range(1, 21):
+        write_receipt("compressible", hop, {"hop": hop, "memo": "repeated text " * 8})
+    return "compressible"
+
+
+def _client():
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.asyncio
+async def test_export_is_compressed_and_cached(trace):
+    url = f"/v1/receipts/export/{trace}"
+    gz = {"accept-encoding": "gzip"}
+    labels = {"endpoint": "export", "encoding": "gzip"}
+    saved_before = _sample("signet_compression_saved_seconds_total", **labels)
+    sent_before = _sample("signet_compression_output_bytes_total", **labels)
+    async with _client() as ac:
+        plain = await ac.get(url, headers={"accept-encoding": "identity"})
+        first = await ac.get(url, headers=gz)
+        again = await ac.get(url, headers=gz)
+        unchanged = await ac.get(url, headers={**gz, "if-none-match": first.headers["etag"]})
+
+    assert "content-encoding" not in plain.headers
+    assert first.headers["content-encoding"] == "gzip"
+    assert int(first.headers["content-length"]) < len(plain.content) // 4
+    assert first.content == plain.content  # the same signed bundle, served from the cache
+    assert first.headers["X-SIGNET-Signature"] == again.headers["X-SIGNET-Signature"]
+    assert first.headers["etag"] == "W/" + plain.headers["etag"]
+    assert "Accept-Encoding" in first.headers["vary"]
+    assert unchanged.status_code == 304 and not unchanged.content
+    # The second gzip download reused the compressed body.
+    assert _sample("signet_compression_saved_seconds_total", **labels) > saved_before
+    sent = _sample("signet_compression_output_bytes_total", **labels) - sent_before
+    assert sent == 2 * int(first.headers["content-length"])
+
+
+@pytest.mark.asyncio
+async def test_new_hop_replaces_cached_bundle(trace):
+    url = f"/v1/receipts/export/{trace}"
+    async with _client() as ac:
+        before = (await ac.get(url)).json()
+        write_receipt(trace, 21, {"hop": 21})
+        after = (await ac.get(url)).json()
+    assert [r["hop"] for r in after["chain"]] == [*range(1, 22)]
+    assert len(before["chain"]) == 20
+
+
+@pytest.mark.asyncio
+async def test_zstd_preferred_when_available(trace):
+    zstandard = pytest.importorskip("zstandard")
+    async with _client() as ac:
+        r = await ac.get(
+            f"/v1/receipts/chain/{trace}",
+            headers={"accept-encoding": "gzip, zstd"},
+        )
+        raw = await ac.send(r.request, stream=True)
+        body = b"".join([chunk async for chunk in raw.aiter_raw()])
+    assert r.headers["content-encoding"] == "zstd"
+    assert zstandard.ZstdDecompressor().decompressobj().decompress(body) == r.content
+
+
+@pytest.mark.asyncio
+async def test_small_bodies_left_uncompressed(trace, monkeypatch):
+    monkeypatch.setattr(settings, "compression_min_bytes", 1 << 20)
+    async with _client() as ac:
+        r = await ac.get(f"/v1/receipts/chain/{trace}", headers={"accept-encoding": "gzip"})
+    assert "content-encoding" not in r.headers
+    assert r.content.startswith(b"[") and "etag" in r.headers
+
+
+@pytest.mark.asyncio
+async def test_compression_and_signing_run_off_the_event_loop(trace, monkeypatch):
+    from server import compression
+    from server.routes.v1 import receipts as receipts_route
+
+    threads = []
+    compress, sign_bundle = compression.compress, receipts_route.sign_bundle
+
+    def recording(fn):
+        def call(*args):
+            threads.append(threading.current_thread())
+            return fn(*args)
+        return call
+
+    monkeypatch.setattr(receipts_route, "_bundles", type(receipts_route._bundles)())
+    monkeypatch.setattr(compression, "compress", recording(compress))
+    monkeypatch.setattr(receipts_route, "sign_bundle", recording(sign_bundle))
+    async with _client() as ac:
+        await ac.get(f"/v1/receipts/chain/{trace}", headers={"accept-encoding": "gzip"})
+        url = f"/v1/receipts/export/{trace}"
+        await ac.get(url, headers={"accept-encoding": "identity"})  # signs, caches
+        await ac.get(url, headers={"accept-encoding": "gzip"})  # cached, compressed once
+    assert len(threads) == 3
+    assert threading.current_thread() not in threads
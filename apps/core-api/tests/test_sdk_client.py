@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+from httpx import ASGITransport
+from signet_verify import verify_export
+from signet_verify.client import AsyncSignetClient
+
+from server.main import app
+from server.settings import settings
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "receipts_path", str(tmp_path / "receipts.jsonl"))
+    monkeypatch.setattr(settings, "ledger_path", str(tmp_path / "ledger.jsonl"))
+    monkeypatch.setattr(settings, "idempotency_path", str(tmp_path / "idempotency.jsonl"))
+
+
+def _client(**kwargs) -> AsyncSignetClient:
+    return AsyncSignetClient(
+        "http://test", transport=ASGITransport(app=app), verify=True, **kwargs
+    )
+
+
+@pytest.mark.asyncio
+async def test_client_against_app(data_dir):
+    async with _client(batch_size=8) as client:
+        results = await asyncio.gather(
+            *(client.submit("sdk.test", {"n": i}) for i in range(20))
+        )
+        assert len({r["trace_id"] for r in results}) == 20
+
+        first = results[0]
+        second = await client.exchange(
+            "sdk.test",
+            {"n": "next"},
+            trace_id=first["trace_id"],
+            prev_receipt_hash=first["receipt"]["receipt_hash"],
+        )
+        assert second["receipt"]["hop"] == 2
+
+        chain = await client.chain(first["trace_id"])
+        assert [r["hop"] for r in chain] == [1, 2]
+        links = await client.chain(first["trace_id"], from_hop=2, fields="links")
+        assert [r["receipt_hash"] for r in links] == [second["receipt"]["receipt_hash"]]
+
+        bundle = await client.export(first["trace_id"])
+        assert verify_export(bundle, await client.jwks())
+
+
+@pytest.mark.asyncio
+async def test_explicit_idempotency_key_replays(data_dir):
+    async with _client() as client:
+        a = await client.exchange("sdk.test", {"n": 1}, idempotency_key="sdk-key")
+        b = await client.exchange("sdk.test", {"n": 1}, idempotency_key="sdk-key")
+    assert b["idempotent"] and b["trace_id"] == a["trace_id"]
@@ -0,0 +1,54 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from server import tracing
+from server.main import app
+from server.settings import settings
+
+
+@pytest.mark.asyncio
+async def test_stage_histograms_cover_exchange_and_export():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        r = await ac.post("/v1/exchange", json={"payload_type": "demo.echo", "payload": {"s": 1}})
+        trace_id = r.json()["trace_id"]
+        assert (await ac.get(f"/v1/receipts/export/{trace_id}")).status_code == 200
+        metrics = (await ac.get("/metrics")).text
+    for operation, stage in [
+        ("exchange", "validate"),
+        ("exchange", "write_receipt"),
+        ("exchange", "write_ledger"),
+        ("exchange", "serialize"),
+        ("write_receipt", "cid"),
+        ("write_receipt", "lock_wait"),
+        ("write_receipt", "read_head"),
+        ("write_receipt", "append"),
+        ("export", "read_chain"),
+        ("export", "sign"),
+    ]:
+        assert f'signet_stage_latency_seconds_count{{operation="{operation}",stage="{stage}"}}' in metrics
+
+
+def test_sampled_operation_emits_spans(monkeypatch):
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    monkeypatch.setattr(settings, "otel_enabled", True)
+    monkeypatch.setattr(settings, "otel_sample_ratio", 1.0)
+    exporter = InMemorySpanExporter()
+    tracer = tracing._get_tracer()
+    from opentelemetry import trace
+
+    trace.get_tracer_provider().add_span_processor(SimpleSpanProcessor(exporter))
+    assert tracer is tracing._get_tracer()
+    with tracing.operation("exchange"), tracing.stage("exchange", "validate"):
+        pass
+    names = sorted(s.name for s in exporter.get_finished_spans())
+    assert names == ["exchange", "exchange.validate"]
+
+    # Unsampled operations create no spans at all.
+    exporter.clear()
+    monkeypatch.setattr(settings, "otel_sample_ratio", 0.0)
+    with tracing.operation("exchange"), tracing.stage("exchange", "validate"):
+        pass
+    assert exporter.get_finished_spans() == ()
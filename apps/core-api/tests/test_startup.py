@@ -0,0 +1,84 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from server import startup
+from server.logtail import LogFollower
+from server.main import app
+from server.security import jwks_response
+from server.settings import settings
+
+
+@pytest.mark.asyncio
+async def test_readyz_after_lifespan_phases(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ledger_path", str(tmp_path / "ledger.jsonl"))
+    monkeypatch.setattr(settings, "receipts_path", str(tmp_path / "receipts.jsonl"))
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        startup.begin()
+        r = await ac.get("/readyz")
+        assert r.status_code == 503
+        assert r.json()["ready"] is False
+        async with app.router.lifespan_context(app):
+            r = await ac.get("/readyz")
+            assert r.status_code == 200
+            phases = r.json()["phases"]
+            assert {"imports", "signing_key", "trace_index", "ledger_index", "idempotency"} <= set(phases)
+            assert "compliance" not in phases
+            # Liveness does not depend on readiness.
+            assert (await ac.get("/healthz")).status_code == 200
+            jwks = await ac.get("/.well-known/jwks.json")
+            assert jwks.json() == jwks_response()
+
+
+@pytest.mark.asyncio
+async def test_time_to_first_request_ignores_probes(monkeypatch):
+    monkeypatch.setattr(startup, "time_to_first_request", None)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        await ac.get("/healthz")
+        await ac.get("/metrics")
+        assert startup.time_to_first_request is None
+        await ac.get("/v1/ledger")
+    assert startup.time_to_first_request is not None
+    assert startup.time_to_first_request > 0
+
+
+def test_late_subscriber_catches_up_without_resetting_others(tmp_path):
+    path = tmp_path / "log.jsonl"
+    path.write_text("".join(json.dumps({"n": i}) + "\n" for i in range(3)))
+
+    class Sub:
+        def __init__(self):
+            self.seen, self.resets = [], 0
+
+        def reset(self):
+            self.seen, self.resets = [], self.resets + 1
+
+        def apply(self, offset, record):
+            self.seen.append(record["n"])
+
+    follower = LogFollower(lambda: str(path))
+    early = Sub()
+    follower.subscribe(early)
+    follower.sync()
+    late = Sub()
+    follower.subscribe(late)
+    assert late.seen == [0, 1, 2]
+    assert early.resets == 1  # only the reset from the first sync's path change
+    with path.open("a") as f:
+        f.write(json.dumps({"n": 3}) + "\n")
+    follower.sync()
+    assert early.seen == late.seen == [0, 1, 2, 3]
+
+
+def test_compliance_module_loads_on_first_use():
+    code = "import sys, server.main; print('server.compliance' in sys.modules)"
+    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=app_dir, capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == "False"
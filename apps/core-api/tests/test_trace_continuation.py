@@ -0,0 +1,87 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from prometheus_client import REGISTRY
+
+from server.main import app
+from server.receipts import HeadMovedError, append_receipt, read_chain, write_receipt
+from server.settings import settings
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "receipts_path", str(tmp_path / "receipts.jsonl"))
+    monkeypatch.setattr(settings, "ledger_path", str(tmp_path / "ledger.jsonl"))
+    monkeypatch.setattr(settings, "idempotency_path", str(tmp_path / "idempotency.jsonl"))
+
+
+def _continue(trace_id: str, prev: str) -> dict[str, str]:
+    return {"X-SIGNET-Trace": trace_id, "X-SIGNET-Prev-Receipt-Hash": prev}
+
+
+@pytest.mark.asyncio
+async def test_continue_trace_with_compare_and_append(data_dir):
+    body = {"payload_type": "hop", "payload": {"step": 1}}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        first = (await ac.post("/v1/exchange", json=body)).json()
+        trace_id = first["trace_id"]
+        head = first["receipt"]["receipt_hash"]
+
+        r = await ac.post("/v1/exchange", json=body, headers=_continue(trace_id, head))
+        assert r.status_code == 200
+        second = r.json()
+        assert second["trace_id"] == trace_id
+        assert r.headers["X-SIGNET-Trace"] == trace_id
+        assert second["receipt"]["hop"] == 2
+        assert second["receipt"]["prev_receipt_hash"] == head
+
+        # A writer still holding the old head loses.
+        r = await ac.post("/v1/exchange", json=body, headers=_continue(trace_id, head))
+        assert r.status_code == 409
+        assert r.json()["head"] == {"receipt_hash": second["receipt"]["receipt_hash"], "hop": 2}
+
+        chain = (await ac.get(f"/v1/receipts/chain/{trace_id}")).json()
+        assert [c["hop"] for c in chain] == [1, 2]
+        ledger = (await ac.get("/v1/ledger", params={"trace_id": trace_id})).json()["items"]
+        assert [e["hop"] for e in ledger] == [1, 2]
+
+        r = await ac.post("/v1/exchange", json=body, headers=_continue("no-such-trace", head))
+        assert r.status_code == 404
+        r = await ac.post("/v1/exchange", json=body, headers={"X-SIGNET-Trace": trace_id})
+        assert r.status_code == 400
+
+
+def test_concurrent_continuations_have_one_winner(data_dir):
+    head = write_receipt("fanout", 1, {"n": 0})["receipt_hash"]
+
+    def attempt(i: int) -> bool:
+        try:
+            append_receipt("fanout", head, {"n": i})
+        except HeadMovedError:
+            return False
+        return True
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(attempt, range(16)))
+    assert results.count(True) == 1
+    assert [r["hop"] for r in read_chain("fanout")] == [1, 2]
+
+
+def _exchanges(result: str) -> float:
+    return REGISTRY.get_sample_value("signet_exchanges_total", {"result": result}) or 0.0
+
+
+@pytest.mark.asyncio
+async def test_unknown_trace_rejected_before_forwarding(data_dir):
+    body = {"payload_type": "hop", "payload": {}, "forward_url": "https://example.com/hook"}
+    before = {result: _exchanges(result) for result in ("not_found", "conflict")}
+    forwards = REGISTRY.get_sample_value("signet_forward_total", {"host": "example.com"}) or 0.0
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        r = await ac.post("/v1/exchange", json=body, headers=_continue("no-such", "sha256:x"))
+    assert r.status_code == 404
+    assert r.json()["error"] == "trace_not_found"
+    assert _exchanges("not_found") == before["not_found"] + 1
+    assert _exchanges("conflict") == before["conflict"]
+    assert (REGISTRY.get_sample_value("signet_forward_total", {"host": "example.com"}) or 0.0) \
+        == forwards
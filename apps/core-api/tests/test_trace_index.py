@@ -0,0 +1,82 @@
+import json
+import uuid
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from server import logtail
+from server.logtail import LogFollower
+from server.main import app
+from server.trace_index import BloomFilter, ScalableBloomFilter, might_contain
+
+
+def test_bloom_no_false_negatives():
+    bf = BloomFilter(1000, 0.01)
+    keys = [str(uuid.uuid4()) for _ in range(1000)]
+    for k in keys:
+        bf.add(k)
+    assert all(k in bf for k in keys)
+    assert bf.estimated_fp_rate() < 0.02
+
+
+def test_scalable_bloom_grows_past_capacity():
+    sbf = ScalableBloomFilter(100, 0.01)
+    keys = [str(uuid.uuid4()) for _ in range(1000)]
+    for k in keys:
+        sbf.add(k)
+    assert len(sbf.stages) > 1
+    assert all(k in sbf for k in keys)
+    misses = sum(str(uuid.uuid4()) in sbf for _ in range(2000))
+    assert misses < 100
+
+
+def test_follower_reads_in_bounded_chunks(tmp_path, monkeypatch):
+    # Lines straddle every chunk boundary; the unterminated tail waits for its newline.
+    monkeypatch.setattr(logtail, "_READ_CHUNK", 7)
+    path = tmp_path / "log.jsonl"
+    lines = [json.dumps({"n": i, "pad": "x" * i}) + "\n" for i in range(20)]
+    path.write_text("".join(lines) + '{"n": 20')
+
+    class Sub:
+        def __init__(self):
+            self.seen = []
+
+        def reset(self):
+            self.seen = []
+
+        def apply(self, offset, record):
+            self.seen.append((offset, record["n"]))
+
+    sub = Sub()
+    follower = LogFollower(lambda: str(path))
+    follower.subscribe(sub)
+    assert follower.sync() == 20
+    offsets = [sum(len(line) for line in lines[:i]) for i in range(20)]
+    assert sub.seen == list(zip(offsets, range(20), strict=True))
+    assert follower.offset == sum(len(line) for line in lines)
+    with path.open("a") as f:
+        f.write("}\n")
+    assert follower.sync() == 1
+    assert sub.seen[-1] == (follower.offset - len('{"n": 20}\n'), 20)
+
+
+@pytest.mark.asyncio
+async def test_unknown_trace_short_circuits_and_known_trace_found():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        unknown = str(uuid.uuid4())
+        assert not might_contain(unknown)
+        r = await ac.get(f"/v1/receipts/chain/{unknown}")
+        assert r.status_code == 404
+        r = await ac.get(f"/v1/receipts/export/{unknown}")
+        assert r.status_code == 404
+
+        ex = await ac.post("/v1/exchange", json={"payload_type": "demo.echo", "payload": {"x": 1}})
+        trace_id = ex.json()["trace_id"]
+        assert might_contain(trace_id)
+        assert (await ac.get(f"/v1/receipts/chain/{trace_id}")).status_code == 200
+
+        metrics = (await ac.get("/metrics")).text
+        assert 'signet_trace_lookups_total{result="filtered"}' in metrics
+        assert "signet_trace_filter_false_positive_rate" in metrics
+        assert "signet_trace_filter_bytes" in metrics
@@ -1,5 +1,6 @@
 from .verify import (
 	compute_cid_jcs,
+	compute_receipt_hash,
 	verify_ed25519,
 	verify_export_bundle,
 	verify_receipt,
@@ -0,0 +1,380 @@
+"""Offline audit of a Signet data directory: ``signet-verify audit <data_dir>``.
+
+Checks every receipt (its CID against ``normalized``, or against the blob store
+when the body lives there, and its ``receipt_hash``), the continuity of every chain
+(hops 1..n, ``prev_receipt_hash`` and ``prev_cid`` links), and the ledger against the
+receipts (each ``(trace_id, hop)`` on both sides with the same CID).
+
+The receipts are either ``receipts.jsonl`` or one set of shards
+(``receipts.NNN-of-MMM.jsonl``); a directory holding both, or shards of two sets
+(a migration whose source was not removed), is refused rather than audited as one
+log.
+
+The first pass streams the receipts and ``ledger.jsonl`` once. It copies each line
+into a bucket file chosen by a hash of its trace_id, so every trace, with its
+ledger entries, ends up in a single bucket. At most 512 bucket files are open at a
+time; a bucket that comes out larger than ``bucket_bytes`` is split again with
+another hash. Worker processes then audit the buckets independently, each loading
+one bucket at a time. A worker's memory is therefore bounded by the parsed form of
+about ``bucket_bytes`` of log lines, except for a single trace larger than that,
+which is always loaded whole. The bucket files take as much disk as the logs.
+
+Discrepancies are written as JSON lines (``kind``, ``trace_id``, ``hop``,
+``detail``, and ``file``/``offset`` of the offending line where there is one).
+Progress and throughput go to stderr. A JSON summary goes to stdout.
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any
+
+from .verify import compute_cid_jcs, compute_receipt_hash
+
+_FANOUT = 512  # bucket files open at once while splitting
+_MAX_SPLITS = 8
+_RECEIPT_KEYS = ("trace_id", "ts", "cid", "receipt_hash", "hop")
+_TRACE_ID = re.compile(rb'"trace_id":\s*"((?:[^"\\]|\\.)*)"')
+_SHARD = re.compile(r"receipts\.(\d{3,})-of-(\d{3,})\.jsonl")
+
+
+class LayoutError(ValueError):
+    """The data directory does not hold exactly one receipts layout."""
+
+
+def receipt_files(data_dir: str) -> list[str]:
+    """``receipts.jsonl`` or the shards of one set (``receipts.NNN-of-MMM.jsonl``).
+
+    A shard no trace hashed to has no file. Raises ``LayoutError`` if both layouts,
+    or shards of several sets, are present.
+    """
+    single = os.path.join(data_dir, "receipts.jsonl")
+    sets: dict[int, dict[int, str]] = defaultdict(dict)
+    for path in glob.glob(os.path.join(data_dir, "receipts.*-of-*.jsonl")):
+        m = _SHARD.fullmatch(os.path.basename(path))
+        if m is not None:
+            sets[int(m.group(2))][int(m.group(1))] = path
+    if os.path.exists(single):
+        if sets:
+            raise LayoutError(f"{data_dir} holds both receipts.jsonl and receipt shards "
+                              f"(of {', '.join(map(str, sorted(sets)))}); remove one layout")
+        return [single]
+    if not sets:
+        return []
+    if len(sets) > 1:
+        raise LayoutError(f"{data_dir} holds receipt shards of several sets "
+                          f"(of {', '.join(map(str, sorted(sets)))}); remove all but one")
+    (shards,) = sets.values()
+    return [shards[i] for i in sorted(shards)]
+
+
+def _bucket_of(line: bytes, buckets: int, level: int = 0) -> int | None:
+    m = _TRACE_ID.search(line)
+    if m is None:
+        return None
+    raw = m.group(1)
+    trace_id = json.loads(b'"' + raw + b'"') if b"\\" in raw else raw.decode("utf-8", "replace")
+    # A salt per level, so re-splitting a bucket does not reuse the hash that filled it.
+    key = trace_id.encode("utf-8")
+    digest = hashlib.blake2b(key, digest_size=8, salt=bytes([level])).digest()
+    return int.from_bytes(digest, "big") % buckets
+
+
+class _Progress:
+    def __init__(self, quiet: bool):
+        self.quiet = quiet
+        self.started = time.monotonic()
+        self.last = 0.0
+
+    def report(self, message: str, force: bool = False) -> None:
+        now = time.monotonic()
+        if self.quiet or (not force and now - self.last < 1.0):
+            return
+        self.last = now
+        print(f"[{now - self.started:7.1f}s] {message}", file=sys.stderr, flush=True)
+
+
+def _partition(
+    files: list[tuple[bytes, str]], tmp_dir: str, buckets: int, progress: _Progress
+) -> tuple[list[str], list[dict], int]:
+    """Split every log line into the bucket of its trace; returns the bucket paths,
+    lines without a trace_id and the bytes read."""
+    paths = [os.path.join(tmp_dir, f"bucket-{i:04d}") for i in range(buckets)]
+    outs = [open(p, "wb", buffering=1 << 16) for p in paths]  # noqa: SIM115
+    unrouted: list[dict] = []
+    total = sum(os.path.getsize(path) for _, path in files)
+    done = lines = 0
+    try:
+        for index, (tag, path) in enumerate(files):
+            offset = 0
+            with open(path, "rb", buffering=1 << 20) as f:
+                for line in f:
+                    lines += 1
+                    bucket = _bucket_of(line, buckets)
+                    if bucket is None:
+                        if line.strip():
+                            unrouted.append(_finding("malformed_record", None, None,
+                                                     "no trace_id", path, offset))
+                    else:
+                        outs[bucket].write(b"%s%d:%d\t%s" % (tag, index, offset, line))
+                    offset += len(line)
+                    if lines % 65536 == 0:
+                        mb = (done + offset) / 1e6
+                        rate = mb / max(time.monotonic() - progress.started, 1e-9)
+                        progress.report(f"partition {mb:,.0f}/{total / 1e6:,.0f} MB "
+                                        f"({rate:,.0f} MB/s)")
+            done += offset
+    finally:
+        for out in outs:
+            out.close()
+    return paths, unrouted, done
+
+
+def _split(path: str, buckets: int, level: int) -> list[str]:
+    """Spread the lines of bucket ``path`` over ``buckets`` new ones; removes ``path``."""
+    paths = [f"{path}.{i:04d}" for i in range(buckets)]
+    outs = [open(p, "wb", buffering=1 << 16) for p in paths]  # noqa: SIM115
+    try:
+        with open(path, "rb", buffering=1 << 20) as f:
+            for line in f:
+                # Only lines with a trace_id were routed into a bucket.
+                outs[_bucket_of(line, buckets, level) or 0].write(line)
+    finally:
+        for out in outs:
+            out.close()
+    os.remove(path)
+    return paths
+
+
+def _bound(paths: list[str], bucket_bytes: int, progress: _Progress) -> list[str]:
+    """Split buckets larger than ``bucket_bytes`` until they fit.
+
+    A bucket that one trace fills on its own cannot shrink and is kept as it is.
+    """
+    done: list[str] = []
+    pending = [(path, 1) for path in paths]
+    while pending:
+        path, level = pending.pop()
+        size = os.path.getsize(path)
+        if size <= bucket_bytes or level > _MAX_SPLITS:
+            done.append(path)
+            continue
+        parts = _split(path, min(_FANOUT, 2 * -(-size // bucket_bytes)), level)
+        progress.report(f"split a {size / 1e6:,.0f} MB bucket into {len(parts)}")
+        if any(os.path.getsize(part) == size for part in parts):
+            done.extend(parts)  # every line went to one part: a single trace
+        else:
+            pending.extend((part, level + 1) for part in parts)
+    return sorted(done)
+
+
+def _finding(
+    kind: str, trace_id: str | None, hop: Any, detail: str,
+    file: str | None = None, offset: int | None = None,
+) -> dict:
+    out: dict[str, Any] = {"kind": kind, "trace_id": trace_id, "hop": hop, "detail": detail}
+    if file is not None:
+        out["file"] = file
+        out["offset"] = offset
+    return out
+
+
+def _read_bucket(path: str, files: list[str]) -> Iterator[tuple[bytes, str, int, Any]]:
+    with open(path, "rb") as f:
+        for line in f:
+            head, _, raw = line.partition(b"\t")
+            index, _, offset = head[1:].partition(b":")
+            source = files[int(index)]
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                record = None
+            yield head[:1], source, int(offset), record
+
+
+def _blob(blobs_dir: str, cid: str) -> Any:
+    hexdigest = cid.split(":", 1)[-1]
+    try:
+        with open(os.path.join(blobs_dir, hexdigest[:2], f"{hexdigest}.json"), "rb") as f:
+            return json.loads(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def _check_receipt(rec: dict, blobs_dir: str, where: tuple[str, int]) -> list[dict]:
+    trace_id, hop, cid = rec["trace_id"], rec["hop"], rec["cid"]
+    found = []
+    if "normalized" in rec:
+        body, kind = rec["normalized"], "cid_mismatch"
+    else:
+        body, kind = _blob(blobs_dir, cid), "blob_mismatch"
+        if body is None:
+            found.append(_finding("missing_blob", trace_id, hop, f"no blob for {cid}", *where))
+    if body is not None:
+        recomputed = compute_cid_jcs(body)
+        if recomputed != cid:
+            found.append(_finding(kind, trace_id, hop, f"{cid} != {recomputed}", *where))
+    recomputed = compute_receipt_hash(rec)
+    if recomputed != rec.get("receipt_hash"):
+        found.append(_finding("receipt_hash_mismatch", trace_id, hop,
+                              f"{rec.get('receipt_hash')} != {recomputed}", *where))
+    return found
+
+
+def _check_chain(trace_id: str, chain: list[tuple[dict, tuple[str, int]]]) -> list[dict]:
+    found = []
+    chain.sort(key=lambda item: item[0]["hop"])
+    prev: dict | None = None
+    for rec, where in chain:
+        hop = rec["hop"]
+        expected = 1 if prev is None else prev["hop"] + 1
+        if prev is not None and hop == prev["hop"]:
+            found.append(_finding("duplicate_hop", trace_id, hop, "hop appears twice", *where))
+            continue
+        if hop != expected:
+            # The links point at the missing hop; they can only be checked across a gap.
+            found.append(_finding("hop_gap", trace_id, hop, f"expected hop {expected}", *where))
+            prev = rec
+            continue
+        want_hash = prev["receipt_hash"] if prev else None
+        if rec.get("prev_receipt_hash") != want_hash:
+            found.append(_finding("prev_hash_mismatch", trace_id, hop,
+                                  f"{rec.get('prev_receipt_hash')} != {want_hash}", *where))
+        want_cid = prev["cid"] if prev else None
+        if rec.get("prev_cid") != want_cid:
+            found.append(_finding("prev_cid_mismatch", trace_id, hop,
+                                  f"{rec.get('prev_cid')} != {want_cid}", *where))
+        prev = rec
+    return found
+
+
+def audit_bucket(path: str, files: list[str], blobs_dir: str, report_path: str) -> dict:
+    """Audit the traces of one bucket; discrepancies go to ``report_path``."""
+    chains: dict[str, list[tuple[dict, tuple[str, int]]]] = defaultdict(list)
+    ledger: dict[tuple[str, Any], tuple[dict, tuple[str, int]]] = {}
+    stats = {"receipts": 0, "ledger_entries": 0, "traces": 0, "discrepancies": 0}
+    with open(report_path, "w", encoding="utf-8") as report:
+        def emit(items: list[dict]) -> None:
+            report.writelines(json.dumps(item, ensure_ascii=False) + "\n" for item in items)
+            stats["discrepancies"] += len(items)
+
+        for tag, source, offset, record in _read_bucket(path, files):
+            where = (source, offset)
+            required = ("trace_id", "hop", "cid") if tag == b"L" else _RECEIPT_KEYS
+            if not isinstance(record, dict) or any(k not in record for k in required) \
+                    or not isinstance(record["hop"], int):
+                emit([_finding("malformed_record", None, None, "not a receipt or ledger entry",
+                               *where)])
+                continue
+            if tag == b"L":
+                stats["ledger_entries"] += 1
+                ledger[(record["trace_id"], record["hop"])] = (record, where)
+                continue
+            stats["receipts"] += 1
+            emit(_check_receipt(record, blobs_dir, where))
+            chains[record["trace_id"]].append((record, where))
+        stats["traces"] = len(chains)
+        for trace_id, chain in chains.items():
+            emit(_check_chain(trace_id, chain))
+            for rec, where in chain:
+                entry = ledger.pop((trace_id, rec["hop"]), None)
+                if entry is None:
+                    emit([_finding("receipt_without_ledger", trace_id, rec["hop"],
+                                   "no ledger entry", *where)])
+                elif entry[0]["cid"] != rec["cid"]:
+                    emit([_finding("ledger_cid_mismatch", trace_id, rec["hop"],
+                                   f"ledger {entry[0]['cid']} != receipt {rec['cid']}",
+                                   *entry[1])])
+        for (trace_id, hop), (_, where) in ledger.items():
+            emit([_finding("ledger_without_receipt", trace_id, hop, "no receipt", *where)])
+    return stats
+
+
+def audit(
+    data_dir: str,
+    report_path: str,
+    *,
+    workers: int | None = None,
+    bucket_bytes: int = 64 << 20,
+    tmp_dir: str | None = None,
+    blobs_dir: str | None = None,
+    quiet: bool = False,
+) -> dict:
+    """Audit ``data_dir``; writes discrepancies to ``report_path`` and returns totals."""
+    progress = _Progress(quiet)
+    workers = workers or os.cpu_count() or 1
+    files = [(b"R", path) for path in receipt_files(data_dir)]
+    ledger_path = os.path.join(data_dir, "ledger.jsonl")
+    if os.path.exists(ledger_path):
+        files.append((b"L", ledger_path))
+    if not files:
+        raise FileNotFoundError(f"no receipts*.jsonl or ledger.jsonl in {data_dir}")
+    size = sum(os.path.getsize(path) for _, path in files)
+    buckets = min(_FANOUT, max(workers * 4, -(-size // bucket_bytes)))
+    work_dir = tempfile.mkdtemp(prefix="signet-audit-", dir=tmp_dir)
+    try:
+        paths, unrouted, read = _partition(files, work_dir, buckets, progress)
+        paths = _bound(paths, bucket_bytes, progress)
+        buckets = len(paths)
+        progress.report(f"partitioned {read / 1e6:,.1f} MB into {buckets} buckets", force=True)
+        names = [path for _, path in files]
+        blobs = blobs_dir or os.path.join(data_dir, "blobs")
+        totals: dict[str, float] = {
+            "receipts": 0, "ledger_entries": 0, "traces": 0, "discrepancies": len(unrouted)
+        }
+        started = time.monotonic()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(audit_bucket, path, names, blobs, path + ".report")
+                for path in paths
+            ]
+            for done, future in enumerate(as_completed(futures), 1):
+                for key, value in future.result().items():
+                    totals[key] += value
+                records = totals["receipts"] + totals["ledger_entries"]
+                rate = records / max(time.monotonic() - started, 1e-9)
+                progress.report(f"audit {done}/{buckets} buckets, {records:,} records "
+                                f"({rate:,.0f}/s), {totals['discrepancies']:,} discrepancies",
+                                force=done == buckets)
+        with open(report_path, "wb") as report:
+            report.writelines(json.dumps(item, ensure_ascii=False).encode() + b"\n" for item in unrouted)
+            for path in paths:
+                with open(path + ".report", "rb") as part:
+                    shutil.copyfileobj(part, report)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    totals["bytes"] = read
+    totals["seconds"] = round(time.monotonic() - progress.started, 3)
+    return totals
+
+
+def cli(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(prog="signet-verify audit")
+    p.add_argument("data_dir", help="Directory holding receipts*.jsonl and ledger.jsonl")
+    p.add_argument("--report", default="audit-report.jsonl", help="Discrepancies (JSONL)")
+    p.add_argument("--workers", type=int, default=None, help="Processes (default: CPUs)")
+    p.add_argument("--bucket-mb", type=int, default=64, help="Target bucket size in MB")
+    p.add_argument("--tmp-dir", default=None, help="Where to write buckets (as large as the logs)")
+    p.add_argument("--blobs-dir", default=None, help="Blob store (default: <data_dir>/blobs)")
+    p.add_argument("--quiet", action="store_true", help="No progress on stderr")
+    args = p.parse_args(argv)
+    try:
+        totals = audit(
+            args.data_dir, args.report, workers=args.workers, bucket_bytes=args.bucket_mb << 20,
+            tmp_dir=args.tmp_dir, blobs_dir=args.blobs_dir, quiet=args.quiet,
+        )
+    except (OSError, LayoutError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 2
+    print(json.dumps(totals))
+    return 1 if totals["discrepancies"] else 0
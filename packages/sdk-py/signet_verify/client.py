@@ -0,0 +1,264 @@
+"""Async client for the Signet core API.
+
+One ``AsyncSignetClient`` holds one pooled ``httpx.AsyncClient``. That pool is
+HTTP/2 with ``http2=True``, which needs the ``h2`` package: ``pip install
+signet-verify[http2]``. Share the client across a producer's tasks instead of
+opening one per request.
+
+* Every exchange gets an idempotency key (generated unless one is given), and the
+  key is reused across retries, so a retried exchange never records a second
+  receipt.
+* Connection errors, timeouts, 429 and 502-504 are retried with jittered
+  exponential backoff, which honours ``Retry-After``.
+* ``submit()`` micro-batches. It queues the exchange, and one flush sends up to
+  ``batch_size`` queued exchanges together over the pool (at most
+  ``max_in_flight`` at a time), once the batch is full or ``batch_window`` seconds
+  after its first entry.
+* With ``verify=True`` every receipt returned is checked with ``compute_cid_jcs``.
+  A mismatch raises ``SignetVerificationError``.
+
+Pass ``transport=httpx.ASGITransport(app=app)`` to talk to an app in-process.
+"""
+
+import asyncio
+import random
+import uuid
+from typing import Any
+
+import httpx
+
+from .verify import compute_cid_jcs, verify_receipt
+
+API_KEY_HEADER = "X-SIGNET-API-Key"
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+
+class SignetError(Exception):
+    """The API answered with an error status (after any retries)."""
+
+    def __init__(self, status_code: int, body: Any):
+        super().__init__(f"HTTP {status_code}: {body}")
+        self.status_code = status_code
+        self.body = body
+
+
+class SignetVerificationError(Exception):
+    """A returned receipt does not match its CID."""
+
+
+def _check_continuation(trace_id: str | None, prev_receipt_hash: str | None) -> None:
+    # The server would refuse it anyway, after a round trip (and retries).
+    if trace_id is not None and prev_receipt_hash is None:
+        raise ValueError(f"continuing trace {trace_id} needs prev_receipt_hash")
+
+
+class AsyncSignetClient:
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        api_key: str | None = None,
+        http2: bool = False,
+        verify: bool = False,
+        max_retries: int = 3,
+        backoff: float = 0.1,
+        max_backoff: float = 5.0,
+        timeout: float = 10.0,
+        max_connections: int = 100,
+        batch_size: int = 32,
+        batch_window: float = 0.005,
+        max_in_flight: int = 64,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.verify = verify
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self._http = httpx.AsyncClient(
+            base_url=base_url,
+            headers={API_KEY_HEADER: api_key} if api_key else None,
+            http2=http2,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections, max_keepalive_connections=max_connections
+            ),
+            transport=transport,
+        )
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._pending: list[tuple[dict[str, Any], asyncio.Future[dict]]] = []
+        self._flush_task: asyncio.Task[None] | None = None
+        self._batches: set[asyncio.Task[None]] = set()
+
+    async def __aenter__(self) -> "AsyncSignetClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Send what is still queued, then close the pool."""
+        await self.flush()
+        await self._http.aclose()
+
+    async def _request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                r = await self._http.request(method, url, **kwargs)
+            except httpx.TransportError:  # connect/read errors and timeouts
+                if attempt >= self.max_retries:
+                    raise
+                delay = 0.0
+            else:
+                if r.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    if r.status_code >= 400:
+                        try:
+                            body: Any = r.json()
+                        except ValueError:
+                            body = r.text
+                        raise SignetError(r.status_code, body)
+                    return r
+                try:
+                    delay = float(r.headers.get("Retry-After", 0))
+                except ValueError:
+                    delay = 0.0
+            # Full jitter, but never sooner than the server asked.
+            ceiling = min(self.max_backoff, self.backoff * 2**attempt)
+            await asyncio.sleep(max(delay, random.uniform(0, ceiling)))  # noqa: S311
+            attempt += 1
+
+    def _check(self, receipt: dict) -> None:
+        if not verify_receipt(receipt):
+            raise SignetVerificationError(
+                f"receipt hop {receipt.get('hop')} of {receipt.get('trace_id')} fails CID check"
+            )
+
+    async def exchange(
+        self,
+        payload_type: str,
+        payload: dict[str, Any],
+        *,
+        target_type: str | None = None,
+        forward_url: str | None = None,
+        idempotency_key: str | None = None,
+        trace_id: str | None = None,
+        prev_receipt_hash: str | None = None,
+    ) -> dict:
+        """POST one exchange now; returns the response body.
+
+        Continuing a trace takes both ``trace_id`` and the ``prev_receipt_hash`` of
+        its last hop; ``ValueError`` if only the trace is given.
+        """
+        _check_continuation(trace_id, prev_receipt_hash)
+        body: dict[str, Any] = {"payload_type": payload_type, "payload": payload}
+        if target_type is not None:
+            body["target_type"] = target_type
+        if forward_url is not None:
+            body["forward_url"] = forward_url
+        headers = {"X-SIGNET-Idempotency-Key": idempotency_key or str(uuid.uuid4())}
+        if trace_id is not None and prev_receipt_hash is not None:
+            headers["X-SIGNET-Trace"] = trace_id
+            headers["X-SIGNET-Prev-Receipt-Hash"] = prev_receipt_hash
+        r = await self._request("POST", "/v1/exchange", json=body, headers=headers)
+        result = r.json()
+        if self.verify:
+            receipt = result["receipt"]
+            if compute_cid_jcs(result["normalized"]) != receipt["cid"]:
+                raise SignetVerificationError(
+                    f"exchange {result['trace_id']} returned a receipt for other content"
+                )
+            self._check(receipt)
+        return result
+
+    async def submit(self, payload_type: str, payload: dict[str, Any], **kwargs: Any) -> dict:
+        """Like ``exchange``, but sent in the next micro-batch."""
+        _check_continuation(kwargs.get("trace_id"), kwargs.get("prev_receipt_hash"))
+        future: asyncio.Future[dict] = asyncio.get_running_loop().create_future()
+        # The key is fixed here, so the exchange is idempotent however it is sent.
+        kwargs.setdefault("idempotency_key", str(uuid.uuid4()))
+        self._pending.append(({"payload_type": payload_type, "payload": payload, **kwargs}, future))
+        if len(self._pending) >= self.batch_size:
+            self._dispatch()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+        return await future
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.batch_window)
+        self._flush_task = None
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._send_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _send_batch(self, batch: list[tuple[dict[str, Any], asyncio.Future[dict]]]) -> None:
+        async def send(kwargs: dict[str, Any], future: asyncio.Future[dict]) -> None:
+            async with self._in_flight:
+                try:
+                    result = await self.exchange(**kwargs)
+                except Exception as exc:  # handed to the submitter
+                    if not future.done():
+                        future.set_exception(exc)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+
+        await asyncio.gather(*(send(kwargs, future) for kwargs, future in batch))
+
+    async def flush(self) -> None:
+        """Send queued submissions now and wait for every batch in flight."""
+        self._dispatch()
+        if self._batches:
+            await asyncio.gather(*self._batches)
+
+    async def chain(
+        self, trace_id: str, *, from_hop: int | None = None, fields: str | None = None
+    ) -> list[dict]:
+        """The whole chain (from ``from_hop``), following pagination cursors."""
+        params: dict[str, Any] = {"limit": 1000}
+        if from_hop is not None:
+            params["from_hop"] = from_hop
+        if fields is not None:
+            params["fields"] = fields
+        receipts: list[dict] = []
+        while True:
+            r = await self._request("GET", f"/v1/receipts/chain/{trace_id}", params=params)
+            receipts.extend(r.json())
+            cursor = r.headers.get("X-SIGNET-Next-Cursor")
+            if cursor is None:
+                break
+            params.pop("from_hop", None)
+            params["cursor"] = cursor
+        if self.verify:
+            for receipt in receipts:
+                if "cid" in receipt and "hop" in receipt:
+                    self._check(receipt)
+        return receipts
+
+    async def export(self, trace_id: str) -> dict:
+        """The signed export bundle, in the form ``verify_export`` expects.
+
+        ``response_cid``, ``signature`` and ``kid`` are copied in from its headers.
+        """
+        r = await self._request("GET", f"/v1/receipts/export/{trace_id}")
+        bundle = r.json()
+        bundle["response_cid"] = r.headers.get("X-SIGNET-Response-CID")
+        bundle["signature"] = r.headers.get("X-SIGNET-Signature")
+        bundle["kid"] = r.headers.get("X-SIGNET-KID")
+        if self.verify:
+            for receipt in bundle.get("chain", []):
+                self._check(receipt)
+        return bundle
+
+    async def jwks(self) -> dict:
+        r = await self._request("GET", "/.well-known/jwks.json")
+        return r.json()
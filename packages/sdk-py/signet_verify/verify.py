@@ -20,6 +20,15 @@ def compute_cid_jcs(obj) -> str:
     h = hashlib.sha256(c).hexdigest()
     return "sha256:" + h
 
+def compute_receipt_hash(receipt: dict) -> str:
+    """The server's receipt_hash: CID of ``{ts, cid, prev, hop}``, linking the chain."""
+    return compute_cid_jcs({
+        "ts": receipt["ts"],
+        "cid": receipt["cid"],
+        "prev": receipt.get("prev_receipt_hash"),
+        "hop": receipt["hop"],
+    })
+
 def _b64u_decode(s: str) -> bytes:
     s += "=" * ((4 - len(s) % 4) % 4)
     return base64.urlsafe_b64decode(s.encode())
@@ -148,7 +157,11 @@ def _cli_verify_export(argv: list[str]) -> int:
 def main():  # pragma: no cover - thin dispatcher
     if len(sys.argv) >= 2 and sys.argv[1] == "verify-export":
         sys.exit(_cli_verify_export(sys.argv[2:]))
-    print("Usage: python -m signet_verify verify-export <export.json> <jwks.json>", file=sys.stderr)
+    if len(sys.argv) >= 2 and sys.argv[1] == "audit":
+        from .audit import cli
+        sys.exit(cli(sys.argv[2:]))
+    print("Usage: signet-verify verify-export <export.json> <jwks.json>", file=sys.stderr)
+    print("       signet-verify audit <data_dir> [--report PATH] [--workers N]", file=sys.stderr)
     sys.exit(2)
 
 if __name__ == "__main__":  # pragma: no cover
@@ -0,0 +1,113 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from signet_verify import compute_cid_jcs, compute_receipt_hash
+from signet_verify.audit import LayoutError, _bound, _Progress, audit, receipt_files
+
+
+def _chain(trace_id: str, hops: int) -> list[dict]:
+    chain, prev = [], None
+    for hop in range(1, hops + 1):
+        normalized = {"Document": {"Echo": {"trace": trace_id, "hop": hop}}}
+        rec = {
+            "trace_id": trace_id,
+            "ts": "2025-01-01T00:00:00Z",
+            "cid": compute_cid_jcs(normalized),
+            "prev_receipt_hash": prev["receipt_hash"] if prev else None,
+            "prev_cid": prev["cid"] if prev else None,
+            "hop": hop,
+            "normalized": normalized,
+        }
+        rec["receipt_hash"] = compute_receipt_hash(rec)
+        chain.append(rec)
+        prev = rec
+    return chain
+
+
+def _write(path, records) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for rec in records:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+
+def _ledger(receipts) -> list[dict]:
+    return [{"trace_id": r["trace_id"], "hop": r["hop"], "cid": r["cid"]} for r in receipts]
+
+
+def test_clean_data_dir(tmp_path):
+    receipts = [rec for i in range(30) for rec in _chain(f"trace-{i}-ü", 3)]
+    _write(tmp_path / "receipts.jsonl", receipts)
+    _write(tmp_path / "ledger.jsonl", _ledger(receipts))
+    totals = audit(str(tmp_path), str(tmp_path / "report.jsonl"), workers=2, quiet=True)
+    assert totals["receipts"] == 90 and totals["ledger_entries"] == 90
+    assert totals["traces"] == 30 and totals["discrepancies"] == 0
+    assert (tmp_path / "report.jsonl").read_text() == ""
+
+
+def test_discrepancies_reported(tmp_path):
+    good = _chain("good", 2)
+    gap = _chain("gap", 3)
+    del gap[1]
+    tampered = _chain("tampered", 2)
+    tampered[0]["normalized"]["Document"]["Echo"]["hop"] = 99
+    blob_backed = _chain("blob", 1)
+    del blob_backed[0]["normalized"]
+    receipts = good + gap + tampered + blob_backed
+    ledger = _ledger(good + gap + tampered)
+    ledger[0]["cid"] = "sha256:other"
+    ledger.append({"trace_id": "orphan", "hop": 1, "cid": "sha256:x"})
+    _write(tmp_path / "receipts.jsonl", receipts)
+    _write(tmp_path / "ledger.jsonl", ledger)
+    with open(tmp_path / "receipts.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"trace_id": "cut", "hop"')
+
+    report = tmp_path / "report.jsonl"
+    totals = audit(str(tmp_path), str(report), workers=2, quiet=True)
+    found = {(d["kind"], d["trace_id"]) for d in map(json.loads, report.read_text().splitlines())}
+    assert found == {
+        ("ledger_cid_mismatch", "good"),
+        ("hop_gap", "gap"),
+        ("cid_mismatch", "tampered"),
+        ("missing_blob", "blob"),
+        ("receipt_without_ledger", "blob"),
+        ("ledger_without_receipt", "orphan"),
+        ("malformed_record", None),
+    }
+    assert totals["discrepancies"] == len(found)
+
+
+def test_leftover_layout_is_refused(tmp_path):
+    # A migration that kept its source leaves both layouts; auditing both would
+    # report every receipt as a duplicate hop.
+    receipts = _chain("t", 2)
+    _write(tmp_path / "receipts.jsonl", receipts)
+    _write(tmp_path / "receipts.000-of-002.jsonl", receipts)
+    _write(tmp_path / "receipts.001-of-002.jsonl", [])
+    with pytest.raises(LayoutError, match="both"):
+        receipt_files(str(tmp_path))
+    os.remove(tmp_path / "receipts.jsonl")
+    assert receipt_files(str(tmp_path)) == [
+        str(tmp_path / "receipts.000-of-002.jsonl"), str(tmp_path / "receipts.001-of-002.jsonl"),
+    ]
+    _write(tmp_path / "receipts.000-of-003.jsonl", [])
+    with pytest.raises(LayoutError, match="several sets"):
+        receipt_files(str(tmp_path))
+
+
+def test_oversized_buckets_are_split(tmp_path):
+    lines = [json.dumps(rec).encode() + b"\n" for i in range(200) for rec in _chain(f"t{i}", 2)]
+    bucket = tmp_path / "bucket"
+    bucket.write_bytes(b"".join(lines))
+    limit = len(bucket.read_bytes()) // 10
+    parts = _bound([str(bucket)], limit, _Progress(quiet=True))
+    assert all(os.path.getsize(part) <= limit for part in parts)
+    split = [line for part in parts for line in Path(part).read_bytes().splitlines(keepends=True)]
+    assert sorted(split) == sorted(lines)
+    # A single trace cannot be split: its bucket is kept whole.
+    single = tmp_path / "single"
+    single.write_bytes(b"".join(json.dumps(rec).encode() + b"\n" for rec in _chain("one", 50)))
+    parts = _bound([str(single)], 100, _Progress(quiet=True))
+    assert sum(os.path.getsize(part) for part in parts) == max(map(os.path.getsize, parts))
@@ -0,0 +1,118 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from signet_verify import compute_cid_jcs
+from signet_verify.client import AsyncSignetClient, SignetError, SignetVerificationError
+
+
+def _exchange_response(body: dict, trace_id: str = "t1", tamper: bool = False) -> dict:
+    normalized = {"Document": {"Echo": body["payload"]}}
+    cid = compute_cid_jcs({"tampered": True} if tamper else normalized)
+    return {
+        "trace_id": trace_id,
+        "normalized": normalized,
+        "policy": {"engine": "HEL", "allowed": True, "reason": "no_forward", "cid": cid},
+        "receipt": {"trace_id": trace_id, "cid": cid, "hop": 1, "receipt_hash": "h1"},
+        "forwarded": None,
+        "idempotent": False,
+    }
+
+
+def _client(handler, **kwargs) -> AsyncSignetClient:
+    kwargs.setdefault("backoff", 0.001)
+    return AsyncSignetClient(
+        "http://signet", api_key="k", transport=httpx.MockTransport(handler), **kwargs
+    )
+
+
+def test_retries_reuse_idempotency_key():
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.headers["X-SIGNET-Idempotency-Key"])
+        assert request.headers["X-SIGNET-API-Key"] == "k"
+        if len(seen) < 3:
+            return httpx.Response(503, headers={"Retry-After": "0"}, json={"error": "busy"})
+        return httpx.Response(200, json=_exchange_response(json.loads(request.content)))
+
+    async def run():
+        async with _client(handler) as client:
+            return await client.exchange("x", {"n": 1})
+
+    assert asyncio.run(run())["trace_id"] == "t1"
+    assert len(seen) == 3 and len(set(seen)) == 1
+
+
+def test_errors_are_not_retried_past_the_limit():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        status = 400 if request.url.path == "/v1/exchange" else 503
+        return httpx.Response(status, json={"error": "nope"})
+
+    async def run():
+        async with _client(handler, max_retries=2) as client:
+            with pytest.raises(SignetError) as bad:
+                await client.exchange("x", {})
+            assert bad.value.status_code == 400
+            with pytest.raises(SignetError):
+                await client.chain("t1")
+
+    asyncio.run(run())
+    assert len(calls) == 1 + 3
+
+
+def test_submit_micro_batches():
+    in_flight, peak = 0, 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200, json=_exchange_response(json.loads(request.content)))
+
+    async def run():
+        async with _client(handler, batch_size=4, max_in_flight=3, verify=True) as client:
+            results = await asyncio.gather(*(client.submit("x", {"n": i}) for i in range(10)))
+            return [r["normalized"]["Document"]["Echo"]["n"] for r in results]
+
+    assert asyncio.run(run()) == list(range(10))
+    assert 1 < peak <= 3
+
+
+def test_verify_rejects_mismatched_cid():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json=_exchange_response(json.loads(request.content), tamper=True))
+
+    async def run():
+        async with _client(handler, verify=True) as client:
+            with pytest.raises(SignetVerificationError):
+                await client.submit("x", {"n": 1})
+
+    asyncio.run(run())
+
+
+def test_continuing_a_trace_needs_prev_receipt_hash():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json=_exchange_response(json.loads(request.content)))
+
+    async def run():
+        async with _client(handler) as client:
+            with pytest.raises(ValueError, match="prev_receipt_hash"):
+                await client.exchange("x", {"n": 1}, trace_id="t1")
+            with pytest.raises(ValueError, match="prev_receipt_hash"):
+                await client.submit("x", {"n": 1}, trace_id="t1")
+            await client.exchange("x", {"n": 1}, trace_id="t1", prev_receipt_hash="h1")
+
+    asyncio.run(run())
+    assert len(calls) == 1
+    assert calls[0].headers["X-SIGNET-Prev-Receipt-Hash"] == "h1"